@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 
 # 初始化数据库实例
@@ -18,6 +19,11 @@ def create_app(config_name='default'):
     from app.config.config import config
     app.config.from_object(config[config_name])
     
+    # 部署在反向代理之后时，按可信代理层数从X-Forwarded-*请求头获取客户端地址
+    proxy_count = app.config.get('PROXY_FIX_X_FOR', 0)
+    if proxy_count:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_count, x_proto=proxy_count)
+    
     # 初始化扩展
     db.init_app(app)
     migrate.init_app(app, db)
@@ -27,7 +33,7 @@ def create_app(config_name='default'):
     CORS(app, origins=['*'])  # Allow all origins for development
     
     # 注册蓝图
-    from app.routes import auth_bp, users_bp, documents_bp, categories_bp, annotations_bp, favorites_bp, system_logs_bp, overview_bp
+    from app.routes import auth_bp, users_bp, documents_bp, categories_bp, annotations_bp, favorites_bp, system_logs_bp, overview_bp, uploads_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(users_bp, url_prefix='/api/users')
@@ -37,6 +43,35 @@ def create_app(config_name='default'):
     app.register_blueprint(favorites_bp, url_prefix='/api/favorites')
     app.register_blueprint(system_logs_bp, url_prefix='/api/logs')
     app.register_blueprint(overview_bp, url_prefix='/api/overview')
+    app.register_blueprint(uploads_bp, url_prefix='/api/uploads')
+    
+    # 注册命令行工具
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # 注册存储统计的文档变更监听
+    from app.services.storage_stats import register_storage_stats_listeners
+    register_storage_stats_listeners()
+    
+    # 注册后台任务处理函数
+    from app.services.document_service import register_document_jobs
+    register_document_jobs()
+    
+    # 注册文件块回收监听（释放最后一个引用的事务提交后删除文件）
+    from app.utils.blob_store import register_blob_store_listeners
+    register_blob_store_listeners()
+    
+    # 注册版本内容缓存监听（保存的版本在事务提交后放入缓存）
+    from app.services.document_version_service import register_version_cache_listeners
+    register_version_cache_listeners()
+    
+    # 注册文档列表缓存的失效监听
+    from app.utils.list_cache import register_list_cache_listeners
+    register_list_cache_listeners()
+    
+    # 注册请求限流中间件
+    from app.utils.rate_limiter import register_rate_limiter
+    register_rate_limiter(app)
     
     # 创建上传目录
     if not os.path.exists(app.config.get('FTP_ROOT', 'D:\\test\\FTP')):
@@ -54,4 +89,4 @@ def create_app(config_name='default'):
     return app
 
 # 导入模型以确保它们被注册
-from app.models import user, document, favorite, system_log, access_log, annotation
\ No newline at end of file
+from app.models import user, document, favorite, system_log, access_log, annotation, search_index, upload_session, file_blob, storage_stat, category_closure, log_stats, job, upload_quota
\ No newline at end of file
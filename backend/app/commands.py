@@ -0,0 +1,218 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('search-reindex')
+@click.option('--batch-size', default=500, show_default=True, help='每批处理的文档数')
+@with_appcontext
+def search_reindex_command(batch_size):
+    """重建文档全文检索索引"""
+    from app.services.search_service import SearchService
+    count = SearchService.rebuild_index(batch_size=batch_size)
+    click.echo(f'检索索引重建完成，共处理{count}个文档')
+
+
+@click.command('upload-cleanup')
+@with_appcontext
+def upload_cleanup_command():
+    """清理超时未完成的分片上传"""
+    from app.routes.uploads import cleanup_expired_uploads
+    count = cleanup_expired_uploads()
+    click.echo(f'已清理{count}个超时的上传会话')
+
+
+@click.command('document-hash-backfill')
+@click.option('--batch-size', default=100, show_default=True, help='每批处理的文档数')
+@with_appcontext
+def document_hash_backfill_command(batch_size):
+    """为缺少内容哈希的文档计算SHA-256（用于下载ETag）"""
+    from app.services.document_service import DocumentService
+    count = DocumentService.backfill_content_hashes(batch_size=batch_size)
+    click.echo(f'已为{count}个文档计算内容哈希')
+
+
+@click.command('storage-dedupe')
+@click.option('--batch-size', default=100, show_default=True, help='每批处理的文档数')
+@click.option('--dry-run', is_flag=True, help='只统计可节省的空间，不修改文件')
+@with_appcontext
+def storage_dedupe_command(batch_size, dry_run):
+    """将历史文件迁入内容寻址存储并去重"""
+    from app.services.storage_service import StorageService
+    stats = StorageService.dedupe_legacy_files(batch_size=batch_size, dry_run=dry_run)
+    click.echo(f"共{stats['documents']}个历史文件，迁移{stats['migrated']}个，重复{stats['duplicates']}个，"
+               f"文件缺失{stats['missing']}个，可节省{stats['saved_bytes']}字节")
+
+
+@click.command('storage-relayout')
+@click.option('--strategy', default=None, help='存储路径策略flat/date/hash/date_hash，默认使用STORAGE_PATH_STRATEGY配置')
+@click.option('--batch-size', default=200, show_default=True, help='每批处理的文档数')
+@click.option('--pause', default=0.0, show_default=True, help='每批之间暂停的秒数')
+@with_appcontext
+def storage_relayout_command(strategy, batch_size, pause):
+    """在线迁移历史文件到分目录存储布局"""
+    from app.services.storage_service import StorageService
+    stats = StorageService.relayout_files(strategy=strategy, batch_size=batch_size, pause=pause)
+    click.echo(f"共{stats['documents']}个历史文件，迁移{stats['moved']}个，跳过{stats['skipped']}个，文件缺失{stats['missing']}个")
+
+
+@click.command('storage-reconcile')
+@click.option('--batch-size', default=500, show_default=True, help='每批检查的文档数')
+@click.option('--fix-sizes', is_flag=True, help='按实际文件大小修正文档记录')
+@click.option('--rebuild', is_flag=True, help='先按文档表重新计算存储统计聚合')
+@click.option('--blobs', is_flag=True, help='同时校正文件块引用计数，并清理没有文档引用或没有数据库记录的文件块')
+@click.option('--dry-run', is_flag=True, help='清理文件块时只统计，不删除文件')
+@with_appcontext
+def storage_reconcile_command(batch_size, fix_sizes, rebuild, blobs, dry_run):
+    """存储统计与文件系统对账"""
+    from app.services.storage_stats import StorageStatsService
+    if rebuild:
+        StorageStatsService.rebuild_from_documents()
+    stats = StorageStatsService.reconcile_filesystem(batch_size=batch_size, fix_sizes=fix_sizes)
+    click.echo(f"共检查{stats['documents']}个文档，文件缺失{stats['missing']}个，大小不一致{stats['size_mismatch']}个"
+               f"（已修正{stats['fixed']}个），实际占用{stats['referenced_size']}字节")
+
+    if blobs:
+        from app.services.storage_service import StorageService
+        if not dry_run:
+            fixed, removed = StorageService.reconcile_blob_references()
+            click.echo(f'修正{fixed}个文件块引用计数，删除{removed}个未被引用的文件块')
+        sweep = StorageService.sweep_orphan_blob_files(dry_run=dry_run)
+        action = '可删除' if dry_run else '已删除'
+        click.echo(f"存储目录中共{sweep['files']}个文件块，没有数据库记录的{sweep['orphans']}个"
+                   f"（{sweep['orphan_bytes']}字节，{action}），过期临时文件{sweep['temp_files']}个（{action}）")
+
+
+@click.command('category-closure-rebuild')
+@with_appcontext
+def category_closure_rebuild_command():
+    """按parent_id重建分类闭包表"""
+    from app.services.category_service import CategoryService
+    count = CategoryService.rebuild_closure()
+    click.echo(f'分类闭包表重建完成，共{count}条路径')
+
+
+@click.command('log-stats-rollup')
+@click.option('--days', default=None, type=int, help='重新汇总最近的天数，默认自动判断')
+@with_appcontext
+def log_stats_rollup_command(days):
+    """汇总访问日志到按天统计表"""
+    from app.services.log_stats_service import LogStatsService
+    count = LogStatsService.rollup_recent(days=days)
+    click.echo(f'访问日志统计汇总完成，写入{count}条汇总记录')
+
+
+@click.command('access-rollup')
+@click.option('--batch-size', default=5000, help='每批汇总的访问日志数')
+@click.option('--lag', default=None, type=int, help='只汇总写入超过此秒数的日志，默认使用ACCESS_ROLLUP_LAG配置')
+@with_appcontext
+def access_rollup_command(batch_size, lag):
+    """从上次水位增量汇总访问日志到访问分析表"""
+    from app.services.access_rollup_service import AccessRollupService
+    count = AccessRollupService.run(batch_size=batch_size, lag_seconds=lag)
+    click.echo(f'访问分析汇总完成，处理{count}条访问日志')
+
+
+@click.command('log-partition-enable')
+@with_appcontext
+def log_partition_enable_command():
+    """将MySQL日志表转换为按月分区（会重建表，需在维护窗口执行）"""
+    from app.services.log_partition_service import LogPartitionService
+    for table_name, result in LogPartitionService.enable_partitioning().items():
+        click.echo(f'{table_name}: {result}')
+
+
+@click.command('log-partition-maintain')
+@click.option('--dry-run', is_flag=True, help='只列出将归档的分区')
+@with_appcontext
+def log_partition_maintain_command(dry_run):
+    """预建日志分区，归档并删除超过保留期的分区"""
+    from app.services.log_partition_service import LogPartitionService
+    for table_name, stats in LogPartitionService.maintain(dry_run=dry_run).items():
+        click.echo(f'{table_name}: {stats}')
+
+
+@click.command('job-worker')
+@click.option('--workers', default=None, type=int, help='工作线程数，默认使用JOB_WORKERS配置')
+@click.option('--burst', is_flag=True, help='执行完已到期的任务后退出')
+@with_appcontext
+def job_worker_command(workers, burst):
+    """运行独立的后台任务工作进程"""
+    import os
+    from flask import current_app
+    from app.services.job_queue import JobQueue, JobWorkerPool
+
+    JobQueue.recover_stale()
+    if burst:
+        count = JobQueue.run_pending(f'cli:{os.getpid()}')
+        click.echo(f'执行了{count}个任务')
+        return
+
+    pool = JobWorkerPool(
+        current_app._get_current_object(),
+        workers=workers or current_app.config.get('JOB_WORKERS', 2),
+        poll_interval=current_app.config.get('JOB_POLL_INTERVAL', 2)
+    )
+    pool.start()
+    click.echo(f'任务工作进程已启动（{pool.workers}个线程），按Ctrl+C退出')
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        click.echo('正在停止，等待执行中的任务完成...')
+        pool.stop(timeout=60)
+
+
+@click.command('job-retry')
+@click.option('--document-id', default=None, type=int, help='只重试该文档的任务')
+@with_appcontext
+def job_retry_command(document_id):
+    """将失败的后台任务重新排队"""
+    from app.services.job_queue import JobQueue
+    count = JobQueue.retry_failed(document_id)
+    click.echo(f'已重新排队{count}个任务，由工作进程执行')
+
+
+@click.command('upload-quota-rebuild')
+@click.option('--user-id', type=int, help='只重建该用户的计数')
+@click.option('--prune/--no-prune', default=True, show_default=True, help='同时删除已结束周期的计数')
+@with_appcontext
+def upload_quota_rebuild_command(user_id, prune):
+    """按文档表重新统计当前日/周/月的上传配额计数"""
+    from app.services.upload_quota_service import UploadQuotaService
+    count = UploadQuotaService.rebuild(user_id=user_id)
+    click.echo(f'上传配额计数重建完成，共写入{count}条计数')
+    if prune:
+        click.echo(f'已删除{UploadQuotaService.prune()}条过期计数')
+
+
+@click.command('version-compact')
+@click.option('--document-id', type=int, help='只压缩该文档的版本')
+@with_appcontext
+def version_compact_command(document_id):
+    """将文档版本改写为“快照 + 差异”存储（升级后转换旧版本，或修改VERSION_SNAPSHOT_INTERVAL后执行）"""
+    from app.services.document_version_service import DocumentVersionService
+    if document_id:
+        result = DocumentVersionService.compact(document_id)
+        click.echo(f"共{result['versions']}个版本，改写{result['rewritten']}个，"
+                   f"存储大小 {result['size_before']} -> {result['size_after']} 字节")
+    else:
+        count = DocumentVersionService.compact_all()
+        click.echo(f'版本压缩完成，{count}个文档的版本被改写')
+
+
+def register_commands(app):
+    """注册Flask命令行工具"""
+    app.cli.add_command(search_reindex_command)
+    app.cli.add_command(upload_cleanup_command)
+    app.cli.add_command(document_hash_backfill_command)
+    app.cli.add_command(storage_dedupe_command)
+    app.cli.add_command(storage_relayout_command)
+    app.cli.add_command(storage_reconcile_command)
+    app.cli.add_command(category_closure_rebuild_command)
+    app.cli.add_command(log_stats_rollup_command)
+    app.cli.add_command(access_rollup_command)
+    app.cli.add_command(log_partition_enable_command)
+    app.cli.add_command(log_partition_maintain_command)
+    app.cli.add_command(job_worker_command)
+    app.cli.add_command(job_retry_command)
+    app.cli.add_command(upload_quota_rebuild_command)
+    app.cli.add_command(version_compact_command)
@@ -13,8 +13,23 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'your-secret-key-here'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     
+    # 角色权限缓存有效期（秒），多进程部署时权限变更最长在此时间内生效
+    PERMISSION_CACHE_TTL = 60
+    
+    # 令牌权限声明配置：claims模式下读接口直接使用令牌中的权限声明鉴权，声明版本过期时回退到数据库校验
+    AUTH_PERMISSION_MODE = 'claims'  # claims/database
+    AUTH_VERSION_STORE = 'sqlite'  # sqlite（同主机多进程共享）/memory（仅单进程）
+    AUTH_VERSION_DB = None  # 权限版本表SQLite文件路径，默认位于系统临时目录
+    AUTH_VERSION_CACHE_TTL = 2  # 版本表读取缓存（秒），禁用用户和权限变更最迟在此时间后生效
+    
     # 文件上传配置
     MAX_CONTENT_LENGTH = 500 * 1024 * 1024  # 500MB
+    
+    # 分片上传配置
+    UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024  # 默认分片大小5MB
+    UPLOAD_MIN_CHUNK_SIZE = 256 * 1024
+    UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+    UPLOAD_SESSION_EXPIRES = timedelta(hours=24)  # 未完成的上传会话保留时间
     ALLOWED_EXTENSIONS = {
         'pdf', 'dwg', 'dxf', 'psd',  # 版式文件
         'doc', 'docx', 'md', 'txt'    # 流式文件
@@ -24,12 +39,97 @@ class Config:
     FTP_ROOT = 'D:\\test\\FTP'
     FTP_STORAGE_PATH = FTP_ROOT
     
-    # 用户上传限制
+    # 预览缓存配置（Word等需解析的文件）
+    PREVIEW_CACHE_DIR = None  # 默认为存储根目录下的preview_cache目录
+    PREVIEW_CACHE_MAX_SIZE = 200 * 1024 * 1024  # 200MB，超出后按LRU淘汰
+    
+    # 分页配置
+    PAGINATION_COUNT_LIMIT = 10000  # count=approx时最多统计的行数
+    
+    # 访问日志异步批量写入配置
+    ACCESS_LOG_ASYNC = True  # 关闭时在请求中同步写入
+    ACCESS_LOG_BATCH_SIZE = 200  # 每批最多写入的日志条数
+    ACCESS_LOG_FLUSH_INTERVAL = 500  # 最长写入间隔（毫秒）
+    ACCESS_LOG_QUEUE_SIZE = 10000  # 队列上限，超过时丢弃并计数
+    
+    # 访问日志统计汇总配置
+    LOG_STATS_DAYS = 30  # 首次汇总时回填的天数
+    LOG_STATS_REFRESH_INTERVAL = 300  # 统计接口发现汇总结果超过此秒数未更新时在后台重新汇总
+    
+    # 访问分析汇总配置（按文档、用户、操作类型的小时/天汇总）
+    ACCESS_ROLLUP_LAG = 60  # 只汇总写入超过此秒数的访问日志
+    ACCESS_ROLLUP_INTERVAL = 300  # 分析接口发现超过此秒数未汇总时在后台增量汇总
+    ACCESS_ROLLUP_HOURLY_DAYS = 31  # 小时汇总保留天数
+    
+    # 日志分区与归档配置（access_logs、system_logs按月分区）
+    LOG_RETENTION_MONTHS = {'access_logs': 12, 'system_logs': 36}  # 各表保留月数，过期分区归档后删除，未配置的表不归档
+    LOG_ARCHIVE_DIR = None  # 归档目录，默认为存储根目录下的log_archive目录
+    LOG_PARTITION_PREMAKE_MONTHS = 3  # MySQL预建的未来分区月数
+    LOG_PARTITION_HOT_MONTHS = 2  # SQLite等不支持分区的数据库中，主表保留的月数，更早的日志按月移入分表
+    
+    # 后台任务队列配置（上传后的哈希计算、文本提取、预览缓存）
+    JOB_QUEUE_MODE = 'thread'  # thread（进程内工作线程）/external（仅由flask job-worker执行）/sync（提交后立即在当前线程执行）
+    JOB_WORKERS = 2  # 进程内工作线程数
+    JOB_POLL_INTERVAL = 2  # 空闲时轮询任务表的间隔（秒）
+    JOB_MAX_ATTEMPTS = 5  # 最大执行次数
+    JOB_RETRY_BASE_DELAY = 5  # 重试退避基数（秒），第n次失败后等待base*2^(n-1)秒
+    JOB_RETRY_MAX_DELAY = 600  # 最长重试间隔（秒）
+    JOB_LOCK_TIMEOUT = 600  # 任务领取后超过此秒数未完成视为工作进程异常退出，重新排队
+    
+    # 文档列表缓存配置（文档或分类变更后递增代数使缓存失效）
+    LIST_CACHE_ENABLED = True
+    LIST_CACHE_BACKEND = 'memory'  # memory（进程内LRU，仅单进程）/sqlite（进程内LRU + 本地SQLite文件，同主机多进程共享）
+    LIST_CACHE_DB = None  # 共享缓存SQLite文件路径，默认位于系统临时目录
+    LIST_CACHE_MAX_ENTRIES = 1000  # 进程内最多缓存的结果数
+    LIST_CACHE_TTL = 60  # 缓存有效期（秒），用户名等不触发失效的变更最迟在此时间后生效
+    LIST_CACHE_GENERATION_TTL = 1  # sqlite模式下代数读取缓存（秒），其他进程的变更最迟在此时间后生效
+    
+    # 文档查看次数写回数据库的间隔（秒）
+    VIEW_COUNT_FLUSH_INTERVAL = 5
+    
+    # 内容寻址存储配置（相同内容的文件只保存一份）
+    BLOB_STORE_ENABLED = True
+    BLOB_STORE_DIR = 'blobs'  # 相对FTP_STORAGE_PATH的目录
+    
+    # 存储路径策略（未启用内容寻址存储时使用）：flat/date/hash/date_hash
+    STORAGE_PATH_STRATEGY = 'date_hash'
+    
+    # 文件下载配置
+    DOWNLOAD_SENDFILE_MODE = 'direct'  # direct/x-sendfile/x-accel
+    DOWNLOAD_ACCEL_PREFIX = '/protected/'  # x-accel方式下Nginx内部location前缀，指向FTP_STORAGE_PATH
+    
+    # 请求限流配置（令牌桶，按用户或IP、接口类别分别限流，超过时返回429和Retry-After）
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_BACKEND = 'memory'  # memory（进程内，仅单进程）/sqlite（本地SQLite文件，同主机多进程共享）
+    RATE_LIMIT_DB = None  # 共享令牌桶SQLite文件路径，默认位于系统临时目录
+    RATE_LIMITS = {  # 类别: (桶容量即允许的突发请求数, 每秒补充的令牌数)
+        'read': (120, 10),
+        'heavy_read': (20, 0.5),  # 预览（Word解析）、下载、日志导出
+        'write': (30, 1)
+    }
+    RATE_LIMIT_ENDPOINT_CLASSES = {}  # 按接口（蓝图名.函数名）指定类别，None表示不限流
+    # 应用前的可信反向代理层数：大于0时按X-Forwarded-For/X-Forwarded-Proto获取客户端IP和协议
+    # （未登录请求的限流标识和日志中的IP），0表示直接使用连接地址，未经代理部署时不要设置
+    PROXY_FIX_X_FOR = 0
+    
+    # 用户上传限制（按上传配额计数检查，None表示不限制）
     MAX_UPLOAD_PER_DAY = 20
+    MAX_UPLOAD_PER_WEEK = None
+    MAX_UPLOAD_PER_MONTH = None
+    UPLOAD_QUOTA_RETENTION_DAYS = 90  # 已结束周期的计数保留天数
     
     # 文档编辑自动保存间隔（秒）
     AUTO_SAVE_INTERVAL = 30
     
+    # 文档版本存储配置（完整快照 + 逐版本压缩差异）
+    VERSION_SNAPSHOT_INTERVAL = 20  # 每N个版本保存一个完整快照，还原任一版本最多应用N-1个差异
+    VERSION_CACHE_MAX_SIZE = 32 * 1024 * 1024  # 还原后的版本内容缓存上限（字符）
+    VERSION_COMPACT_DELAY = 300  # 保存了计划外快照后，延迟此秒数执行版本压缩任务
+    
+    # 全文检索配置
+    SEARCH_BACKEND = 'auto'  # auto/mysql/inverted/like，auto时MySQL使用FULLTEXT索引，其他数据库使用倒排索引表
+    SEARCH_CONTENT_MAX_LENGTH = 20000  # 流式文件入库并参与检索的最大文本长度（字符）
+    
     # CORS配置
     CORS_HEADERS = 'Content-Type, Authorization'
 
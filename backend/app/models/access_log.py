@@ -17,4 +17,5 @@ class AccessLog(db.Model):
     # 索引，提高查询效率
     __table_args__ = (
         db.Index('idx_user_document_time', 'user_id', 'document_id', 'created_at'),
+        db.Index('idx_document_time', 'document_id', 'created_at'),
     )
\ No newline at end of file
@@ -0,0 +1,15 @@
+from app.models import db
+
+
+class CategoryClosure(db.Model):
+    """分类闭包表：记录每个分类与其所有祖先（含自身）的关系，用于单次查询子树"""
+    __tablename__ = 'category_closure'
+
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('document_categories.id'), primary_key=True, comment='祖先分类ID')
+    descendant_id = db.Column(db.Integer, db.ForeignKey('document_categories.id'), primary_key=True, comment='后代分类ID')
+    depth = db.Column(db.Integer, nullable=False, default=0, comment='层级距离（自身为0）')
+
+    # 索引，提高查询效率
+    __table_args__ = (
+        db.Index('idx_closure_descendant', 'descendant_id', 'ancestor_id'),
+    )
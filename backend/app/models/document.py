@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy.dialects.mysql import LONGBLOB
 from app.models import db
 
 
@@ -34,26 +35,57 @@ class Document(db.Model):
     creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, comment='创建者ID')
     is_private = db.Column(db.Boolean, default=False, comment='是否私有')
     file_path = db.Column(db.String(500), comment='文件存储路径（FTP）')
+    content_hash = db.Column(db.String(64), index=True, comment='文件内容SHA-256')
     content = db.Column(db.Text, comment='流式文件内容')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
     views_count = db.Column(db.Integer, default=0, comment='查看次数')
+    processing_status = db.Column(db.String(20), default='ready', comment='后台处理状态：pending/processing/ready/failed')
     
     # 关系
     versions = db.relationship('DocumentVersion', backref='document', lazy='dynamic', order_by='DocumentVersion.version_num.desc()')
     annotations = db.relationship('Annotation', backref='document', lazy='dynamic')
     favorites = db.relationship('UserFavorite', lazy='dynamic')
     access_logs = db.relationship('AccessLog', backref='document', lazy='dynamic')
+    
+    # 列表按(created_at, id)倒序分页，常用筛选条件在前、created_at在后，
+    # 可按索引顺序读取并在取满一页后停止，无需排序；InnoDB和SQLite的二级索引隐含主键id
+    __table_args__ = (
+        db.Index('idx_document_created', 'created_at'),
+        db.Index('idx_document_creator_created', 'creator_id', 'created_at'),
+        db.Index('idx_document_private_created', 'is_private', 'created_at'),
+        db.Index('idx_document_category_created', 'category_id', 'created_at'),
+        db.Index('idx_document_type_created', 'file_type', 'created_at'),
+    )
 
 
 class DocumentVersion(db.Model):
-    """文档版本模型"""
+    """文档版本模型 - 定期保存完整快照，其余版本只保存相对上一版本的压缩差异"""
     __tablename__ = 'document_versions'
     
     id = db.Column(db.Integer, primary_key=True)
     document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=False, comment='文档ID')
     version_num = db.Column(db.Integer, nullable=False, comment='版本号')
-    content = db.Column(db.Text, comment='版本内容')
+    content = db.Column(db.Text, comment='版本内容（旧版未压缩的完整内容，压缩后清空）')
+    storage = db.Column(db.String(10), comment='存储方式：full（压缩的完整快照）/delta（相对上一版本的压缩差异），为空时读取content')
+    data = db.Column(db.LargeBinary().with_variant(LONGBLOB(), 'mysql'), comment='压缩后的快照或差异')
+    content_size = db.Column(db.Integer, comment='版本内容长度（字符）')
+    stored_size = db.Column(db.Integer, comment='实际存储的字节数')
+    content_digest = db.Column(db.String(64), comment='版本内容的SHA-256摘要，保存差异前校验缓存的上一版本内容')
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, comment='创建者ID')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
-    description = db.Column(db.String(200), comment='版本说明')
\ No newline at end of file
+    description = db.Column(db.String(200), comment='版本说明')
+    
+    __table_args__ = (
+        db.UniqueConstraint('document_id', 'version_num', name='uq_document_version_num'),
+    )
+
+# MySQL下为标题、描述和内容建立ngram全文索引（支持中文分词），其他数据库使用倒排索引表
+db.event.listen(
+    Document.__table__,
+    'after_create',
+    db.DDL(
+        'ALTER TABLE documents ADD FULLTEXT INDEX ft_documents_text '
+        '(title, description, content) WITH PARSER ngram'
+    ).execute_if(dialect='mysql')
+)
@@ -0,0 +1,13 @@
+from datetime import datetime
+from app.models import db
+
+
+class FileBlob(db.Model):
+    """内容寻址文件块模型：相同内容的文件只存储一份，按引用计数回收"""
+    __tablename__ = 'file_blobs'
+
+    hash = db.Column(db.String(64), primary_key=True, comment='文件内容SHA-256')
+    path = db.Column(db.String(500), nullable=False, comment='文件块相对路径')
+    size = db.Column(db.BigInteger, comment='文件大小（字节）')
+    ref_count = db.Column(db.Integer, nullable=False, default=0, comment='引用此文件块的文档数')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
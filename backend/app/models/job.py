@@ -0,0 +1,26 @@
+from datetime import datetime
+from app.models import db
+
+
+class Job(db.Model):
+    """后台任务模型 - 持久化任务队列，由任务工作线程或独立工作进程领取执行"""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, comment='任务类型')
+    document_id = db.Column(db.Integer, index=True, comment='关联文档ID')
+    payload = db.Column(db.Text, comment='任务参数（JSON格式）')
+    status = db.Column(db.String(20), nullable=False, default='pending', comment='状态：pending/running/succeeded/failed')
+    attempts = db.Column(db.Integer, nullable=False, default=0, comment='已执行次数')
+    max_attempts = db.Column(db.Integer, nullable=False, default=5, comment='最大执行次数')
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='最早执行时间（重试退避）')
+    locked_by = db.Column(db.String(100), comment='执行中的工作线程')
+    locked_at = db.Column(db.DateTime, comment='领取时间')
+    last_error = db.Column(db.Text, comment='最近一次失败原因')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
+    finished_at = db.Column(db.DateTime, comment='完成时间')
+
+    __table_args__ = (
+        db.Index('idx_job_status_run_at', 'status', 'run_at'),
+    )
+
@@ -0,0 +1,62 @@
+from datetime import datetime
+from app.models import db
+
+
+class AccessLogDailyStat(db.Model):
+    """访问日志按天、操作类型的汇总表（由统计汇总任务维护）"""
+    __tablename__ = 'access_log_daily_stats'
+
+    day = db.Column(db.Date, primary_key=True, comment='日期')
+    action_type = db.Column(db.String(20), primary_key=True, comment='操作类型')
+    count = db.Column(db.Integer, nullable=False, default=0, comment='访问次数')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, comment='汇总时间')
+
+
+class AccessLogDailyUser(db.Model):
+    """访问日志按天的活跃用户表（用于统计一段时间内的去重活跃用户数）"""
+    __tablename__ = 'access_log_daily_users'
+
+    day = db.Column(db.Date, primary_key=True, comment='日期')
+    user_id = db.Column(db.Integer, primary_key=True, comment='用户ID')
+
+
+class AccessRollupHourly(db.Model):
+    """访问日志按小时汇总表（按文档、用户、操作类型）"""
+    __tablename__ = 'access_rollup_hourly'
+
+    bucket = db.Column(db.DateTime, primary_key=True, comment='小时（整点）')
+    document_id = db.Column(db.Integer, primary_key=True, comment='文档ID')
+    user_id = db.Column(db.Integer, primary_key=True, comment='用户ID')
+    action_type = db.Column(db.String(20), primary_key=True, comment='操作类型')
+    count = db.Column(db.Integer, nullable=False, default=0, comment='访问次数')
+
+    # 索引，提高查询效率
+    __table_args__ = (
+        db.Index('idx_rollup_hourly_document', 'document_id', 'bucket'),
+    )
+
+
+class AccessRollupDaily(db.Model):
+    """访问日志按天汇总表（按文档、用户、操作类型）"""
+    __tablename__ = 'access_rollup_daily'
+
+    day = db.Column(db.Date, primary_key=True, comment='日期')
+    document_id = db.Column(db.Integer, primary_key=True, comment='文档ID')
+    user_id = db.Column(db.Integer, primary_key=True, comment='用户ID')
+    action_type = db.Column(db.String(20), primary_key=True, comment='操作类型')
+    count = db.Column(db.Integer, nullable=False, default=0, comment='访问次数')
+
+    # 索引，提高查询效率
+    __table_args__ = (
+        db.Index('idx_rollup_daily_document', 'document_id', 'day'),
+        db.Index('idx_rollup_daily_user', 'user_id', 'day'),
+    )
+
+
+class RollupWatermark(db.Model):
+    """汇总任务水位：记录已汇总到的最大日志ID，下次从此处继续"""
+    __tablename__ = 'rollup_watermarks'
+
+    name = db.Column(db.String(50), primary_key=True, comment='汇总任务名称')
+    last_id = db.Column(db.BigInteger, nullable=False, default=0, comment='已汇总的最大日志ID')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
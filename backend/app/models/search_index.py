@@ -0,0 +1,17 @@
+from app.models import db
+
+
+class SearchTerm(db.Model):
+    """文档全文检索倒排索引模型（词项 -> 文档）"""
+    __tablename__ = 'search_terms'
+
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(64), nullable=False, comment='词项')
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=False, comment='文档ID')
+    weight = db.Column(db.Float, nullable=False, default=0, comment='词项权重（标题>描述>内容）')
+
+    # 索引，提高查询效率
+    __table_args__ = (
+        db.Index('idx_term_document', 'term', 'document_id'),
+        db.Index('idx_search_document', 'document_id'),
+    )
@@ -0,0 +1,18 @@
+from datetime import datetime
+from app.models import db
+
+
+class StorageStat(db.Model):
+    """存储统计聚合模型：按维度累计文档数和文件大小，随文档增删改实时更新"""
+    __tablename__ = 'storage_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(20), nullable=False, comment='统计维度：total/document_type/category/user/disk')
+    key = db.Column(db.String(64), nullable=False, comment='维度取值（文档类型、分类ID、用户ID等）')
+    document_count = db.Column(db.BigInteger, nullable=False, default=0, comment='文档数')
+    total_size = db.Column(db.BigInteger, nullable=False, default=0, comment='文件总大小（字节）')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+
+    __table_args__ = (
+        db.UniqueConstraint('dimension', 'key', name='uq_storage_stat_dimension_key'),
+    )
@@ -0,0 +1,18 @@
+from datetime import datetime
+from app.models import db
+
+
+class UploadQuota(db.Model):
+    """上传配额计数模型：按用户、统计周期（日/周/月）累计上传数，随文档创建在同一事务中递增"""
+    __tablename__ = 'upload_quotas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, comment='用户ID')
+    period = db.Column(db.String(10), nullable=False, comment='统计周期：day/week/month')
+    period_start = db.Column(db.Date, nullable=False, comment='周期开始日期（本地时间）')
+    count = db.Column(db.Integer, nullable=False, default=0, comment='周期内上传数')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'period', 'period_start', name='uq_upload_quota_user_period'),
+    )
@@ -0,0 +1,56 @@
+from datetime import datetime
+from app.models import db
+
+
+class UploadSession(db.Model):
+    """分片上传会话模型"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True, comment='上传会话ID')
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, comment='上传用户ID')
+    original_filename = db.Column(db.String(255), nullable=False, comment='原始文件名')
+    file_type = db.Column(db.String(50), nullable=False, comment='文件类型：layout/flow')
+    file_size = db.Column(db.BigInteger, nullable=False, comment='文件总大小（字节）')
+    chunk_size = db.Column(db.Integer, nullable=False, comment='分片大小（字节）')
+    total_chunks = db.Column(db.Integer, nullable=False, comment='分片总数')
+    file_path = db.Column(db.String(500), nullable=False, comment='最终文件相对路径')
+    file_name = db.Column(db.String(255), nullable=False, comment='存储文件名')
+    checksum = db.Column(db.String(64), comment='整个文件的SHA-256（可选）')
+    title = db.Column(db.String(200), comment='文档标题')
+    description = db.Column(db.Text, comment='文档描述')
+    category_id = db.Column(db.Integer, db.ForeignKey('document_categories.id'), comment='分类ID')
+    is_private = db.Column(db.Boolean, default=False, comment='是否私有')
+    status = db.Column(db.String(20), nullable=False, default='uploading', comment='状态：uploading/completed/aborted')
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), comment='完成后生成的文档ID')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+
+    # 关系
+    chunks = db.relationship('UploadChunk', backref='session', lazy='dynamic', cascade='all, delete-orphan')
+
+    # 索引，提高查询效率
+    __table_args__ = (
+        db.Index('idx_upload_user_status', 'user_id', 'status'),
+    )
+
+    @property
+    def part_path(self):
+        """上传过程中的临时文件路径（与最终文件位于同一目录，完成后原子重命名）"""
+        return f'{self.file_path}.part'
+
+
+class UploadChunk(db.Model):
+    """已接收的上传分片模型"""
+    __tablename__ = 'upload_chunks'
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(32), db.ForeignKey('upload_sessions.id'), nullable=False, comment='上传会话ID')
+    chunk_index = db.Column(db.Integer, nullable=False, comment='分片序号（从0开始）')
+    size = db.Column(db.Integer, nullable=False, comment='分片大小（字节）')
+    checksum = db.Column(db.String(64), nullable=False, comment='分片SHA-256')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='接收时间')
+
+    # 复合唯一约束，同一分片只记录一次
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'chunk_index', name='_session_chunk_uc'),
+    )
@@ -7,6 +7,7 @@ from app.routes.annotations import annotations_bp
 from app.routes.favorites import favorites_bp
 from app.routes.system_logs import system_logs_bp
 from app.routes.overview import overview_bp
+from app.routes.uploads import uploads_bp
 
 # 导出所有蓝图
-__all__ = ['auth_bp', 'users_bp', 'documents_bp', 'categories_bp', 'annotations_bp', 'favorites_bp', 'system_logs_bp', 'overview_bp']
\ No newline at end of file
+__all__ = ['auth_bp', 'users_bp', 'documents_bp', 'categories_bp', 'annotations_bp', 'favorites_bp', 'system_logs_bp', 'overview_bp', 'uploads_bp']
\ No newline at end of file
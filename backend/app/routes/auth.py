@@ -4,7 +4,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import timedelta
 from app.models import db
 from app.models.user import User, Role
-from app.utils.auth import verify_permission
+from app.utils.auth import verify_permission, build_permission_claims
 
 # 创建蓝图
 auth_bp = Blueprint('auth', __name__)
@@ -69,14 +69,16 @@ def login():
         if not user.status:
             return jsonify({'message': '账号已被禁用'}), 403
         
-        # 创建访问令牌
+        # 创建访问令牌（携带角色、权限位掩码和权限版本号，读接口可免查库鉴权）
+        additional_claims = {
+            'role': user.role.name,
+            'username': user.username
+        }
+        additional_claims.update(build_permission_claims(user))
         access_token = create_access_token(
             identity=str(user.id),
             expires_delta=timedelta(days=1),
-            additional_claims={
-                'role': user.role.name,
-                'username': user.username
-            }
+            additional_claims=additional_claims
         )
         
         # 获取用户权限
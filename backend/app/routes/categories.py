@@ -2,7 +2,10 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from app.models import db
 from app.models.document import Document, DocumentCategory
-from app.utils.auth import verify_permission
+from app.utils.auth import verify_permission, get_current_user
+from app.utils.pagination import paginate_query
+from app.services.document_query import document_list_query
+from app.services.category_service import CategoryService
 
 # 创建蓝图
 categories_bp = Blueprint('categories', __name__)
@@ -16,6 +19,10 @@ def get_categories():
         # 获取所有分类
         categories = DocumentCategory.query.order_by(DocumentCategory.created_at.desc()).all()
         
+        # 文档数读取物化的分类统计（一次查询），并沿父分类汇总
+        direct_counts = CategoryService.get_document_counts()
+        total_counts = CategoryService.rollup_counts(categories, direct_counts)
+        
         # 构建分类列表
         category_list = []
         
@@ -25,7 +32,9 @@ def get_categories():
                 'id': cat.id,
                 'name': cat.name,
                 'description': cat.description,
-                'document_count': Document.query.filter_by(category_id=cat.id).count(),
+                'parent_id': cat.parent_id,
+                'document_count': direct_counts.get(cat.id, 0),
+                'total_document_count': total_counts.get(cat.id, 0),
                 'created_at': cat.created_at.isoformat()
             })
         
@@ -35,6 +44,19 @@ def get_categories():
         return jsonify({'message': f'获取分类列表失败: {str(e)}'}), 500
 
 
+@categories_bp.route('/tree', methods=['GET'])
+@jwt_required()
+def get_category_tree():
+    """获取完整分类树（含各节点及其子分类的文档数）"""
+    try:
+        categories = DocumentCategory.query.order_by(DocumentCategory.id).all()
+        tree = CategoryService.build_tree(categories, CategoryService.get_document_counts())
+        return jsonify({'categories': tree})
+    
+    except Exception as e:
+        return jsonify({'message': f'获取分类树失败: {str(e)}'}), 500
+
+
 @categories_bp.route('/', methods=['POST'])
 @jwt_required()
 @verify_permission('category_manage')
@@ -55,13 +77,23 @@ def create_category():
         if DocumentCategory.query.filter_by(name=data['name']).first():
             return jsonify({'message': '分类名称已存在'}), 400
         
+        # 检查父分类是否存在
+        parent_id = data.get('parent_id')
+        if parent_id is not None and not DocumentCategory.query.get(parent_id):
+            return jsonify({'message': '父分类不存在'}), 400
+        
         # 创建分类
         category = DocumentCategory(
             name=data['name'],
-            description=data.get('description', '')
+            description=data.get('description', ''),
+            parent_id=parent_id
         )
         
         db.session.add(category)
+        db.session.flush()
+        
+        # 维护分类闭包表
+        CategoryService.add_to_closure(category)
         db.session.commit()
         
         return jsonify({
@@ -70,6 +102,7 @@ def create_category():
                 'id': category.id,
                 'name': category.name,
                 'description': category.description,
+                'parent_id': category.parent_id,
                 'created_at': category.created_at.isoformat()
             }
         }), 201
@@ -106,6 +139,14 @@ def update_category(category_id):
         if 'description' in data:
             category.description = data['description']
         
+        # 移动到新的父分类（同步维护闭包表）
+        if 'parent_id' in data:
+            try:
+                CategoryService.move_category(category, data['parent_id'])
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'message': str(e)}), 400
+        
         db.session.commit()
         
         return jsonify({
@@ -114,6 +155,7 @@ def update_category(category_id):
                 'id': category.id,
                 'name': category.name,
                 'description': category.description,
+                'parent_id': category.parent_id,
                 'created_at': category.created_at.isoformat(),
                 'updated_at': category.updated_at.isoformat()
             }
@@ -140,6 +182,11 @@ def delete_category(category_id):
         if document_count > 0:
             return jsonify({'message': f'该分类下还有{document_count}个文档，不能删除'}), 400
         
+        # 检查是否有子分类
+        if DocumentCategory.query.filter_by(parent_id=category_id).first():
+            return jsonify({'message': '该分类下还有子分类，不能删除'}), 400
+        
+        CategoryService.remove_from_closure(category_id)
         db.session.delete(category)
         db.session.commit()
         
@@ -164,12 +211,20 @@ def get_category_documents(category_id):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        # 构建查询
-        query = Document.query.filter_by(category_id=category_id)
+        # 构建查询（非管理员只能看到自己的文档和公开文档）
+        # include_children=true时包含所有子分类下的文档（基于闭包表，单次查询）
+        query = document_list_query(get_current_user())
+        if request.args.get('include_children', 'false').lower() == 'true':
+            query = query.filter(Document.category_id.in_(CategoryService.subtree_ids(category_id)))
+        else:
+            query = query.filter(Document.category_id == category_id)
         
-        # 执行查询
-        pagination = query.order_by(Document.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        # 执行查询（传入cursor时使用游标分页）
+        pagination = paginate_query(
+            query, Document.created_at, Document.id,
+            page=page, per_page=per_page,
+            cursor=request.args.get('cursor'),
+            count_mode=request.args.get('count')
         )
         
         # 构建响应
@@ -180,19 +235,24 @@ def get_category_documents(category_id):
                 'title': doc.title,
                 'description': doc.description,
                 'file_type': doc.file_type,
-                'file_name': doc.original_filename,
+                'file_name': doc.file_name,
                 'file_size': doc.file_size,
-                'user_id': doc.user_id,
-                'username': doc.user.username,
+                'user_id': doc.creator_id,
+                'username': doc.username or '',
                 'created_at': doc.created_at.isoformat()
             })
         
         return jsonify({
             'documents': documents,
             'total': pagination.total,
-            'page': page,
-            'per_page': per_page
+            'total_is_estimate': pagination.total_is_estimate,
+            'page': pagination.page,
+            'per_page': pagination.per_page,
+            'next_cursor': pagination.next_cursor,
+            'has_more': pagination.has_more
         })
     
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'获取分类文档失败: {str(e)}'}), 500
\ No newline at end of file
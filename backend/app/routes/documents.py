@@ -1,14 +1,28 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from sqlalchemy.orm import defer
 from app.models import db
 from app.models.document import Document, DocumentVersion, DocumentCategory as Category
 from app.models.access_log import AccessLog
-from app.utils.auth import verify_permission, get_current_user, check_document_permission
-from app.utils.file_handler import get_file_type, save_uploaded_file, delete_file, get_file_path, check_file_size, get_file_size
+from app.utils.auth import verify_permission, get_current_user, get_request_user, check_document_permission
+from app.utils.file_handler import get_file_type, save_uploaded_file, delete_file, get_file_path, check_file_size, get_file_size, update_uploaded_file
 from app.utils.limiter import check_upload_limit
+from app.services.upload_quota_service import UploadLimitExceeded
+from app.utils.pagination import paginate_query
+from app.utils.text_extractor import read_text_file, TEXT_EXTENSIONS
+from app.utils import preview_cache, blob_store, list_cache
+from app.utils.file_sender import send_document_file
 from app.services.log_service import LogService
-import docx
+from app.services.search_service import SearchService
+from app.services.document_version_service import DocumentVersionService
+from app.services.document_service import DocumentService
+from app.services.job_queue import JobQueue, serialize_job
+from app.services.view_counter import ViewCountService
+from app.services.category_service import CategoryService
+from app.services.access_rollup_service import AccessRollupService
+from app.services.log_partition_service import LogPartitionService
+from app.services.document_query import document_list_query, serialize_document_row
 
 # 创建蓝图
 documents_bp = Blueprint('documents', __name__)
@@ -32,67 +46,65 @@ def get_documents():
         category_id = request.args.get('category_id', type=int)
         file_type = request.args.get('file_type')
         is_my_documents = request.args.get('is_my_documents', type=bool)
+        include_children = request.args.get('include_children', 'false').lower() == 'true'
+        cursor = request.args.get('cursor')
+        count_mode = request.args.get('count')
         
-        # 构建查询
-        query = Document.query
-        
-        # 如果不是管理员，只能看到自己的文档和公开文档
-        if user.role.name != 'admin':
-            query = query.filter(
-                (Document.creator_id == user.id) | (Document.is_private == False)
-            )
-        
-        # 如果指定了只看自己的文档
-        if is_my_documents:
-            query = query.filter(Document.creator_id == user.id)
-        
-        # 关键词搜索
-        if keyword:
-            query = query.filter(
-                (Document.title.like(f'%{keyword}%')) | (Document.description.like(f'%{keyword}%'))
+        def compute():
+            # 构建查询（非管理员只能看到自己的文档和公开文档）
+            query = document_list_query(user)
+            
+            # 如果指定了只看自己的文档
+            if is_my_documents:
+                query = query.filter(Document.creator_id == user.id)
+            
+            # 关键词搜索（全文检索，按相关度排序）
+            score = None
+            if keyword:
+                query, score = SearchService.filter_query(query, keyword)
+            
+            # 分类筛选（include_children=true时包含所有子分类，基于闭包表单次查询）
+            if category_id:
+                if include_children:
+                    query = query.filter(Document.category_id.in_(CategoryService.subtree_ids(category_id)))
+                else:
+                    query = query.filter(Document.category_id == category_id)
+            
+            # 文件类型筛选
+            if file_type:
+                query = query.filter(Document.file_type == file_type)
+            
+            # 执行查询（传入cursor时使用游标分页，按时间排序）
+            pagination = paginate_query(
+                query, Document.created_at, Document.id,
+                page=page, per_page=per_page,
+                cursor=cursor,
+                count_mode=count_mode,
+                order_by=[score.desc()] if score is not None else None
             )
+            
+            return {
+                'documents': [serialize_document_row(row) for row in pagination.items],
+                'total': pagination.total,
+                'total_is_estimate': pagination.total_is_estimate,
+                'page': pagination.page,
+                'per_page': pagination.per_page,
+                'next_cursor': pagination.next_cursor,
+                'has_more': pagination.has_more
+            }
         
-        # 分类筛选
-        if category_id:
-            query = query.filter(Document.category_id == category_id)
-        
-        # 文件类型筛选
-        if file_type:
-            query = query.filter(Document.file_type == file_type)
-        
-        # 执行查询
-        pagination = query.order_by(Document.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        # 构建响应
-        documents = []
-        for doc in pagination.items:
-            documents.append({
-                'id': doc.id,
-                'title': doc.title,
-                'description': doc.description,
-                'file_path': doc.file_path,
-                'file_name': doc.file_name,
-                'file_type': doc.file_type,
-                'category_id': doc.category_id,
-                'category_name': doc.category.name if doc.category else None,
-                'user_id': doc.creator_id,
-                'username': doc.creator.username if doc.creator else '',
-                'is_private': doc.is_private,
-                'file_size': doc.file_size,
-                'version': 1,  # 默认版本号
-                'created_at': doc.created_at.isoformat(),
-                'updated_at': doc.updated_at.isoformat()
-            })
-        
-        return jsonify({
-            'documents': documents,
-            'total': pagination.total,
-            'page': page,
-            'per_page': per_page
-        })
+        # 按规范化的筛选参数和可见范围缓存结果，文档或分类变更后失效
+        params = {
+            'page': page, 'per_page': per_page, 'keyword': keyword or None, 'category_id': category_id,
+            'include_children': include_children if category_id else False, 'file_type': file_type or None,
+            'is_my_documents': bool(is_my_documents), 'cursor': cursor, 'count': count_mode
+        }
+        return jsonify(list_cache.get_or_compute(
+            'documents', list_cache.visibility_class(user, bool(is_my_documents)), params, compute
+        ))
     
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'获取文档列表失败: {str(e)}'}), 500
 
@@ -114,7 +126,7 @@ def upload_document():
         # 检查上传限制
         print(f"[DEBUG] 检查上传限制，用户ID: {user.id}")
         if not check_upload_limit(user.id):
-            return jsonify({'message': '今日上传文件数量已达上限'}), 403
+            return jsonify({'message': '上传文件数量已达上限'}), 403
         
         # 获取上传的文件
         file = request.files.get('file')
@@ -172,35 +184,29 @@ def upload_document():
         print(f"[DEBUG] 表单数据: title={title}, category_id={category_id}, is_private={is_private}")
         
         # 创建文档记录
-        document = Document(
-            title=title,
-            description=description,
+        document = DocumentService.create_document(
+            user,
             file_path=file_path,
-            file_name=unique_filename,
+            unique_filename=unique_filename,
+            original_filename=file.filename,
             file_type=file_type,
+            file_size=file_size,
+            title=title,
+            description=description,
             category_id=category_id,
-            creator_id=user.id,
             is_private=is_private,
-            file_size=file_size,
-            document_type=file_type  # 使用文件类型作为文档类型
+            request=request
         )
         
-        db.session.add(document)
-        db.session.commit()
-        
-        # 记录访问日志
-        log = AccessLog(
-            user_id=user.id,
-            document_id=document.id,
-            action_type='upload',
-            ip_address=request.remote_addr,
-            user_agent=request.user_agent.string
-        )
-        db.session.add(log)
-        db.session.commit()
-        
         return jsonify({'message': '文档上传成功', 'document_id': document.id}), 201
     
+    except UploadLimitExceeded as e:
+        # 并发上传时提前检查通过、入库时配额已被占满：回滚后删除刚保存的文件
+        # （内容寻址存储的引用计数随事务回滚，未引用的文件由storage-reconcile清理）
+        db.session.rollback()
+        if not blob_store.is_blob_path(file_path):
+            delete_file(file_path)
+        return jsonify({'message': str(e)}), 403
     except Exception as e:
         db.session.rollback()
         print(f"[ERROR] 上传失败: {str(e)}")
@@ -216,7 +222,7 @@ def get_document(document_id):
     """获取文档详情"""
     try:
         # 获取当前用户
-        user = get_current_user()
+        user = get_request_user()
         
         # 查找文档
         document = Document.query.get(document_id)
@@ -227,19 +233,8 @@ def get_document(document_id):
         if not check_document_permission(user, document):
             return jsonify({'message': '无权限访问此文档'}), 403
         
-        # 记录文档访问日志
-        LogService.log_document_access(user, document, request)
-        
-        # 记录访问日志到数据库
-        log = AccessLog(
-            user_id=user.id,
-            document_id=document.id,
-            action_type='view',
-            ip_address=request.remote_addr,
-            user_agent=request.user_agent.string
-        )
-        db.session.add(log)
-        db.session.commit()
+        # 记录文档访问日志（异步批量写入）
+        LogService.log_document_access(user, document, 'view', request)
         
         # 返回文档信息
         return jsonify({
@@ -259,6 +254,7 @@ def get_document(document_id):
                 'file_size': document.file_size,
                 'version': 1,  # 默认版本号,
                 'content': document.content,  # 仅流式文件有内容
+                'processing_status': document.processing_status,
                 'created_at': document.created_at.isoformat(),
                 'updated_at': document.updated_at.isoformat()
             }
@@ -275,7 +271,7 @@ def preview_document(document_id):
     """预览文档内容"""
     try:
         # 获取当前用户
-        user = get_current_user()
+        user = get_request_user()
         
         # 查找文档
         document = Document.query.get(document_id)
@@ -293,58 +289,25 @@ def preview_document(document_id):
         if not os.path.exists(file_path):
             return jsonify({'message': '文件不存在'}), 404
         
-        # 记录访问日志
-        log = AccessLog(
-            user_id=user.id,
-            document_id=document.id,
-            action_type='preview',
-            ip_address=request.remote_addr,
-            user_agent=request.user_agent.string
-        )
-        db.session.add(log)
-        db.session.commit()
+        # 记录访问日志（异步批量写入）
+        LogService.log_document_access(user, document, 'preview', request)
         
-        # 增加查看次数
-        document.views_count += 1
-        db.session.commit()
+        # 增加查看次数（内存中累加，定期批量写回数据库）
+        ViewCountService.record_view(document)
         
         # 根据文件扩展名决定返回方式
         _, ext = os.path.splitext(document.file_name.lower())
         
-        # 对于Word文档(.docx)，使用python-docx库解析
+        # 对于Word文档(.docx)，读取预览缓存，未命中时使用python-docx库解析
         if ext == '.docx':
-            try:
-                doc = docx.Document(file_path)
-                content = []
-                # 提取文档中所有段落文本
-                for paragraph in doc.paragraphs:
-                    if paragraph.text.strip():
-                        content.append(paragraph.text)
-                
-                # 提取表格内容
-                for table in doc.tables:
-                    table_content = []
-                    for row in table.rows:
-                        row_text = []
-                        for cell in row.cells:
-                            if cell.text.strip():
-                                row_text.append(cell.text)
-                        if row_text:
-                            table_content.append(' | '.join(row_text))
-                    if table_content:
-                        content.append('\n表格内容:\n' + '\n'.join(table_content))
-                
-                # 合并所有内容，用换行符分隔
-                full_content = '\n\n'.join(content)
-                
+            full_content = preview_cache.get_preview_text(document.file_path, document.file_name)
+            if full_content is not None:
                 return jsonify({
                     'content': full_content,
                     'file_extension': ext,
                     'file_name': document.file_name
                 })
-            except Exception as e:
-                print(f"解析Word文档失败: {e}")
-                # 如果解析失败，继续处理
+            # 如果解析失败，继续处理
         
         # 对于PDF文件，返回预览URL，让前端通过iframe处理
         if ext == '.pdf':
@@ -358,28 +321,15 @@ def preview_document(document_id):
             })
             
         # 对于文本类型的文件，可以直接返回内容
-        if ext in ['.txt', '.md', '.json', '.log', '.csv', '.xml', '.html', '.htm']:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+        if ext in TEXT_EXTENSIONS:
+            # 依次尝试utf-8和gbk编码，都失败时返回文件URL让前端处理
+            content = read_text_file(file_path)
+            if content is not None:
                 return jsonify({
                     'content': content,
                     'file_extension': ext,
                     'file_name': document.file_name
                 })
-            except UnicodeDecodeError:
-                # 如果utf-8解码失败，尝试其他编码
-                try:
-                    with open(file_path, 'r', encoding='gbk') as f:
-                        content = f.read()
-                    return jsonify({
-                        'content': content,
-                        'file_extension': ext,
-                        'file_name': document.file_name
-                    })
-                except:
-                    # 如果都失败，返回文件URL让前端处理
-                    pass
         
         # 对于图片类型的文件，返回预览URL
         if ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']:
@@ -403,6 +353,29 @@ def preview_document(document_id):
     except Exception as e:
         return jsonify({'message': f'预览文档失败: {str(e)}'}), 500
 
+@documents_bp.route('/list-cache/stats', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def get_list_cache_stats():
+    """获取文档列表缓存命中统计 - 管理员专用"""
+    try:
+        return jsonify({'stats': list_cache.get_cache_stats()})
+    
+    except Exception as e:
+        return jsonify({'message': f'获取列表缓存统计失败: {str(e)}'}), 500
+
+@documents_bp.route('/preview-cache/stats', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def get_preview_cache_stats():
+    """获取预览缓存命中统计 - 管理员专用"""
+    try:
+        return jsonify({'stats': preview_cache.get_cache_stats()})
+    
+    except Exception as e:
+        return jsonify({'message': f'获取预览缓存统计失败: {str(e)}'}), 500
+
+
 @documents_bp.route('/<int:document_id>/download', methods=['GET'])
 @jwt_required()
 @verify_permission('view')
@@ -410,7 +383,7 @@ def download_document(document_id):
     """下载文档"""
     try:
         # 获取当前用户
-        user = get_current_user()
+        user = get_request_user()
         
         # 查找文档
         document = Document.query.get(document_id)
@@ -428,19 +401,12 @@ def download_document(document_id):
         if not os.path.exists(file_path):
             return jsonify({'message': '文件不存在'}), 404
         
-        # 记录访问日志
-        log = AccessLog(
-            user_id=user.id,
-            document_id=document.id,
-            action_type='download',
-            ip_address=request.remote_addr,
-            user_agent=request.user_agent.string
-        )
-        db.session.add(log)
-        db.session.commit()
+        # 记录访问日志（异步批量写入）
+        LogService.log_document_access(user, document, 'download', request)
         
         # 返回文件，设置as_attachment为False以便在浏览器中直接显示PDF
-        return send_file(file_path, as_attachment=False, download_name=document.file_name)
+        # 支持Range分段请求，客户端缓存的ETag与文件内容哈希一致时返回304
+        return send_document_file(file_path, document.file_path, document.file_name, etag=document.content_hash)
     
     except Exception as e:
         return jsonify({'message': f'下载文档失败: {str(e)}'}), 500
@@ -481,11 +447,13 @@ def update_document(document_id):
             existing_path = document.file_path
             file_path, unique_filename, file_size = update_uploaded_file(file, file_type, existing_path)
             
-            # 更新文档信息
+            # 更新文档信息，哈希计算、文本提取和预览缓存由后台任务完成
             document.file_path = file_path
             document.file_name = unique_filename
             document.file_type = file_type
             document.file_size = file_size
+            document.content_hash = blob_store.digest_from_path(file_path)
+            DocumentService.enqueue_processing(document, file.filename)
             current_app.logger.debug(f"[DEBUG] 文件更新成功，新路径: {file_path}, 大小: {file_size} 字节")
         
         # 获取请求数据 (支持表单和JSON两种格式)
@@ -506,34 +474,22 @@ def update_document(document_id):
             document.is_private = data['is_private'].lower() == 'true' if isinstance(data['is_private'], str) else bool(data['is_private'])
         
         # 如果是流式文件，可以更新内容
-        if document.file_type == 'stream' and 'content' in data:
-            # 创建版本记录
-            version = DocumentVersion(
-                document_id=document.id,
-                version_num=1,  # 使用正确的字段名
-                content=document.content,
-                created_by=user.id,  # 添加缺少的字段
-                created_at=document.updated_at
-            )
-            db.session.add(version)
+        if document.file_type == 'flow' and 'content' in data and data['content'] != document.content:
+            # 保存修改前的内容为历史版本（快照 + 差异压缩保存）
+            DocumentVersionService.save_version(document, user.id, document.content, created_at=document.updated_at)
             
-            # 更新内容和版本
+            # 更新内容
             document.content = data['content']
-            document.version += 1
         
         document.updated_at = datetime.utcnow()
-        db.session.commit()
         
-        # 记录访问日志
-        log = AccessLog(
-            user_id=user.id,
-            document_id=document.id,
-            action_type='edit',
-            ip_address=request.remote_addr,
-            user_agent=request.user_agent.string
-        )
-        db.session.add(log)
+        # 更新检索索引
+        SearchService.index_document(document)
         db.session.commit()
+        JobQueue.notify()
+        
+        # 记录访问日志（异步批量写入）
+        LogService.log_document_access(user, document, 'edit', request)
         
         return jsonify({'message': '文档更新成功'})
     
@@ -545,6 +501,29 @@ def update_document(document_id):
         return jsonify({'message': f'更新文档失败: {str(e)}'}), 500
 
 
+@documents_bp.route('/<int:document_id>/jobs', methods=['GET'])
+@jwt_required()
+@verify_permission('view')
+def get_document_jobs(document_id):
+    """获取文档的后台处理状态和任务记录"""
+    try:
+        user = get_request_user()
+        document = Document.query.get(document_id)
+        if not document:
+            return jsonify({'message': '文档不存在'}), 404
+        if not check_document_permission(user, document):
+            return jsonify({'message': '无权限访问此文档'}), 403
+        
+        return jsonify({
+            'document_id': document.id,
+            'processing_status': document.processing_status,
+            'jobs': [serialize_job(job) for job in JobQueue.get_document_jobs(document.id)]
+        })
+    
+    except Exception as e:
+        return jsonify({'message': f'获取文档处理状态失败: {str(e)}'}), 500
+
+
 @documents_bp.route('/<int:document_id>', methods=['DELETE'])
 @jwt_required()
 def delete_document(document_id):
@@ -571,11 +550,20 @@ def delete_document(document_id):
         from app.models.user_favorite import UserFavorite
         UserFavorite.query.filter_by(document_id=document_id).delete()
         
-        # 删除访问日志记录（已在文件顶部导入）
-        AccessLog.query.filter_by(document_id=document_id).delete()
+        # 删除访问日志记录（先丢弃队列中该文档的日志，避免之后写入时引用已删除的文档）
+        # 日志不早于文档创建时间，据此只访问相关的分区
+        LogService.discard_access_logs(document_id)
+        LogPartitionService.delete_rows(AccessLog, since=document.created_at, document_id=document_id)
+        AccessRollupService.remove_document(document_id)
         
         # 删除版本记录
-        DocumentVersion.query.filter_by(document_id=document_id).delete()
+        DocumentVersionService.remove_document(document_id)
+        
+        # 删除检索索引
+        SearchService.remove_document(document_id)
+        
+        # 删除未执行的后台任务
+        JobQueue.remove_document_jobs(document_id)
         
         # 删除文件
         delete_file(document.file_path)
@@ -599,7 +587,7 @@ def get_document_versions(document_id):
     """获取文档版本历史"""
     try:
         # 获取当前用户
-        user = get_current_user()
+        user = get_request_user()
         
         # 查找文档
         document = Document.query.get(document_id)
@@ -611,19 +599,23 @@ def get_document_versions(document_id):
             return jsonify({'message': '无权限访问此文档'}), 403
         
         # 仅流式文件有版本历史
-        if document.file_type != 'stream':
+        if document.file_type != 'flow':
             return jsonify({'message': '仅流式文件支持版本历史'}), 400
         
         # 获取版本历史
+        # 列表不需要版本内容，不读取快照和差异数据
         versions = DocumentVersion.query.filter_by(
             document_id=document_id
-        ).order_by(DocumentVersion.version_num.desc()).all()
+        ).options(defer(DocumentVersion.content), defer(DocumentVersion.data)).order_by(
+            DocumentVersion.version_num.desc()
+        ).all()
         
         version_list = []
         for v in versions:
             version_list.append({
                 'id': v.id,
                 'version': v.version_num,
+                'size': v.content_size,
                 'created_at': v.created_at.isoformat()
             })
         
@@ -640,7 +632,7 @@ def get_document_version(document_id, version_id):
     """获取特定版本的文档内容"""
     try:
         # 获取当前用户
-        user = get_current_user()
+        user = get_request_user()
         
         # 查找文档
         document = Document.query.get(document_id)
@@ -664,7 +656,7 @@ def get_document_version(document_id, version_id):
             'version': {
                 'id': version.id,
                 'version': version.version_num,
-                'content': version.content,
+                'content': DocumentVersionService.get_content(version),
                 'created_at': version.created_at.isoformat()
             }
         })
@@ -3,6 +3,10 @@ from flask_jwt_extended import jwt_required
 from app.models.document import Document, DocumentCategory
 from app.models.user import User
 from app.utils.auth import get_current_user, verify_permission
+from app.utils import list_cache
+from app.services.document_query import document_list_query
+from app.services.view_counter import ViewCountService
+from app.services.storage_stats import StorageStatsService
 from app import db
 
 # 创建蓝图
@@ -24,8 +28,9 @@ def get_statistics():
                 (Document.creator_id == user.id) | (Document.is_private == False)
             )
         
-        # 获取统计数据
-        total_documents = document_query.count()
+        # 获取统计数据（管理员可见全部文档，直接读取存储统计聚合）
+        storage = StorageStatsService.get_summary() if user.role.name == 'admin' else None
+        total_documents = storage['total_documents'] if storage else document_query.count()
         total_categories = DocumentCategory.query.count()
         
         # 获取用户数（只有管理员可以看到总数）
@@ -34,7 +39,8 @@ def get_statistics():
         return jsonify({
             'total_documents': total_documents,
             'total_categories': total_categories,
-            'total_users': total_users
+            'total_users': total_users,
+            'total_size': storage['total_size'] if storage else None
         })
     
     except Exception as e:
@@ -51,27 +57,57 @@ def get_recent_documents():
         # 获取数量参数
         limit = request.args.get('limit', 5, type=int)
         
-        # 构建文档查询
-        document_query = Document.query
-        if user.role.name != 'admin':
-            # 非管理员只能看到自己的文档和公开文档
-            document_query = document_query.filter(
-                (Document.creator_id == user.id) | (Document.is_private == False)
-            )
+        def compute():
+            # 构建文档查询（非管理员只能看到自己的文档和公开文档）
+            document_query = document_list_query(user)
+            
+            # 获取最近的文档
+            recent_docs = document_query.order_by(Document.created_at.desc()).limit(limit).all()
+            
+            # 构建响应
+            documents = []
+            for doc in recent_docs:
+                documents.append({
+                    'id': doc.id,
+                    'title': doc.title,
+                    'category': doc.category_name or '未分类',
+                    'created_at': doc.created_at.isoformat(),
+                    'username': doc.username or '',
+                    'file_type': doc.file_type
+                })
+            return {'documents': documents}
         
-        # 获取最近的文档
-        recent_docs = document_query.order_by(Document.created_at.desc()).limit(limit).all()
+        # 按数量和可见范围缓存结果，文档或分类变更后失效
+        return jsonify(list_cache.get_or_compute(
+            'recent_documents', list_cache.visibility_class(user), {'limit': limit}, compute
+        ))
+    
+    except Exception as e:
+        return jsonify({'message': f'获取最近文档失败: {str(e)}'}), 500
+
+
+@overview_bp.route('/most-viewed-documents', methods=['GET'])
+@jwt_required()
+def get_most_viewed_documents():
+    """获取查看次数最多的文档"""
+    try:
+        # 获取当前用户
+        user = get_current_user()
+        
+        # 获取数量参数
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
         
         # 构建响应
         documents = []
-        for doc in recent_docs:
+        for doc, views_count in ViewCountService.get_most_viewed(user, limit):
             documents.append({
                 'id': doc.id,
                 'title': doc.title,
-                'category': doc.category.name if doc.category else '未分类',
+                'category': doc.category_name or '未分类',
                 'created_at': doc.created_at.isoformat(),
-                'username': doc.creator.username if doc.creator else '',
-                'file_type': doc.file_type
+                'username': doc.username or '',
+                'file_type': doc.file_type,
+                'views_count': views_count
             })
         
         return jsonify({
@@ -79,4 +115,22 @@ def get_recent_documents():
         })
     
     except Exception as e:
-        return jsonify({'message': f'获取最近文档失败: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'message': f'获取热门文档失败: {str(e)}'}), 500
+
+
+@overview_bp.route('/storage', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def get_storage_statistics():
+    """获取存储统计（按文档类型、分类和用户）- 管理员专用"""
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        
+        summary = StorageStatsService.get_summary()
+        summary['by_category'] = StorageStatsService.get_breakdown('category', limit)
+        summary['by_user'] = StorageStatsService.get_breakdown('user', limit)
+        
+        return jsonify(summary)
+    
+    except Exception as e:
+        return jsonify({'message': f'获取存储统计失败: {str(e)}'}), 500
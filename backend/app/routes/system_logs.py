@@ -1,15 +1,124 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required
 from datetime import datetime, timedelta
+from sqlalchemy import select, union_all
+from app.models import db
 from app.models.system_log import SystemLog
 from app.models.access_log import AccessLog
 from app.models.user import User
 from app.utils.auth import verify_permission, get_current_user
+from app.utils.pagination import paginate_query
+from app.utils.export_stream import export_response
+from app.utils import rate_limiter
+from app.services.log_service import LogService
+from app.services.log_stats_service import LogStatsService
+from app.services.access_rollup_service import AccessRollupService
+from app.services.log_partition_service import LogPartitionService
 
 # 创建蓝图
 system_logs_bp = Blueprint('system_logs', __name__)
 
 
+# 导出的列
+SYSTEM_LOG_EXPORT_COLUMNS = [
+    'id', 'operator_id', 'operator_name', 'operation_type', 'operation_desc', 'target_entity',
+    'target_id', 'target_name', 'details', 'ip_address', 'created_at'
+]
+ACCESS_LOG_EXPORT_COLUMNS = ['id', 'user_id', 'document_id', 'action_type', 'ip_address', 'user_agent', 'created_at']
+
+
+def _time_range():
+    """解析start_time/end_time参数"""
+    start_time = request.args.get('start_time')
+    end_time = request.args.get('end_time')
+    start = datetime.fromisoformat(start_time.replace('Z', '+00:00')) if start_time else None
+    end = datetime.fromisoformat(end_time.replace('Z', '+00:00')) if end_time else None
+    return start, end
+
+
+def _time_conditions(columns):
+    start, end = _time_range()
+    conditions = []
+    if start:
+        conditions.append(columns.created_at >= start)
+    if end:
+        conditions.append(columns.created_at <= end)
+    return conditions
+
+
+def _system_log_conditions(columns):
+    """按请求参数构建系统日志过滤条件（列表和导出共用，columns为日志表或分表的列集合）"""
+    conditions = _time_conditions(columns)
+    operator_id = request.args.get('operator_id', type=int)
+    operation_type = request.args.get('operation_type')
+    target_entity = request.args.get('target_entity')
+    target_id = request.args.get('target_id', type=int)
+    if operator_id:
+        conditions.append(columns.operator_id == operator_id)
+    if operation_type:
+        conditions.append(columns.operation_type == operation_type)
+    if target_entity:
+        conditions.append(columns.target_entity == target_entity)
+    if target_id:
+        conditions.append(columns.target_id == target_id)
+    return conditions
+
+
+def _access_log_conditions(columns):
+    """按请求参数构建访问日志过滤条件（列表和导出共用，columns为日志表或分表的列集合）"""
+    conditions = _time_conditions(columns)
+    user_id = request.args.get('user_id', type=int)
+    document_id = request.args.get('document_id', type=int)
+    action_type = request.args.get('action_type')
+    if user_id:
+        conditions.append(columns.user_id == user_id)
+    if document_id:
+        conditions.append(columns.document_id == document_id)
+    if action_type:
+        conditions.append(columns.action_type == action_type)
+    return conditions
+
+
+def _list_query(model, build_conditions, start, end):
+    """
+    构建日志列表查询，包含时间范围内仍保留的分表（SQLite中轮转出主表的日志）
+    只有主表时（MySQL或没有分表）直接查询模型，否则合并查询各表
+    :return: (查询对象, 时间列, 主键列)
+    """
+    tables = LogPartitionService.tables_for_range(
+        model, start, end + timedelta(microseconds=1) if end else None
+    )
+    if len(tables) == 1:
+        return model.query.filter(*build_conditions(model.__table__.c)), model.created_at, model.id
+
+    names = [c.name for c in model.__table__.columns]
+    logs = union_all(*[
+        select(*[log_table.c[name] for name in names]).where(*build_conditions(log_table.c))
+        for log_table in tables
+    ]).subquery()
+    return db.session.query(logs), logs.c.created_at, logs.c.id
+
+
+def _export_logs(model, columns, build_conditions, filename):
+    """按过滤条件流式导出日志，依次读取时间范围内的各分表（由旧到新）和主表"""
+    start, end = _time_range()
+    tables = LogPartitionService.tables_for_range(
+        model, start, end + timedelta(microseconds=1) if end else None
+    )
+    statements = [
+        select(*[log_table.c[name] for name in columns])
+        .where(*build_conditions(log_table.c))
+        .order_by(log_table.c.id)
+        for log_table in tables[1:] + tables[:1]
+    ]
+    return export_response(
+        statements, columns,
+        fmt=request.args.get('format', 'csv'),
+        compress=request.args.get('gzip', 'false').lower() == 'true',
+        filename=f"{filename}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+    )
+
+
 @system_logs_bp.route('/system', methods=['GET'])
 @jwt_required()
 @verify_permission('admin')
@@ -20,38 +129,16 @@ def get_system_logs():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        # 获取过滤参数
-        start_time = request.args.get('start_time')
-        end_time = request.args.get('end_time')
-        operator_id = request.args.get('operator_id', type=int)
-        operation_type = request.args.get('operation_type')
-        target_entity = request.args.get('target_entity')
-        target_id = request.args.get('target_id', type=int)
-        
-        # 构建查询
-        query = SystemLog.query
-        
-        # 应用过滤条件
-        if start_time:
-            start = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-            query = query.filter(SystemLog.created_at >= start)
-        if end_time:
-            end = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-            query = query.filter(SystemLog.created_at <= end)
-        if operator_id:
-            query = query.filter(SystemLog.operator_id == operator_id)
-        if operation_type:
-            query = query.filter(SystemLog.operation_type == operation_type)
-        if target_entity:
-            query = query.filter(SystemLog.target_entity == target_entity)
-        if target_id:
-            query = query.filter(SystemLog.target_id == target_id)
+        # 构建查询并应用过滤条件（包含时间范围内的分表）
+        query, time_column, id_column = _list_query(SystemLog, _system_log_conditions, *_time_range())
         
-        # 按时间倒序排列
-        query = query.order_by(SystemLog.created_at.desc())
-        
-        # 执行分页查询
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        # 按时间倒序执行分页查询（传入cursor时使用游标分页）
+        pagination = paginate_query(
+            query, time_column, id_column,
+            page=page, per_page=per_page,
+            cursor=request.args.get('cursor'),
+            count_mode=request.args.get('count')
+        )
         
         # 构建响应数据
         logs = []
@@ -73,11 +160,16 @@ def get_system_logs():
         return jsonify({
             'logs': logs,
             'total': pagination.total,
+            'total_is_estimate': pagination.total_is_estimate,
             'pages': pagination.pages,
             'current_page': pagination.page,
-            'per_page': pagination.per_page
+            'per_page': pagination.per_page,
+            'next_cursor': pagination.next_cursor,
+            'has_more': pagination.has_more
         })
     
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'获取系统日志失败: {str(e)}'}), 500
 
@@ -92,35 +184,16 @@ def get_access_logs():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        # 获取过滤参数
-        start_time = request.args.get('start_time')
-        end_time = request.args.get('end_time')
-        user_id = request.args.get('user_id', type=int)
-        document_id = request.args.get('document_id', type=int)
-        action_type = request.args.get('action_type')
-        
-        # 构建查询
-        query = AccessLog.query
-        
-        # 应用过滤条件
-        if start_time:
-            start = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-            query = query.filter(AccessLog.created_at >= start)
-        if end_time:
-            end = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-            query = query.filter(AccessLog.created_at <= end)
-        if user_id:
-            query = query.filter(AccessLog.user_id == user_id)
-        if document_id:
-            query = query.filter(AccessLog.document_id == document_id)
-        if action_type:
-            query = query.filter(AccessLog.action_type == action_type)
+        # 构建查询并应用过滤条件（包含时间范围内的分表）
+        query, time_column, id_column = _list_query(AccessLog, _access_log_conditions, *_time_range())
         
-        # 按时间倒序排列
-        query = query.order_by(AccessLog.created_at.desc())
-        
-        # 执行分页查询
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        # 按时间倒序执行分页查询（传入cursor时使用游标分页）
+        pagination = paginate_query(
+            query, time_column, id_column,
+            page=page, per_page=per_page,
+            cursor=request.args.get('cursor'),
+            count_mode=request.args.get('count')
+        )
         
         # 构建响应数据
         logs = []
@@ -138,15 +211,79 @@ def get_access_logs():
         return jsonify({
             'logs': logs,
             'total': pagination.total,
+            'total_is_estimate': pagination.total_is_estimate,
             'pages': pagination.pages,
             'current_page': pagination.page,
-            'per_page': pagination.per_page
+            'per_page': pagination.per_page,
+            'next_cursor': pagination.next_cursor,
+            'has_more': pagination.has_more
         })
     
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'获取访问日志失败: {str(e)}'}), 500
 
 
+@system_logs_bp.route('/system/export', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def export_system_logs():
+    """流式导出系统日志 - 管理员专用（过滤参数同列表接口，format=csv/ndjson，gzip=true压缩）"""
+    try:
+        return _export_logs(SystemLog, SYSTEM_LOG_EXPORT_COLUMNS, _system_log_conditions, 'system_logs')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': f'导出系统日志失败: {str(e)}'}), 500
+
+
+@system_logs_bp.route('/access/export', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def export_access_logs():
+    """流式导出访问日志 - 管理员专用（过滤参数同列表接口，format=csv/ndjson，gzip=true压缩）"""
+    try:
+        return _export_logs(AccessLog, ACCESS_LOG_EXPORT_COLUMNS, _access_log_conditions, 'access_logs')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': f'导出访问日志失败: {str(e)}'}), 500
+
+
+@system_logs_bp.route('/access/writer', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def get_access_log_writer_stats():
+    """获取访问日志异步写入状态（队列深度、已写入和丢弃条数）- 管理员专用"""
+    try:
+        return jsonify({'writer': LogService.get_access_log_writer_stats()})
+    except Exception as e:
+        return jsonify({'message': f'获取访问日志写入状态失败: {str(e)}'}), 500
+
+
+@system_logs_bp.route('/rate-limit', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def get_rate_limit_stats():
+    """获取请求限流统计（各类别放行、拒绝次数和被拒绝最多的用户或IP）- 管理员专用"""
+    try:
+        return jsonify({'rate_limit': rate_limiter.get_rate_limit_stats()})
+    except Exception as e:
+        return jsonify({'message': f'获取限流统计失败: {str(e)}'}), 500
+
+
+@system_logs_bp.route('/partitions', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def get_log_partitions():
+    """获取日志表分区信息（分区、行数和保留期）- 管理员专用"""
+    try:
+        return jsonify({'tables': LogPartitionService.get_partitions()})
+    except Exception as e:
+        return jsonify({'message': f'获取日志分区信息失败: {str(e)}'}), 500
+
+
 @system_logs_bp.route('/user/<int:user_id>/access', methods=['GET'])
 @jwt_required()
 def get_user_access_logs(user_id):
@@ -169,17 +306,20 @@ def get_user_access_logs(user_id):
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=days)
         
-        # 构建查询
-        query = AccessLog.query.filter(
-            AccessLog.user_id == user_id,
-            AccessLog.created_at >= start_time
+        # 构建查询（包含时间范围内的分表）
+        query, time_column, id_column = _list_query(
+            AccessLog,
+            lambda columns: [columns.user_id == user_id, columns.created_at >= start_time],
+            start_time, None
         )
         
-        # 按时间倒序排列
-        query = query.order_by(AccessLog.created_at.desc())
-        
-        # 执行分页查询
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        # 按时间倒序执行分页查询（传入cursor时使用游标分页）
+        pagination = paginate_query(
+            query, time_column, id_column,
+            page=page, per_page=per_page,
+            cursor=request.args.get('cursor'),
+            count_mode=request.args.get('count')
+        )
         
         # 构建响应数据
         logs = []
@@ -194,11 +334,16 @@ def get_user_access_logs(user_id):
         return jsonify({
             'logs': logs,
             'total': pagination.total,
+            'total_is_estimate': pagination.total_is_estimate,
             'pages': pagination.pages,
             'current_page': pagination.page,
-            'per_page': pagination.per_page
+            'per_page': pagination.per_page,
+            'next_cursor': pagination.next_cursor,
+            'has_more': pagination.has_more
         })
     
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'获取用户访问日志失败: {str(e)}'}), 500
 
@@ -207,57 +352,79 @@ def get_user_access_logs(user_id):
 @jwt_required()
 @verify_permission('admin')
 def get_log_statistics():
-    """获取日志统计信息 - 管理员专用"""
+    """获取日志统计信息 - 管理员专用（读取按天汇总表，由后台汇总任务更新）"""
     try:
-        # 计算时间范围（最近30天）
-        end_time = datetime.utcnow()
-        start_time = end_time - timedelta(days=30)
-        
-        # 统计各操作类型的数量
-        operation_counts = {}
-        access_logs = AccessLog.query.filter(
-            AccessLog.created_at >= start_time
-        ).all()
-        
-        for log in access_logs:
-            if log.action_type not in operation_counts:
-                operation_counts[log.action_type] = 0
-            operation_counts[log.action_type] += 1
-        
-        # 统计活跃用户数
-        active_users = AccessLog.query.filter(
-            AccessLog.created_at >= start_time
-        ).distinct(AccessLog.user_id).count()
-        
-        # 统计最近7天的日访问量
-        daily_stats = []
-        for i in range(7):
-            date = end_time - timedelta(days=i)
-            date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            date_end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-            
-            count = AccessLog.query.filter(
-                AccessLog.created_at >= date_start,
-                AccessLog.created_at <= date_end
-            ).count()
-            
-            daily_stats.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'count': count
-            })
-        
-        daily_stats.reverse()  # 按日期升序排列
-        
+        return jsonify(LogStatsService.get_statistics(days=30, daily_days=7))
+    
+    except Exception as e:
+        return jsonify({'message': f'获取统计信息失败: {str(e)}'}), 500
+
+
+def _analytics_args():
+    """解析访问分析接口的公共参数"""
+    days = request.args.get('days', 7, type=int)
+    if days < 1 or days > 366:
+        raise ValueError('统计天数应在1到366之间')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    return days, request.args.get('action_type') or None, limit
+
+
+@system_logs_bp.route('/analytics/top-documents', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def get_top_documents():
+    """获取访问最多的文档 - 管理员专用（读取访问分析汇总表）"""
+    try:
+        days, action_type, limit = _analytics_args()
+        AccessRollupService.schedule_run()
         return jsonify({
-            'operation_counts': operation_counts,
-            'active_users': active_users,
-            'daily_access_stats': daily_stats,
-            'total_access_logs': len(access_logs),
-            'time_range': {
-                'start': start_time.isoformat(),
-                'end': end_time.isoformat()
-            }
+            'documents': AccessRollupService.get_top_documents(days, action_type, limit),
+            'days': days,
+            'action_type': action_type
         })
-    
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': f'获取文档访问排行失败: {str(e)}'}), 500
+
+
+@system_logs_bp.route('/analytics/top-users', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def get_top_users():
+    """获取访问最多的用户 - 管理员专用（读取访问分析汇总表）"""
+    try:
+        days, action_type, limit = _analytics_args()
+        AccessRollupService.schedule_run()
+        return jsonify({
+            'users': AccessRollupService.get_top_users(days, action_type, limit),
+            'days': days,
+            'action_type': action_type
+        })
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': f'获取用户访问排行失败: {str(e)}'}), 500
+
+
+@system_logs_bp.route('/analytics/documents/<int:document_id>/trend', methods=['GET'])
+@jwt_required()
+@verify_permission('admin')
+def get_document_trend(document_id):
+    """获取文档访问趋势 - 管理员专用（granularity=hour/day）"""
+    try:
+        granularity = request.args.get('granularity', 'day')
+        days = request.args.get('days', 30 if granularity == 'day' else 2, type=int)
+        max_days = 366 if granularity == 'day' else current_app.config.get('ACCESS_ROLLUP_HOURLY_DAYS', 31)
+        if days < 1 or days > max_days:
+            raise ValueError(f'统计天数应在1到{max_days}之间')
+        AccessRollupService.schedule_run()
+        return jsonify({
+            'document_id': document_id,
+            'granularity': granularity,
+            'trend': AccessRollupService.get_document_trend(document_id, granularity, days)
+        })
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
-        return jsonify({'message': f'获取统计信息失败: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'message': f'获取文档访问趋势失败: {str(e)}'}), 500
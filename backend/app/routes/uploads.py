@@ -0,0 +1,348 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from app.models import db
+from app.models.upload_session import UploadSession, UploadChunk
+from app.models.document import DocumentCategory
+from app.utils.auth import verify_permission, get_current_user
+from app.utils.file_handler import get_file_type, get_file_path, create_upload_target, write_file_chunk, calculate_file_hash, finalize_upload, delete_file
+from app.utils import blob_store
+from app.utils.limiter import get_upload_remaining
+from app.services.document_service import DocumentService
+from app.services.upload_quota_service import UploadQuotaService, UploadLimitExceeded
+
+# 创建蓝图
+uploads_bp = Blueprint('uploads', __name__)
+
+
+def _get_user_session(upload_id, user):
+    """获取当前用户的上传会话"""
+    session = UploadSession.query.get(upload_id)
+    if not session or session.user_id != user.id:
+        return None
+    return session
+
+
+def _expected_chunk_size(session, chunk_index):
+    """计算指定分片的预期大小（最后一个分片可能小于分片大小）"""
+    if chunk_index == session.total_chunks - 1:
+        return session.file_size - session.chunk_size * (session.total_chunks - 1)
+    return session.chunk_size
+
+
+def _session_to_dict(session):
+    received = [c.chunk_index for c in session.chunks.order_by(UploadChunk.chunk_index).all()]
+    return {
+        'upload_id': session.id,
+        'file_name': session.original_filename,
+        'file_size': session.file_size,
+        'chunk_size': session.chunk_size,
+        'total_chunks': session.total_chunks,
+        'received_chunks': received,
+        'status': session.status,
+        'document_id': session.document_id,
+        'created_at': session.created_at.isoformat()
+    }
+
+
+def _today_start_utc():
+    """本地时间当日零点对应的UTC时间（上传配额按本地日期计算，会话时间为UTC）"""
+    now = datetime.now()
+    return datetime.utcnow() - (now - now.replace(hour=0, minute=0, second=0, microsecond=0))
+
+
+def _remove_part_file(session, part_path=None):
+    part_path = get_file_path(part_path or session.part_path)
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+
+@uploads_bp.route('/', methods=['POST'])
+@jwt_required()
+@verify_permission('upload')
+def init_upload():
+    """初始化分片上传，在写入任何数据前完成配额、格式和大小检查"""
+    try:
+        user = get_current_user()
+        data = request.get_json() or {}
+
+        file_name = data.get('file_name')
+        file_size = data.get('file_size')
+        if not file_name or not isinstance(file_size, int) or file_size <= 0:
+            return jsonify({'message': '文件名和文件大小不能为空'}), 400
+
+        # 检查上传限制（今日初始化、未过期且未完成的上传也占用配额）
+        pending = UploadSession.query.filter(
+            UploadSession.user_id == user.id,
+            UploadSession.status == 'uploading',
+            UploadSession.created_at >= _today_start_utc(),
+            UploadSession.updated_at >= datetime.utcnow() - current_app.config.get(
+                'UPLOAD_SESSION_EXPIRES', timedelta(hours=24))
+        ).count()
+        if get_upload_remaining(user.id) - pending <= 0:
+            return jsonify({'message': '上传文件数量已达上限'}), 403
+
+        # 检查文档信息，避免上传完成后才因分类或标题无效而无法入库
+        title = data.get('title') or file_name
+        if len(title) > 200:
+            return jsonify({'message': '文档标题不能超过200个字符'}), 400
+        try:
+            category_id = int(data.get('category_id'))
+        except (TypeError, ValueError):
+            return jsonify({'message': '请选择文档分类'}), 400
+        if not DocumentCategory.query.get(category_id):
+            return jsonify({'message': '分类不存在'}), 400
+
+        # 检查文件类型
+        file_type = get_file_type(file_name)
+        if not file_type:
+            return jsonify({'message': '不支持的文件格式'}), 400
+
+        # 检查文件大小
+        max_size = current_app.config.get('MAX_CONTENT_LENGTH', 500 * 1024 * 1024)
+        if file_size > max_size:
+            return jsonify({'message': '文件大小超过限制'}), 400
+
+        # 分片大小由客户端建议，限制在配置范围内
+        chunk_size = data.get('chunk_size') or current_app.config.get('UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024)
+        try:
+            chunk_size = int(chunk_size)
+        except (TypeError, ValueError):
+            return jsonify({'message': '分片大小无效'}), 400
+        chunk_size = max(current_app.config.get('UPLOAD_MIN_CHUNK_SIZE', 256 * 1024),
+                         min(chunk_size, current_app.config.get('UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 * 1024)))
+        total_chunks = (file_size + chunk_size - 1) // chunk_size
+
+        # 在最终存储目录中预先分配文件位置
+        file_path, unique_filename = create_upload_target(file_name, file_type)
+
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=user.id,
+            original_filename=file_name,
+            file_type=file_type,
+            file_size=file_size,
+            chunk_size=chunk_size,
+            total_chunks=total_chunks,
+            file_path=file_path,
+            file_name=unique_filename,
+            checksum=data.get('checksum'),
+            title=title,
+            description=data.get('description', ''),
+            category_id=category_id,
+            is_private=bool(data.get('is_private', False))
+        )
+        open(get_file_path(session.part_path), 'wb').close()
+
+        db.session.add(session)
+        db.session.commit()
+
+        return jsonify({'message': '上传会话创建成功', 'upload': _session_to_dict(session)}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'创建上传会话失败: {str(e)}'}), 500
+
+
+@uploads_bp.route('/<upload_id>', methods=['GET'])
+@jwt_required()
+@verify_permission('upload')
+def get_upload(upload_id):
+    """获取上传进度，客户端据此续传缺失的分片"""
+    try:
+        user = get_current_user()
+        session = _get_user_session(upload_id, user)
+        if not session:
+            return jsonify({'message': '上传会话不存在'}), 404
+
+        return jsonify({'upload': _session_to_dict(session)})
+
+    except Exception as e:
+        return jsonify({'message': f'获取上传进度失败: {str(e)}'}), 500
+
+
+@uploads_bp.route('/<upload_id>/chunks/<int:chunk_index>', methods=['PUT'])
+@jwt_required()
+@verify_permission('upload')
+def upload_chunk(upload_id, chunk_index):
+    """上传单个分片，请求体为分片原始数据，X-Chunk-Checksum头为分片SHA-256"""
+    try:
+        user = get_current_user()
+        session = _get_user_session(upload_id, user)
+        if not session:
+            return jsonify({'message': '上传会话不存在'}), 404
+        if session.status != 'uploading':
+            return jsonify({'message': '上传会话已结束'}), 400
+        if chunk_index < 0 or chunk_index >= session.total_chunks:
+            return jsonify({'message': '分片序号无效'}), 400
+
+        checksum = (request.headers.get('X-Chunk-Checksum') or '').lower()
+        if not checksum:
+            return jsonify({'message': '缺少分片校验值'}), 400
+
+        # 在读取请求体前检查声明的长度
+        expected_size = _expected_chunk_size(session, chunk_index)
+        if request.content_length is not None and request.content_length != expected_size:
+            return jsonify({'message': f'分片大小错误，应为{expected_size}字节'}), 400
+
+        # 已接收且校验值一致的分片直接返回，便于客户端重试
+        existing = session.chunks.filter_by(chunk_index=chunk_index).first()
+        if existing and existing.checksum == checksum:
+            return jsonify({'message': '分片已接收', 'chunk_index': chunk_index})
+
+        # 直接将请求体流写入最终目录中的文件
+        try:
+            written, digest = write_file_chunk(
+                session.part_path, chunk_index * session.chunk_size, request.stream, expected_size
+            )
+        except ValueError:
+            return jsonify({'message': f'分片大小错误，应为{expected_size}字节'}), 400
+
+        if written != expected_size:
+            return jsonify({'message': f'分片数据不完整，应为{expected_size}字节'}), 400
+        if digest != checksum:
+            # 已写入的数据可能覆盖了之前接收的分片，需要客户端重新上传
+            if existing:
+                db.session.delete(existing)
+                db.session.commit()
+            return jsonify({'message': '分片校验失败，请重新上传'}), 400
+
+        if existing:
+            existing.checksum = digest
+            existing.size = written
+        else:
+            db.session.add(UploadChunk(
+                session_id=session.id,
+                chunk_index=chunk_index,
+                size=written,
+                checksum=digest
+            ))
+        session.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        return jsonify({'message': '分片上传成功', 'chunk_index': chunk_index})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'分片上传失败: {str(e)}'}), 500
+
+
+@uploads_bp.route('/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+@verify_permission('upload')
+def complete_upload(upload_id):
+    """完成分片上传，校验完整性后创建文档记录"""
+    try:
+        user = get_current_user()
+        session = _get_user_session(upload_id, user)
+        if not session:
+            return jsonify({'message': '上传会话不存在'}), 404
+        if session.status == 'completed':
+            return jsonify({'message': '文档上传成功', 'document_id': session.document_id}), 201
+        if session.status != 'uploading':
+            return jsonify({'message': '上传会话已结束'}), 400
+
+        # 检查分片是否齐全
+        received = {c.chunk_index for c in session.chunks}
+        missing = [i for i in range(session.total_chunks) if i not in received]
+        if missing:
+            return jsonify({'message': '分片不完整', 'missing_chunks': missing[:100]}), 400
+
+        # 校验整个文件（客户端提供了校验值时）
+        content_hash = calculate_file_hash(session.part_path)
+        if session.checksum and content_hash != session.checksum.lower():
+            return jsonify({'message': '文件校验失败'}), 400
+
+        # 先占用上传配额，超过上限时分片数据保持不变，会话可在配额恢复后再次完成
+        UploadQuotaService.consume(user.id)
+
+        # 放到最终位置（启用内容寻址存储时相同内容只保存一份），保留临时文件直到文档入库，
+        # 入库失败时回滚并删除放置的文件，会话仍可重新完成
+        part_path = session.part_path
+        file_path = finalize_upload(part_path, session.file_path, content_hash, keep_part=True)
+        session.status = 'completed'
+        try:
+            document = DocumentService.create_document(
+                user,
+                file_path=file_path,
+                unique_filename=session.file_name,
+                original_filename=session.original_filename,
+                file_type=session.file_type,
+                file_size=session.file_size,
+                title=session.title,
+                description=session.description,
+                category_id=session.category_id,
+                is_private=session.is_private,
+                request=request,
+                content_hash=content_hash,
+                consume_quota=False
+            )
+        except Exception:
+            db.session.rollback()
+            # 内容寻址存储的引用计数随事务回滚，未引用的文件由storage-reconcile清理
+            if not blob_store.is_blob_path(file_path):
+                delete_file(file_path)
+            raise
+
+        session.file_path = file_path
+        session.document_id = document.id
+        session.chunks.delete()
+        db.session.commit()
+        # 会话的file_path可能已改为文件块路径，按放置前的临时文件路径删除
+        _remove_part_file(session, part_path)
+
+        return jsonify({'message': '文档上传成功', 'document_id': document.id}), 201
+
+    except UploadLimitExceeded as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 403
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'完成上传失败: {str(e)}'}), 500
+
+
+@uploads_bp.route('/<upload_id>', methods=['DELETE'])
+@jwt_required()
+@verify_permission('upload')
+def abort_upload(upload_id):
+    """取消分片上传并删除已写入的数据"""
+    try:
+        user = get_current_user()
+        session = _get_user_session(upload_id, user)
+        if not session:
+            return jsonify({'message': '上传会话不存在'}), 404
+        if session.status != 'uploading':
+            return jsonify({'message': '上传会话已结束'}), 400
+
+        _remove_part_file(session)
+        session.status = 'aborted'
+        session.chunks.delete()
+        db.session.commit()
+
+        return jsonify({'message': '上传已取消'})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'取消上传失败: {str(e)}'}), 500
+
+
+def cleanup_expired_uploads():
+    """
+    清理超时未完成的上传会话及其临时文件
+    :return: 清理的会话数
+    """
+    expires = current_app.config.get('UPLOAD_SESSION_EXPIRES', timedelta(hours=24))
+    deadline = datetime.utcnow() - expires
+    sessions = UploadSession.query.filter(
+        UploadSession.status == 'uploading',
+        UploadSession.updated_at < deadline
+    ).all()
+
+    for session in sessions:
+        _remove_part_file(session)
+        session.status = 'aborted'
+        session.chunks.delete()
+    db.session.commit()
+    return len(sessions)
@@ -5,7 +5,8 @@ import os
 from app.models import db
 from app.models.user import User, Role
 from app.models.document import Document
-from app.utils.auth import verify_permission
+from app.utils.auth import verify_permission, invalidate_permission_cache
+from app.utils.pagination import paginate_query
 from app.services.log_service import LogService
 
 # 创建蓝图
@@ -37,9 +38,12 @@ def get_users():
         if status is not None:
             query = query.filter_by(status=status)
         
-        # 执行查询
-        pagination = query.order_by(User.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        # 执行查询（传入cursor时使用游标分页）
+        pagination = paginate_query(
+            query, User.created_at, User.id,
+            page=page, per_page=per_page,
+            cursor=request.args.get('cursor'),
+            count_mode=request.args.get('count')
         )
         
         # 构建响应
@@ -58,10 +62,15 @@ def get_users():
         return jsonify({
             'users': users,
             'total': pagination.total,
-            'page': page,
-            'per_page': per_page
+            'total_is_estimate': pagination.total_is_estimate,
+            'page': pagination.page,
+            'per_page': pagination.per_page,
+            'next_cursor': pagination.next_cursor,
+            'has_more': pagination.has_more
         })
     
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'获取用户列表失败: {str(e)}'}), 500
 
@@ -145,6 +154,7 @@ def update_user(user_id):
             user.password_hash = generate_password_hash(data['password'])
         
         db.session.commit()
+        invalidate_permission_cache(user_id=user.id)
         
         # 记录系统日志
         from app.utils.auth import get_current_user
@@ -178,6 +188,7 @@ def reset_user_password(user_id):
         # 更新密码
         user.password_hash = generate_password_hash(data['new_password'])
         db.session.commit()
+        invalidate_permission_cache(user_id=user.id)
         
         # 记录系统日志
         from app.utils.auth import get_current_user
@@ -220,6 +231,7 @@ def delete_user(user_id):
         # 删除用户
         db.session.delete(user)
         db.session.commit()
+        invalidate_permission_cache(user_id=user_id)
         
         # 记录系统日志
         from app.utils.auth import get_current_user
@@ -290,6 +302,7 @@ def update_role_permissions(role_id):
                 db.session.add(new_permission)
         
         db.session.commit()
+        invalidate_permission_cache(role_id)
         
         return jsonify({'message': '角色权限更新成功'})
     
@@ -0,0 +1,188 @@
+import os
+import time
+import queue
+import atexit
+import threading
+from flask import current_app
+from app.models import db
+from app.models.access_log import AccessLog
+
+
+class AccessLogWriter:
+    """异步访问日志写入器：请求线程只负责入队，后台线程按批量多行INSERT写入数据库"""
+
+    def __init__(self, app, batch_size=200, flush_interval=0.5, queue_size=10000):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # 写入一批日志期间持有，丢弃文档日志时据此等待正在写入的批次完成
+        self._write_lock = threading.Lock()
+        # 已删除的文档：文档ID -> 删除时间，之后取出的该文档日志直接丢弃
+        self._discarded = {}
+        self._stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'errors': 0}
+
+    def _ensure_started(self):
+        """首次入队时启动后台线程（fork出的工作进程中会重新启动）"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, event):
+        """
+        将访问日志加入队列，队列已满时丢弃并计数，不阻塞请求
+        :param event: 访问日志字段字典
+        :return: 是否入队成功
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            return False
+        with self._lock:
+            self._stats['enqueued'] += 1
+        return True
+
+    def _drain(self, timeout):
+        """取出一批日志：等待第一条最多timeout秒，之后在flush_interval内凑满一批"""
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """以一次多行INSERT写入一批日志"""
+        with self._write_lock:
+            batch = self._filter_discarded(batch)
+            if batch:
+                self._write_batch(batch)
+
+    def _filter_discarded(self, batch):
+        with self._lock:
+            if not self._discarded:
+                return batch
+            kept = [event for event in batch if event.get('document_id') not in self._discarded]
+            self._stats['dropped'] += len(batch) - len(kept)
+        return kept
+
+    def _write_batch(self, batch):
+        with self.app.app_context():
+            try:
+                db.session.execute(AccessLog.__table__.insert(), batch)
+                db.session.commit()
+                with self._lock:
+                    self._stats['written'] += len(batch)
+                    self._stats['flushes'] += 1
+            except Exception as e:
+                db.session.rollback()
+                with self._lock:
+                    self._stats['errors'] += 1
+                print(f"批量写入访问日志失败: {str(e)}")
+                # 批量写入失败时逐条重试（如文档已被删除），只丢弃写不进去的记录
+                self._write_each(batch)
+            finally:
+                db.session.remove()
+
+    def _write_each(self, batch):
+        written = 0
+        for event in batch:
+            try:
+                db.session.execute(AccessLog.__table__.insert(), [event])
+                db.session.commit()
+                written += 1
+            except Exception:
+                db.session.rollback()
+        with self._lock:
+            self._stats['written'] += written
+            self._stats['dropped'] += len(batch) - written
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._drain(self.flush_interval)
+            if batch:
+                self._write(batch)
+
+    def discard_document(self, document_id, retention=300):
+        """
+        丢弃文档尚未写入的访问日志（删除文档前调用）
+        只在写入器内部标记并等待正在写入的批次完成，不在调用方线程中提交或移除数据库会话
+        :param document_id: 文档ID
+        :param retention: 标记保留秒数，期间入队的该文档日志同样丢弃
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key in [key for key, marked in self._discarded.items() if now - marked > retention]:
+                del self._discarded[key]
+            self._discarded[document_id] = now
+        # 正在写入的批次在标记前已取出，等待其提交，之后由调用方一并删除这些记录
+        with self._write_lock:
+            pass
+
+    def flush(self):
+        """在当前线程中写入队列中的全部日志（仅用于进程退出时，不在请求线程中调用）"""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._write(batch)
+
+    def stop(self, timeout=5):
+        """停止后台线程并写入剩余日志（进程退出时调用）"""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+
+def get_access_log_writer():
+    """获取当前应用的访问日志写入器，ACCESS_LOG_ASYNC关闭时返回None"""
+    if not current_app.config.get('ACCESS_LOG_ASYNC', True):
+        return None
+
+    writer = current_app.extensions.get('access_log_writer')
+    if writer is None:
+        writer = AccessLogWriter(
+            current_app._get_current_object(),
+            batch_size=current_app.config.get('ACCESS_LOG_BATCH_SIZE', 200),
+            flush_interval=current_app.config.get('ACCESS_LOG_FLUSH_INTERVAL', 500) / 1000.0,
+            queue_size=current_app.config.get('ACCESS_LOG_QUEUE_SIZE', 10000)
+        )
+        current_app.extensions['access_log_writer'] = writer
+        atexit.register(writer.stop)
+    return writer
@@ -0,0 +1,211 @@
+import time
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app.models import db
+from app.models.access_log import AccessLog
+from app.models.document import Document
+from app.models.user import User
+from app.models.log_stats import AccessRollupHourly, AccessRollupDaily, RollupWatermark
+from app.utils.upsert import upsert_increment
+
+WATERMARK_NAME = 'access_rollup'
+
+# 进程内状态：上次执行时间（monotonic）和是否有任务正在执行
+_state = {'last_run': None, 'running': False}
+_lock = threading.Lock()
+
+
+class AccessRollupService:
+    """访问分析汇总服务类 - 将访问日志增量汇总到按小时、按天的聚合表，分析接口只读取聚合表"""
+
+    @staticmethod
+    def _get_watermark():
+        watermark = RollupWatermark.query.get(WATERMARK_NAME)
+        if watermark is None:
+            try:
+                db.session.add(RollupWatermark(name=WATERMARK_NAME, last_id=0))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+            watermark = RollupWatermark.query.get(WATERMARK_NAME)
+        return watermark.last_id
+
+    @staticmethod
+    def run(batch_size=5000, lag_seconds=None):
+        """
+        从水位之后继续汇总访问日志，每批的聚合增量与新水位在同一事务中提交，中断后重跑不会重复计数
+        只处理写入超过lag_seconds秒的日志，避免并发事务提交顺序与ID顺序不一致时漏掉记录
+        :param batch_size: 每批处理的日志数
+        :param lag_seconds: 延迟秒数，默认使用ACCESS_ROLLUP_LAG配置
+        :return: 本次汇总的日志数
+        """
+        if lag_seconds is None:
+            lag_seconds = current_app.config.get('ACCESS_ROLLUP_LAG', 60)
+        cutoff = datetime.utcnow() - timedelta(seconds=lag_seconds)
+
+        last_id = AccessRollupService._get_watermark()
+        max_id = db.session.query(func.max(AccessLog.id)).filter(AccessLog.created_at <= cutoff).scalar()
+        if not max_id or max_id <= last_id:
+            return 0
+
+        hourly_table = AccessRollupHourly.__table__
+        daily_table = AccessRollupDaily.__table__
+        watermark_table = RollupWatermark.__table__
+        processed = 0
+
+        while True:
+            rows = db.session.query(
+                AccessLog.id, AccessLog.created_at, AccessLog.document_id, AccessLog.user_id, AccessLog.action_type
+            ).filter(AccessLog.id > last_id, AccessLog.id <= max_id).order_by(AccessLog.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            hourly = Counter()
+            daily = Counter()
+            for row in rows:
+                hour = row.created_at.replace(minute=0, second=0, microsecond=0)
+                hourly[(hour, row.document_id, row.user_id, row.action_type)] += 1
+                daily[(hour.date(), row.document_id, row.user_id, row.action_type)] += 1
+
+            connection = db.session.connection()
+            for (bucket, document_id, user_id, action_type), count in sorted(hourly.items()):
+                upsert_increment(connection, hourly_table, {
+                    'bucket': bucket, 'document_id': document_id, 'user_id': user_id, 'action_type': action_type
+                }, {'count': count})
+            for (day, document_id, user_id, action_type), count in sorted(daily.items()):
+                upsert_increment(connection, daily_table, {
+                    'day': day, 'document_id': document_id, 'user_id': user_id, 'action_type': action_type
+                }, {'count': count})
+
+            # 水位未被其他汇总进程推进时才提交，否则放弃本批避免重复计数
+            new_id = rows[-1].id
+            result = db.session.execute(
+                watermark_table.update()
+                .where(watermark_table.c.name == WATERMARK_NAME, watermark_table.c.last_id == last_id)
+                .values(last_id=new_id, updated_at=datetime.utcnow())
+            )
+            if result.rowcount == 0:
+                db.session.rollback()
+                break
+            db.session.commit()
+
+            last_id = new_id
+            processed += len(rows)
+
+        AccessRollupService.prune_hourly()
+        with _lock:
+            _state['last_run'] = time.monotonic()
+        return processed
+
+    @staticmethod
+    def prune_hourly():
+        """删除超过ACCESS_ROLLUP_HOURLY_DAYS天的小时汇总（按天汇总保留）"""
+        days = current_app.config.get('ACCESS_ROLLUP_HOURLY_DAYS', 31)
+        cutoff = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=days)
+        AccessRollupHourly.query.filter(AccessRollupHourly.bucket < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def remove_document(document_id):
+        """删除文档时清除其汇总记录（随调用方事务提交）"""
+        AccessRollupHourly.query.filter_by(document_id=document_id).delete(synchronize_session=False)
+        AccessRollupDaily.query.filter_by(document_id=document_id).delete(synchronize_session=False)
+
+    @staticmethod
+    def _run_in_background(app):
+        try:
+            with app.app_context():
+                AccessRollupService.run()
+        except Exception as e:
+            print(f"访问分析汇总失败: {str(e)}")
+        finally:
+            with _lock:
+                _state['running'] = False
+
+    @staticmethod
+    def schedule_run():
+        """距上次汇总超过ACCESS_ROLLUP_INTERVAL秒时在后台线程中汇总，不阻塞请求"""
+        interval = current_app.config.get('ACCESS_ROLLUP_INTERVAL', 300)
+        with _lock:
+            fresh = _state['last_run'] is not None and time.monotonic() - _state['last_run'] < interval
+            if fresh or _state['running']:
+                return False
+            _state['running'] = True
+
+        threading.Thread(
+            target=AccessRollupService._run_in_background,
+            args=(current_app._get_current_object(),),
+            name='access-rollup',
+            daemon=True
+        ).start()
+        return True
+
+    @staticmethod
+    def get_top_documents(days=7, action_type=None, limit=10):
+        """
+        获取访问次数最多的文档（读取按天汇总表）
+        :return: [{'document_id', 'title', 'count'}]
+        """
+        start_day = datetime.utcnow().date() - timedelta(days=days - 1)
+        total = func.sum(AccessRollupDaily.count).label('total')
+        query = db.session.query(AccessRollupDaily.document_id, Document.title, total).join(
+            Document, Document.id == AccessRollupDaily.document_id
+        ).filter(AccessRollupDaily.day >= start_day)
+        if action_type:
+            query = query.filter(AccessRollupDaily.action_type == action_type)
+        rows = query.group_by(AccessRollupDaily.document_id, Document.title).order_by(total.desc()).limit(limit)
+        return [{'document_id': row.document_id, 'title': row.title, 'count': int(row.total)} for row in rows]
+
+    @staticmethod
+    def get_top_users(days=7, action_type=None, limit=10):
+        """
+        获取访问次数最多的用户（读取按天汇总表）
+        :return: [{'user_id', 'username', 'count'}]
+        """
+        start_day = datetime.utcnow().date() - timedelta(days=days - 1)
+        total = func.sum(AccessRollupDaily.count).label('total')
+        query = db.session.query(AccessRollupDaily.user_id, User.username, total).join(
+            User, User.id == AccessRollupDaily.user_id
+        ).filter(AccessRollupDaily.day >= start_day)
+        if action_type:
+            query = query.filter(AccessRollupDaily.action_type == action_type)
+        rows = query.group_by(AccessRollupDaily.user_id, User.username).order_by(total.desc()).limit(limit)
+        return [{'user_id': row.user_id, 'username': row.username, 'count': int(row.total)} for row in rows]
+
+    @staticmethod
+    def get_document_trend(document_id, granularity='day', days=30):
+        """
+        获取文档的访问趋势，没有访问的时段补0
+        :param granularity: hour（读取小时汇总）/ day（读取按天汇总）
+        :return: [{'time', 'counts': {操作类型: 次数}, 'total'}]
+        """
+        if granularity == 'hour':
+            model, column, step = AccessRollupHourly, AccessRollupHourly.bucket, timedelta(hours=1)
+            end = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+            start = end - timedelta(days=days) + step
+        elif granularity == 'day':
+            model, column, step = AccessRollupDaily, AccessRollupDaily.day, timedelta(days=1)
+            end = datetime.utcnow().date()
+            start = end - timedelta(days=days - 1)
+        else:
+            raise ValueError('统计粒度无效')
+
+        rows = db.session.query(column, model.action_type, func.sum(model.count)).filter(
+            model.document_id == document_id, column >= start
+        ).group_by(column, model.action_type)
+
+        buckets = {}
+        for bucket, action_type, count in rows:
+            buckets.setdefault(bucket, {})[action_type] = int(count)
+
+        trend = []
+        current = start
+        while current <= end:
+            counts = buckets.get(current, {})
+            trend.append({'time': current.isoformat(), 'counts': counts, 'total': sum(counts.values())})
+            current += step
+        return trend
@@ -0,0 +1,177 @@
+from sqlalchemy import select, true
+from app.models import db
+from app.models.document import DocumentCategory
+from app.models.category_closure import CategoryClosure
+from app.services.storage_stats import StorageStatsService
+
+
+class CategoryService:
+    """分类服务类"""
+
+    @staticmethod
+    def get_document_counts():
+        """
+        获取各分类直接包含的文档数
+        读取随文档增删改在同一事务中维护的存储统计（category维度），一次查询取出全部分类；
+        升级前已有文档的数据库在聚合初始化之前按文档表分组统计
+        :return: {分类ID: 文档数}
+        """
+        counts = StorageStatsService.get_counts('category')
+        return {int(key): count for key, (count, _) in counts.items() if key.isdigit()}
+
+    @staticmethod
+    def rollup_counts(categories, direct_counts):
+        """
+        沿parent_id将子分类的文档数累加到所有上级分类
+        :param categories: 分类对象列表（需包含全部分类）
+        :param direct_counts: {分类ID: 直接包含的文档数}
+        :return: {分类ID: 包含子分类在内的文档数}
+        """
+        parents = {cat.id: cat.parent_id for cat in categories}
+        totals = {cat.id: 0 for cat in categories}
+        for category_id in totals:
+            count = direct_counts.get(category_id, 0)
+            if not count:
+                continue
+            # 向上累加，遇到环时停止
+            visited = set()
+            current = category_id
+            while current is not None and current in totals and current not in visited:
+                visited.add(current)
+                totals[current] += count
+                current = parents.get(current)
+        return totals
+
+    @staticmethod
+    def build_tree(categories, direct_counts):
+        """
+        一次遍历构建分类树，并自下而上汇总每个节点（含子分类）的文档数
+        :param categories: 分类对象列表（需包含全部分类）
+        :param direct_counts: {分类ID: 直接包含的文档数}
+        :return: 根节点列表
+        """
+        nodes = {}
+        for cat in categories:
+            nodes[cat.id] = {
+                'id': cat.id,
+                'name': cat.name,
+                'description': cat.description,
+                'parent_id': cat.parent_id,
+                'document_count': direct_counts.get(cat.id, 0),
+                'total_document_count': 0,
+                'children': []
+            }
+
+        roots = []
+        for cat in categories:
+            parent = nodes.get(cat.parent_id)
+            if parent is not None and cat.parent_id != cat.id:
+                parent['children'].append(nodes[cat.id])
+            else:
+                roots.append(nodes[cat.id])
+
+        # 先序遍历后逆序处理，子节点总是先于父节点完成汇总
+        order = []
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node['children'])
+        for node in reversed(order):
+            node['total_document_count'] = node['document_count'] + sum(
+                child['total_document_count'] for child in node['children']
+            )
+        return roots
+
+    @staticmethod
+    def subtree_ids(category_id):
+        """
+        分类及其所有后代分类ID的子查询（基于闭包表），用于 Document.category_id.in_(...)
+        :param category_id: 分类ID
+        :return: select对象
+        """
+        table = CategoryClosure.__table__
+        return select(table.c.descendant_id).where(table.c.ancestor_id == category_id)
+
+    @staticmethod
+    def add_to_closure(category):
+        """新建分类后写入闭包表：自身一行，以及父分类的每个祖先各一行（需已flush取得ID）"""
+        table = CategoryClosure.__table__
+        db.session.execute(table.insert().values(ancestor_id=category.id, descendant_id=category.id, depth=0))
+        if category.parent_id is not None:
+            db.session.execute(table.insert().from_select(
+                ['ancestor_id', 'descendant_id', 'depth'],
+                select(table.c.ancestor_id, db.literal(category.id), table.c.depth + 1)
+                .where(table.c.descendant_id == category.parent_id)
+            ))
+
+    @staticmethod
+    def move_category(category, parent_id):
+        """
+        修改分类的父分类，并同步移动整个子树在闭包表中的路径
+        :param category: 分类对象
+        :param parent_id: 新的父分类ID，None表示移动到顶层
+        :raises ValueError: 父分类不存在或移动到自身子树下
+        """
+        if parent_id == category.parent_id:
+            return
+
+        table = CategoryClosure.__table__
+        if parent_id is not None:
+            if not DocumentCategory.query.get(parent_id):
+                raise ValueError('父分类不存在')
+            in_subtree = db.session.query(table.c.depth).filter(
+                table.c.ancestor_id == category.id, table.c.descendant_id == parent_id
+            ).first()
+            if in_subtree is not None:
+                raise ValueError('不能将分类移动到自身或其子分类下')
+
+        # 断开子树与原祖先之间的路径
+        subtree = [row[0] for row in db.session.execute(CategoryService.subtree_ids(category.id))]
+        db.session.execute(table.delete().where(
+            table.c.descendant_id.in_(subtree), table.c.ancestor_id.notin_(subtree)
+        ))
+
+        # 新父分类的每个祖先与子树中每个节点建立路径
+        if parent_id is not None:
+            above = table.alias('above')
+            below = table.alias('below')
+            db.session.execute(table.insert().from_select(
+                ['ancestor_id', 'descendant_id', 'depth'],
+                select(above.c.ancestor_id, below.c.descendant_id, above.c.depth + below.c.depth + 1)
+                .select_from(above.join(below, true()))
+                .where(above.c.descendant_id == parent_id, below.c.ancestor_id == category.id)
+            ))
+
+        category.parent_id = parent_id
+
+    @staticmethod
+    def remove_from_closure(category_id):
+        """删除（无子分类的）分类前清除其在闭包表中的路径"""
+        table = CategoryClosure.__table__
+        db.session.execute(table.delete().where(table.c.descendant_id == category_id))
+
+    @staticmethod
+    def rebuild_closure():
+        """
+        按parent_id重建闭包表（首次部署或数据不一致时使用）
+        :return: 写入的路径数
+        """
+        parents = dict(db.session.query(DocumentCategory.id, DocumentCategory.parent_id))
+        rows = []
+        for category_id in parents:
+            depth = 0
+            current = category_id
+            visited = set()
+            while current is not None and current in parents and current not in visited:
+                visited.add(current)
+                rows.append({'ancestor_id': current, 'descendant_id': category_id, 'depth': depth})
+                current = parents[current]
+                depth += 1
+
+        table = CategoryClosure.__table__
+        db.session.execute(table.delete())
+        if rows:
+            db.session.execute(table.insert(), rows)
+        db.session.commit()
+        return len(rows)
@@ -0,0 +1,72 @@
+from app.models import db
+from app.models.document import Document, DocumentCategory
+from app.models.user import User
+
+
+# 列表页需要的文档列（不包含content等大字段）
+LIST_COLUMNS = (
+    Document.id,
+    Document.title,
+    Document.description,
+    Document.file_path,
+    Document.file_name,
+    Document.file_type,
+    Document.file_size,
+    Document.category_id,
+    Document.creator_id,
+    Document.is_private,
+    Document.created_at,
+    Document.updated_at,
+    DocumentCategory.name.label('category_name'),
+    User.username.label('username')
+)
+
+
+def apply_visibility(query, user):
+    """
+    非管理员只能看到自己的文档和公开文档
+    :param query: 包含Document的查询对象
+    :param user: 当前用户，为None时不做限制
+    :return: 查询对象
+    """
+    if user is not None and user.role.name != 'admin':
+        query = query.filter(
+            (Document.creator_id == user.id) | (Document.is_private == False)
+        )
+    return query
+
+
+def document_list_query(user=None):
+    """
+    构建文档列表查询：只查询列表所需的列，并通过关联一次性取出分类名和创建者用户名，
+    避免逐行访问doc.category/doc.creator产生的N+1查询
+    :param user: 当前用户（用于可见性过滤）
+    :return: 结果为轻量行元组的查询对象
+    """
+    query = db.session.query(*LIST_COLUMNS).outerjoin(
+        DocumentCategory, DocumentCategory.id == Document.category_id
+    ).outerjoin(
+        User, User.id == Document.creator_id
+    )
+    return apply_visibility(query, user)
+
+
+def serialize_document_row(row):
+    """将文档列表行转换为响应字典"""
+    return {
+        'id': row.id,
+        'title': row.title,
+        'description': row.description,
+        'file_path': row.file_path,
+        'file_name': row.file_name,
+        'file_type': row.file_type,
+        'category_id': row.category_id,
+        'category_name': row.category_name,
+        'user_id': row.creator_id,
+        'username': row.username or '',
+        'is_private': row.is_private,
+        'file_size': row.file_size,
+        'version': 1,  # 默认版本号
+        'created_at': row.created_at.isoformat(),
+        'updated_at': row.updated_at.isoformat()
+    }
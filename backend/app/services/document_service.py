@@ -0,0 +1,186 @@
+import hashlib
+from flask import current_app
+from app.models import db
+from app.models.document import Document
+from app.utils.file_handler import get_file_path, calculate_file_hash, get_content_hash
+from app.utils.text_extractor import extract_text
+from app.utils import preview_cache, blob_store
+from app.services.search_service import SearchService
+from app.services.log_service import LogService
+from app.services.job_queue import JobQueue, register_job_handler
+from app.services.upload_quota_service import UploadQuotaService
+from app.services.document_version_service import DocumentVersionService, COMPACT_JOB
+
+
+def _content_digest(content):
+    """文档文本内容的SHA-256，用于判断后台任务添加后内容是否被修改"""
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
+class DocumentService:
+    """文档服务类 - 普通上传和分片上传共用的文档入库流程"""
+
+    @staticmethod
+    def extract_content(file_path, original_filename, file_type):
+        """
+        提取流式文件的文本内容，用于全文检索
+        :param file_path: 文件相对路径
+        :param original_filename: 原始文件名（用于判断格式）
+        :param file_type: 文件类型（layout/flow）
+        :return: 文本内容，非流式文件或无法提取时返回None
+        """
+        if file_type != 'flow':
+            return None
+        content = extract_text(get_file_path(file_path), original_filename)
+        if content:
+            content = content[:current_app.config.get('SEARCH_CONTENT_MAX_LENGTH', 20000)]
+        return content
+
+    @staticmethod
+    def create_document(user, file_path, unique_filename, original_filename, file_type, file_size,
+                        title=None, description='', category_id=None, is_private=False, request=None,
+                        content_hash=None, consume_quota=True):
+        """创建文档记录，建立检索索引和上传日志，并添加后台处理任务
+
+        Args:
+            user: 上传用户
+            file_path: 文件相对路径
+            unique_filename: 存储文件名
+            original_filename: 原始文件名
+            file_type: 文件类型（layout/flow）
+            file_size: 文件大小（字节）
+            title: 文档标题，默认为原始文件名
+            description: 文档描述
+            category_id: 分类ID
+            is_private: 是否私有
+            request: Flask请求对象（用于记录IP和User-Agent）
+            content_hash: 文件SHA-256，调用方已计算过时传入以免重复读取文件
+            consume_quota: 是否在本事务中占用上传配额（调用方已在同一事务中占用时传False）
+
+        Returns:
+            Document: 新建的文档对象
+
+        Raises:
+            UploadLimitExceeded: 上传数量已达上限
+        """
+        # 上传配额与文档记录在同一事务中提交，超过上限时抛出异常，由调用方回滚
+        if consume_quota:
+            UploadQuotaService.consume(user.id)
+
+        # 创建文档记录，文本提取、哈希计算和预览缓存由后台任务完成
+        document = Document(
+            title=title or original_filename,
+            description=description,
+            file_path=file_path,
+            file_name=unique_filename,
+            file_type=file_type,
+            category_id=category_id,
+            creator_id=user.id,
+            is_private=is_private,
+            file_size=file_size,
+            content_hash=content_hash or blob_store.digest_from_path(file_path),
+            document_type=file_type  # 使用文件类型作为文档类型
+        )
+
+        db.session.add(document)
+        db.session.flush()
+
+        # 先以标题、描述建立检索索引，文本提取后由后台任务更新
+        SearchService.index_document(document)
+        DocumentService.enqueue_processing(document, original_filename)
+        db.session.commit()
+        JobQueue.notify()
+
+        # 记录访问日志（异步批量写入）
+        LogService.log_document_access(user, document, 'upload', request)
+
+        return document
+
+    @staticmethod
+    def enqueue_processing(document, original_filename):
+        """
+        添加文档后台处理任务（随调用方事务提交，提交后需调用JobQueue.notify）
+        记录添加任务时的内容摘要，任务执行前用户已修改内容时不再以提取的文本覆盖
+        """
+        return JobQueue.enqueue('document.process', document.id, {
+            'file_path': document.file_path,
+            'original_filename': original_filename,
+            'content_digest': _content_digest(document.content)
+        })
+
+    @staticmethod
+    def process_document(document_id, payload):
+        """
+        文档后台处理任务：计算内容哈希、提取流式文件文本并更新检索索引、生成预览缓存
+        文件已被再次替换时跳过（新文件有自己的处理任务）；
+        任务添加后用户已修改内容时（任务延迟或重试期间）保留用户的内容，
+        否则以提取的文本替换原有内容，原有内容不为空时先保存为历史版本
+        :param document_id: 文档ID
+        :param payload: {'file_path', 'original_filename', 'content_digest'}
+        """
+        document = Document.query.get(document_id)
+        if document is None or document.file_path != payload.get('file_path'):
+            return
+
+        original_filename = payload.get('original_filename') or document.file_name
+        content_hash = document.content_hash or get_content_hash(document.file_path)
+        content = None
+        if document.file_type == 'flow':
+            content = DocumentService.extract_content(document.file_path, original_filename, document.file_type)
+
+        # 耗时的读取文件完成后再锁定文档行并比较内容，缩短与编辑请求并发的窗口
+        db.session.rollback()
+        document = Document.query.filter_by(id=document_id).with_for_update().first()
+        if document is None or document.file_path != payload.get('file_path'):
+            db.session.rollback()
+            return
+
+        document.content_hash = document.content_hash or content_hash
+        if document.file_type == 'flow' and content != document.content:
+            # 升级前添加的任务没有摘要，按添加时内容为空处理（新上传的文档）
+            if _content_digest(document.content) != payload.get('content_digest', _content_digest(None)):
+                current_app.logger.info(f"文档{document.id}的内容在处理任务添加后已被修改，保留修改后的内容")
+            else:
+                if document.content:
+                    DocumentVersionService.save_version(
+                        document, document.creator_id, document.content, created_at=document.updated_at,
+                        description='替换文件前的内容'
+                    )
+                document.content = content
+        SearchService.index_document(document)
+        db.session.commit()
+
+        preview_cache.populate(document.file_path, original_filename)
+
+    @staticmethod
+    def backfill_content_hashes(batch_size=100):
+        """
+        为缺少内容哈希的历史文档计算SHA-256，文件不存在的文档跳过
+        :param batch_size: 每批处理的文档数
+        :return: 已计算的文档数
+        """
+        count = 0
+        last_id = 0
+        while True:
+            documents = Document.query.filter(
+                Document.content_hash.is_(None),
+                Document.id > last_id
+            ).order_by(Document.id).limit(batch_size).all()
+            if not documents:
+                break
+
+            for document in documents:
+                last_id = document.id
+                try:
+                    document.content_hash = calculate_file_hash(document.file_path)
+                    count += 1
+                except OSError:
+                    current_app.logger.warning(f"文档{document.id}的文件不存在，跳过: {document.file_path}")
+            db.session.commit()
+        return count
+
+
+def register_document_jobs():
+    """注册文档相关的后台任务处理函数"""
+    register_job_handler('document.process', DocumentService.process_document)
+    register_job_handler(COMPACT_JOB, DocumentVersionService.compact_job)
@@ -0,0 +1,296 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import func
+from app.models import db
+from app.models.document import DocumentVersion
+from app.models.job import Job
+from app.services.job_queue import JobQueue
+from app.utils.text_delta import make_delta, apply_delta, pack_text, unpack_text, pack_delta, unpack_delta
+
+COMPACT_JOB = 'document.compact_versions'
+
+# 最近读取或保存的版本内容：(文档ID, 版本号) -> (内容摘要, 内容)，按内容总长度LRU淘汰
+# 读取时与数据库中版本的内容摘要比较，版本号被重新使用（回滚、删除后重建、其他进程保存）时不会读到旧内容
+_cache = OrderedDict()
+_cache_state = {'size': 0}
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+_lock = threading.Lock()
+
+
+def _cache_get(document_id, version_num, digest):
+    """读取缓存的版本内容，摘要与digest不一致的缓存项视为过期并删除"""
+    with _lock:
+        entry = _cache.get((document_id, version_num))
+        if entry is not None and entry[0] != digest:
+            _cache_state['size'] -= len(_cache.pop((document_id, version_num))[1])
+            entry = None
+        if entry is None:
+            _stats['misses'] += 1
+            return None
+        _cache.move_to_end((document_id, version_num))
+        _stats['hits'] += 1
+        return entry[1]
+
+
+def _cache_set(document_id, version_num, digest, content):
+    max_size = current_app.config.get('VERSION_CACHE_MAX_SIZE', 32 * 1024 * 1024)
+    if len(content) > max_size:
+        return
+    with _lock:
+        old = _cache.pop((document_id, version_num), None)
+        if old is not None:
+            _cache_state['size'] -= len(old[1])
+        _cache[(document_id, version_num)] = (digest, content)
+        _cache_state['size'] += len(content)
+        while _cache_state['size'] > max_size:
+            _, evicted = _cache.popitem(last=False)
+            _cache_state['size'] -= len(evicted[1])
+            _stats['evictions'] += 1
+
+
+def _cache_remove(document_id):
+    with _lock:
+        for key in [key for key in _cache if key[0] == document_id]:
+            _cache_state['size'] -= len(_cache.pop(key)[1])
+
+
+def _after_commit(session):
+    # 保存点（begin_nested）提交时同样触发，此时外层事务尚未提交
+    if session.in_nested_transaction():
+        return
+    for entry in session.info.pop('version_cache_pending', []):
+        _cache_set(*entry)
+
+
+def _after_rollback(session):
+    session.info.pop('version_cache_pending', None)
+
+
+def register_version_cache_listeners():
+    """注册会话监听：保存的版本内容在事务提交后放入缓存，回滚时丢弃"""
+    for event_name, listener in (
+        ('after_commit', _after_commit),
+        ('after_rollback', _after_rollback)
+    ):
+        if not db.event.contains(db.session, event_name, listener):
+            db.event.listen(db.session, event_name, listener)
+
+
+def _digest(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _is_planned_snapshot(version_num):
+    """每VERSION_SNAPSHOT_INTERVAL个版本保存一个完整快照（第1、N+1、2N+1...个版本）"""
+    interval = max(1, current_app.config.get('VERSION_SNAPSHOT_INTERVAL', 20))
+    return (version_num - 1) % interval == 0
+
+
+def _encode(content, base):
+    """
+    编码版本内容：没有上一版本内容时保存完整快照；
+    差异压缩后不小于完整快照时同样保存快照
+    :return: (storage, data)
+    """
+    full = pack_text(content)
+    if base is None:
+        return 'full', full
+    delta = pack_delta(make_delta(base, content))
+    if len(delta) >= len(full):
+        return 'full', full
+    return 'delta', delta
+
+
+def _set_encoded(version, content, storage, data):
+    version.storage = storage
+    version.data = data
+    version.content = None
+    version.content_size = len(content)
+    version.stored_size = len(data)
+    version.content_digest = _digest(content)
+
+
+class DocumentVersionService:
+    """文档版本服务类 - 版本按“快照 + 逐版本差异”压缩保存，读取时从最近的快照向后应用差异还原"""
+
+    @staticmethod
+    def save_version(document, user_id, content, created_at=None, description=None):
+        """
+        保存文档的一个历史版本（随调用方事务提交）
+        上一版本的内容在缓存中、且与数据库中上一版本的内容摘要一致时保存差异，
+        否则保存完整快照，并添加压缩任务在后台改写为差异，保存时不需要从数据库还原上一版本
+        :param document: 文档
+        :param user_id: 创建者ID
+        :param content: 版本内容
+        :param created_at: 版本时间
+        :param description: 版本说明
+        :return: DocumentVersion对象
+        """
+        content = content or ''
+        version_num = (db.session.query(func.max(DocumentVersion.version_num)).filter(
+            DocumentVersion.document_id == document.id
+        ).scalar() or 0) + 1
+
+        base = None
+        if not _is_planned_snapshot(version_num):
+            # 缓存的内容与数据库中的上一版本不一致时（如其他进程保存了同一版本号、版本被删除后重建）不使用，
+            # 以其为基准的差异无法还原
+            digest = DocumentVersionService._get_digest(document.id, version_num - 1)
+            base = _cache_get(document.id, version_num - 1, digest) if digest else None
+            if base is None:
+                DocumentVersionService.schedule_compaction(document.id)
+
+        storage, data = _encode(content, base)
+        version = DocumentVersion(
+            document_id=document.id,
+            version_num=version_num,
+            created_by=user_id,
+            created_at=created_at,
+            description=description
+        )
+        _set_encoded(version, content, storage, data)
+        db.session.add(version)
+        # 事务提交后才放入缓存，回滚时版本号可能被重新使用
+        db.session.info.setdefault('version_cache_pending', []).append(
+            (document.id, version_num, version.content_digest, content)
+        )
+        return version
+
+    @staticmethod
+    def _get_digest(document_id, version_num):
+        """数据库中版本的内容摘要（未压缩过的旧版本为空）"""
+        return db.session.query(DocumentVersion.content_digest).filter(
+            DocumentVersion.document_id == document_id,
+            DocumentVersion.version_num == version_num
+        ).scalar()
+
+    @staticmethod
+    def get_content(version):
+        """
+        还原版本内容：从不晚于该版本的最近快照开始依次应用差异，结果按内容摘要放入缓存
+        :param version: DocumentVersion对象
+        :return: 版本内容
+        """
+        if version.storage is None:
+            return version.content
+        content = _cache_get(version.document_id, version.version_num, version.content_digest)
+        if content is not None:
+            return content
+
+        if version.storage == 'full':
+            content = unpack_text(version.data)
+        else:
+            # 未压缩的旧版本同样可作为起点
+            start = db.session.query(func.max(DocumentVersion.version_num)).filter(
+                DocumentVersion.document_id == version.document_id,
+                DocumentVersion.version_num < version.version_num,
+                db.or_(DocumentVersion.storage != 'delta', DocumentVersion.storage.is_(None))
+            ).scalar()
+            if start is None:
+                raise ValueError(f'版本{version.version_num}缺少可用的快照')
+
+            chain = DocumentVersion.query.filter(
+                DocumentVersion.document_id == version.document_id,
+                DocumentVersion.version_num >= start,
+                DocumentVersion.version_num <= version.version_num
+            ).order_by(DocumentVersion.version_num).all()
+            if len(chain) != version.version_num - start + 1:
+                raise ValueError(f'版本{version.version_num}的差异链不完整')
+
+            content = DocumentVersionService._read_full(chain[0])
+            for item in chain[1:]:
+                content = apply_delta(content, unpack_delta(item.data))
+
+        if version.content_digest is not None:
+            _cache_set(version.document_id, version.version_num, version.content_digest, content)
+        return content
+
+    @staticmethod
+    def _read_full(version):
+        if version.storage is None:
+            return version.content or ''
+        return unpack_text(version.data)
+
+    @staticmethod
+    def schedule_compaction(document_id):
+        """添加文档版本压缩任务（随调用方事务提交），已有等待执行的任务时不重复添加"""
+        payload = json.dumps({'document_id': document_id})
+        exists = Job.query.filter(
+            Job.job_type == COMPACT_JOB, Job.status == 'pending', Job.payload == payload
+        ).first()
+        if exists is None:
+            # 不关联document_id，压缩任务不影响文档的处理状态
+            JobQueue.enqueue(COMPACT_JOB, payload={'document_id': document_id},
+                             delay=current_app.config.get('VERSION_COMPACT_DELAY', 300))
+
+    @staticmethod
+    def compact(document_id):
+        """
+        按当前快照间隔重新编码文档的全部版本：计划外的快照和未压缩的旧版本改写为差异，
+        计划快照位置上的差异改写为快照，内容不变；同时补全缺少的内容摘要
+        :param document_id: 文档ID
+        :return: {'versions', 'rewritten', 'size_before', 'size_after'}
+        """
+        versions = DocumentVersion.query.filter_by(document_id=document_id).order_by(DocumentVersion.version_num).all()
+        result = {'versions': len(versions), 'rewritten': 0, 'size_before': 0, 'size_after': 0}
+        previous = None
+        previous_num = None
+        for version in versions:
+            # 按版本顺序依次还原，每个差异只应用一次
+            contiguous = previous_num is not None and version.version_num == previous_num + 1
+            if version.storage == 'delta' and contiguous:
+                content = apply_delta(previous, unpack_delta(version.data))
+            elif version.storage == 'delta':
+                content = DocumentVersionService.get_content(version)
+            else:
+                content = DocumentVersionService._read_full(version)
+            result['size_before'] += version.stored_size if version.storage else len((version.content or '').encode('utf-8'))
+
+            # 版本号不连续时（历史数据）从快照重新开始
+            base = None if _is_planned_snapshot(version.version_num) or not contiguous else previous
+            storage, data = _encode(content, base)
+            if version.storage != storage or version.data != data:
+                _set_encoded(version, content, storage, data)
+                result['rewritten'] += 1
+            elif version.content_digest is None:
+                version.content_digest = _digest(content)
+            result['size_after'] += version.stored_size
+            previous = content
+            previous_num = version.version_num
+        db.session.commit()
+        return result
+
+    @staticmethod
+    def compact_job(document_id, payload):
+        """版本压缩任务处理函数"""
+        DocumentVersionService.compact(payload['document_id'])
+
+    @staticmethod
+    def compact_all():
+        """
+        压缩所有文档的版本（升级后转换旧版本，或修改VERSION_SNAPSHOT_INTERVAL后执行）
+        :return: 有版本被改写的文档数
+        """
+        document_ids = [row[0] for row in db.session.query(DocumentVersion.document_id).distinct().all()]
+        count = 0
+        for document_id in document_ids:
+            if DocumentVersionService.compact(document_id)['rewritten']:
+                count += 1
+        return count
+
+    @staticmethod
+    def remove_document(document_id):
+        """删除文档的全部版本（随调用方事务提交）"""
+        DocumentVersion.query.filter_by(document_id=document_id).delete()
+        _cache_remove(document_id)
+
+    @staticmethod
+    def get_cache_stats():
+        """获取版本内容缓存统计"""
+        with _lock:
+            total = _stats['hits'] + _stats['misses']
+            return dict(_stats, hit_rate=round(_stats['hits'] / total, 4) if total else 0,
+                        entries=len(_cache), size=_cache_state['size'])
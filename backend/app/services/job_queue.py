@@ -0,0 +1,332 @@
+import os
+import json
+import time
+import atexit
+import random
+import socket
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from app.models import db
+from app.models.job import Job
+from app.models.document import Document
+
+# 任务类型 -> 处理函数(document_id, payload)
+JOB_HANDLERS = {}
+
+
+def register_job_handler(job_type, handler):
+    """注册任务处理函数，处理函数抛出异常时任务按退避时间重试"""
+    JOB_HANDLERS[job_type] = handler
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'document_id': job.document_id,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_at': job.run_at.isoformat() if job.run_at else None,
+        'last_error': job.last_error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def _set_document_status(document_id, status):
+    if document_id:
+        db.session.execute(
+            update(Document.__table__).where(Document.__table__.c.id == document_id).values(processing_status=status)
+        )
+
+
+class JobQueue:
+    """后台任务队列服务类 - 任务保存在jobs表中，无需外部消息队列"""
+
+    @staticmethod
+    def enqueue(job_type, document_id=None, payload=None, max_attempts=None, delay=0):
+        """
+        添加任务（随调用方事务提交，提交后调用notify唤醒工作线程）
+        关联文档的处理状态同时置为pending
+        :param job_type: 任务类型
+        :param document_id: 关联文档ID
+        :param payload: 任务参数字典
+        :param max_attempts: 最大执行次数，默认使用JOB_MAX_ATTEMPTS配置
+        :param delay: 延迟执行的秒数
+        :return: Job对象
+        """
+        job = Job(
+            job_type=job_type,
+            document_id=document_id,
+            payload=json.dumps(payload or {}, ensure_ascii=False),
+            status='pending',
+            max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 5),
+            run_at=datetime.utcnow() + timedelta(seconds=delay)
+        )
+        db.session.add(job)
+        _set_document_status(document_id, 'pending')
+        return job
+
+    @staticmethod
+    def notify():
+        """
+        任务提交后唤醒执行方：thread模式唤醒进程内工作线程，
+        sync模式在当前线程中立即执行，external模式由独立工作进程轮询领取
+        """
+        mode = current_app.config.get('JOB_QUEUE_MODE', 'thread')
+        if mode == 'sync':
+            JobQueue.run_pending(f'sync:{os.getpid()}')
+        elif mode == 'thread':
+            get_job_worker_pool().notify()
+
+    @staticmethod
+    def claim(worker_id):
+        """
+        领取一个到期的任务：先查询候选任务，再以状态为pending为条件更新，
+        多个工作线程或进程并发领取时只有一个能更新成功，SQLite和MySQL均适用
+        :param worker_id: 工作线程标识
+        :return: Job对象，没有可执行的任务时返回None
+        """
+        now = datetime.utcnow()
+        table = Job.__table__
+        candidates = db.session.query(Job.id).filter(
+            Job.status == 'pending', Job.run_at <= now
+        ).order_by(Job.run_at, Job.id).limit(10).all()
+
+        for (job_id,) in candidates:
+            result = db.session.execute(
+                update(table).where(table.c.id == job_id, table.c.status == 'pending').values(
+                    status='running', locked_by=worker_id, locked_at=now, attempts=table.c.attempts + 1
+                )
+            )
+            if result.rowcount:
+                job = Job.query.get(job_id)
+                _set_document_status(job.document_id, 'processing')
+                db.session.commit()
+                return job
+        db.session.commit()
+        return None
+
+    @staticmethod
+    def _retry_delay(attempts):
+        """指数退避：JOB_RETRY_BASE_DELAY * 2^(n-1)，不超过JOB_RETRY_MAX_DELAY，并加入随机抖动"""
+        base = current_app.config.get('JOB_RETRY_BASE_DELAY', 5)
+        delay = min(base * (2 ** (attempts - 1)), current_app.config.get('JOB_RETRY_MAX_DELAY', 600))
+        return delay * random.uniform(1.0, 1.2)
+
+    @staticmethod
+    def _finish(job_id, error=None):
+        """记录任务结果，失败且未超过最大次数时按退避时间重新排队"""
+        job = Job.query.get(job_id)
+        now = datetime.utcnow()
+        job.locked_by = None
+        job.locked_at = None
+        if error is None:
+            job.status = 'succeeded'
+            job.finished_at = now
+            job.last_error = None
+        elif job.attempts < job.max_attempts:
+            job.status = 'pending'
+            job.run_at = now + timedelta(seconds=JobQueue._retry_delay(job.attempts))
+            job.last_error = error
+        else:
+            job.status = 'failed'
+            job.finished_at = now
+            job.last_error = error
+
+        if job.document_id:
+            db.session.flush()
+            unfinished = Job.query.filter(
+                Job.document_id == job.document_id, Job.status.in_(('pending', 'running'))
+            ).count()
+            if job.status == 'failed':
+                _set_document_status(job.document_id, 'failed')
+            elif unfinished:
+                _set_document_status(job.document_id, 'pending')
+            else:
+                _set_document_status(job.document_id, 'ready')
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def run_next(worker_id):
+        """
+        领取并执行一个任务
+        :return: 是否执行了任务
+        """
+        job = JobQueue.claim(worker_id)
+        if job is None:
+            return False
+
+        handler = JOB_HANDLERS.get(job.job_type)
+        job_id = job.id
+        try:
+            if handler is None:
+                raise ValueError(f'未知的任务类型: {job.job_type}')
+            handler(job.document_id, json.loads(job.payload or '{}'))
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"任务{job_id}执行失败: {str(e)}")
+            JobQueue._finish(job_id, error=str(e)[:2000])
+        else:
+            JobQueue._finish(job_id)
+        return True
+
+    @staticmethod
+    def run_pending(worker_id, limit=None):
+        """
+        在当前线程中执行已到期的任务，直到没有可执行的任务
+        :param limit: 最多执行的任务数
+        :return: 执行的任务数
+        """
+        count = 0
+        while limit is None or count < limit:
+            if not JobQueue.run_next(worker_id):
+                break
+            count += 1
+        return count
+
+    @staticmethod
+    def recover_stale():
+        """
+        将领取后超过JOB_LOCK_TIMEOUT秒仍未完成的任务（工作进程异常退出）重新排队
+        :return: 重新排队的任务数
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get('JOB_LOCK_TIMEOUT', 600))
+        table = Job.__table__
+        result = db.session.execute(
+            update(table).where(table.c.status == 'running', table.c.locked_at < cutoff).values(
+                status='pending', locked_by=None, locked_at=None, run_at=datetime.utcnow()
+            )
+        )
+        db.session.commit()
+        return result.rowcount or 0
+
+    @staticmethod
+    def retry_failed(document_id=None):
+        """
+        将失败的任务重新排队（重新计算执行次数）
+        :param document_id: 只重试该文档的任务
+        :return: 重新排队的任务数
+        """
+        query = Job.query.filter(Job.status == 'failed')
+        if document_id:
+            query = query.filter(Job.document_id == document_id)
+        jobs = query.all()
+        for job in jobs:
+            job.status = 'pending'
+            job.attempts = 0
+            job.run_at = datetime.utcnow()
+            job.finished_at = None
+            _set_document_status(job.document_id, 'pending')
+        db.session.commit()
+        return len(jobs)
+
+    @staticmethod
+    def remove_document_jobs(document_id):
+        """删除文档时清除其未执行的任务（随调用方事务提交）"""
+        Job.query.filter(
+            Job.document_id == document_id, Job.status != 'running'
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def get_document_jobs(document_id, limit=20):
+        return Job.query.filter_by(document_id=document_id).order_by(Job.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def get_stats():
+        """各状态的任务数"""
+        return dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status))
+
+
+class JobWorkerPool:
+    """任务工作线程池：轮询jobs表领取任务，有新任务提交时立即唤醒"""
+
+    def __init__(self, app, workers=2, poll_interval=2.0):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_recover = 0
+
+    def _alive(self):
+        return self._pid == os.getpid() and any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        """启动工作线程（fork出的工作进程中会重新启动）"""
+        if self._alive():
+            return
+        with self._lock:
+            if self._alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, args=(index,), name=f'job-worker-{index}', daemon=True)
+                for index in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def notify(self):
+        self.start()
+        self._wakeup.set()
+
+    def _recover_if_due(self):
+        """空闲时定期回收超时任务（多个线程中只有一个执行）"""
+        interval = self.app.config.get('JOB_LOCK_TIMEOUT', 600) / 2
+        with self._lock:
+            if time.monotonic() - self._last_recover < interval:
+                return
+            self._last_recover = time.monotonic()
+        JobQueue.recover_stale()
+
+    def _run(self, index):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+        while not self._stop.is_set():
+            processed = False
+            try:
+                with self.app.app_context():
+                    processed = JobQueue.run_next(worker_id)
+                    if not processed:
+                        self._recover_if_due()
+            except Exception as e:
+                print(f"任务工作线程异常: {str(e)}")
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def stop(self, timeout=5):
+        """停止工作线程，正在执行的任务完成后退出"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._pid == os.getpid():
+            for thread in self._threads:
+                thread.join(timeout)
+
+    def join(self):
+        """阻塞直到工作线程退出（独立工作进程中使用）"""
+        while any(thread.is_alive() for thread in self._threads):
+            for thread in self._threads:
+                thread.join(1)
+
+
+def get_job_worker_pool():
+    """获取当前应用的任务工作线程池"""
+    pool = current_app.extensions.get('job_worker_pool')
+    if pool is None:
+        pool = JobWorkerPool(
+            current_app._get_current_object(),
+            workers=current_app.config.get('JOB_WORKERS', 2),
+            poll_interval=current_app.config.get('JOB_POLL_INTERVAL', 2)
+        )
+        current_app.extensions['job_worker_pool'] = pool
+        atexit.register(pool.stop)
+    return pool
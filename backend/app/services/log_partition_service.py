@@ -0,0 +1,374 @@
+import os
+import re
+import gzip
+import json
+from datetime import datetime, date
+from flask import current_app
+from sqlalchemy import func, text, table, column
+from app.models import db
+from app.models.access_log import AccessLog
+from app.models.system_log import SystemLog
+
+# 按月分区的日志表
+PARTITIONED_MODELS = (AccessLog, SystemLog)
+
+_PARTITION_NAME = re.compile(r'^p(\d{4})(\d{2})$')
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _to_datetime(value):
+    return datetime.combine(value, datetime.min.time())
+
+
+def _partition_name(month):
+    return f'p{month.year:04d}{month.month:02d}'
+
+
+def _month_from_name(name):
+    match = _PARTITION_NAME.match(name or '')
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def _chunk_name(table_name, month):
+    return f'{table_name}_{_partition_name(month)}'
+
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class LogPartitionService:
+    """日志分区服务类 - 访问日志和系统日志按月分区，过期分区压缩归档后删除
+
+    MySQL使用原生RANGE分区（按月），删除和范围查询带时间条件时只访问相关分区；
+    其他数据库（SQLite）使用分表：当前表只保留最近LOG_PARTITION_HOT_MONTHS个月，
+    更早的日志按月移入<表名>_pYYYYMM分表，过期分表归档后整表删除
+    """
+
+    @staticmethod
+    def _is_mysql():
+        return db.engine.dialect.name == 'mysql'
+
+    @staticmethod
+    def _retention_months(table_name):
+        retention = current_app.config.get('LOG_RETENTION_MONTHS') or {}
+        return retention.get(table_name)
+
+    @staticmethod
+    def _archive_dir():
+        return current_app.config.get('LOG_ARCHIVE_DIR') or os.path.join(
+            current_app.config['FTP_STORAGE_PATH'], 'log_archive'
+        )
+
+    @staticmethod
+    def _chunk_table(model, name):
+        """与日志表列相同的分表（只用于查询和删除）"""
+        return table(name, *[column(c.name, c.type) for c in model.__table__.columns])
+
+    @staticmethod
+    def _list_chunks(table_name):
+        """列出SQLite分表，返回[(月份, 分表名)]"""
+        prefix = f'{table_name}_'
+        chunks = []
+        for name in db.inspect(db.engine).get_table_names():
+            if name.startswith(prefix):
+                month = _month_from_name(name[len(prefix):])
+                if month:
+                    chunks.append((month, name))
+        return sorted(chunks)
+
+    @staticmethod
+    def _mysql_partitions(table_name):
+        """列出MySQL分区，返回[(分区名, 行数估计)]，未分区时返回空列表"""
+        rows = db.session.execute(text(
+            'SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name AND PARTITION_NAME IS NOT NULL '
+            'ORDER BY PARTITION_ORDINAL_POSITION'
+        ), {'table_name': table_name}).fetchall()
+        return [(name, rows_count) for name, rows_count in rows]
+
+    @staticmethod
+    def tables_for_range(model, start=None, end=None):
+        """
+        获取时间范围[start, end)内的日志可能所在的表
+        MySQL分区由数据库按条件裁剪，只返回主表；SQLite返回主表和时间范围重叠的分表
+        :param model: AccessLog/SystemLog
+        :return: 表对象列表，均可通过.c访问列
+        """
+        tables = [model.__table__]
+        if LogPartitionService._is_mysql():
+            return tables
+        for month, name in LogPartitionService._list_chunks(model.__tablename__):
+            if start is not None and _to_datetime(_add_months(month, 1)) <= start:
+                continue
+            if end is not None and _to_datetime(month) >= end:
+                continue
+            tables.append(LogPartitionService._chunk_table(model, name))
+        return tables
+
+    @staticmethod
+    def delete_rows(model, since=None, **filters):
+        """
+        删除满足条件的日志（随调用方事务提交）
+        since为日志可能出现的最早时间，MySQL据此裁剪分区，SQLite跳过更早的分表
+        :param model: AccessLog/SystemLog
+        :param since: 最早时间
+        :param filters: 列名=值的等值条件
+        :return: 删除的行数
+        """
+        deleted = 0
+        for log_table in LogPartitionService.tables_for_range(model, since):
+            conditions = [log_table.c[name] == value for name, value in filters.items()]
+            if since is not None:
+                conditions.append(log_table.c.created_at >= since)
+            result = db.session.execute(log_table.delete().where(*conditions))
+            deleted += result.rowcount or 0
+        return deleted
+
+    @staticmethod
+    def _partition_clause(months):
+        definitions = [
+            f'PARTITION {_partition_name(month)} VALUES LESS THAN (TO_DAYS(\'{_add_months(month, 1).isoformat()}\'))'
+            for month in months
+        ]
+        definitions.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+        return ', '.join(definitions)
+
+    @staticmethod
+    def enable_partitioning():
+        """
+        将MySQL日志表改为按月RANGE分区（一次性操作，会重建表，需在维护窗口执行）
+        分区键必须包含在主键中且分区表不支持外键，因此主键改为(id, created_at)并删除外键；
+        SQLite等数据库无需转换，只补建模型中声明的索引
+        :return: {表名: 结果说明}
+        """
+        results = {}
+        for model in PARTITIONED_MODELS:
+            table_name = model.__tablename__
+            for index in model.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
+
+            if not LogPartitionService._is_mysql():
+                results[table_name] = 'chunked'
+                continue
+            if LogPartitionService._mysql_partitions(table_name):
+                results[table_name] = 'already partitioned'
+                continue
+
+            foreign_keys = db.session.execute(text(
+                'SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name AND CONSTRAINT_TYPE = \'FOREIGN KEY\''
+            ), {'table_name': table_name}).scalars().all()
+            for name in foreign_keys:
+                db.session.execute(text(f'ALTER TABLE {table_name} DROP FOREIGN KEY {name}'))
+
+            db.session.execute(text(f'UPDATE {table_name} SET created_at = UTC_TIMESTAMP() WHERE created_at IS NULL'))
+            first = db.session.execute(text(f'SELECT MIN(created_at) FROM {table_name}')).scalar()
+            current = _month_start(datetime.utcnow())
+            month = _month_start(first) if first else current
+            months = []
+            while month <= _add_months(current, current_app.config.get('LOG_PARTITION_PREMAKE_MONTHS', 3)):
+                months.append(month)
+                month = _add_months(month, 1)
+
+            db.session.execute(text(
+                f'ALTER TABLE {table_name} MODIFY created_at DATETIME NOT NULL, '
+                f'DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)'
+            ))
+            db.session.execute(text(
+                f'ALTER TABLE {table_name} PARTITION BY RANGE (TO_DAYS(created_at)) '
+                f'({LogPartitionService._partition_clause(months)})'
+            ))
+            db.session.commit()
+            results[table_name] = f'partitioned into {len(months)} monthly partitions'
+        return results
+
+    @staticmethod
+    def _ensure_mysql_partitions(table_name, existing):
+        """从pmax中拆分出未来LOG_PARTITION_PREMAKE_MONTHS个月的分区"""
+        months = [_month_from_name(name) for name, _ in existing if _month_from_name(name)]
+        target = _add_months(_month_start(datetime.utcnow()), current_app.config.get('LOG_PARTITION_PREMAKE_MONTHS', 3))
+        month = _add_months(max(months), 1) if months else _month_start(datetime.utcnow())
+        new_months = []
+        while month <= target:
+            new_months.append(month)
+            month = _add_months(month, 1)
+        if new_months:
+            db.session.execute(text(
+                f'ALTER TABLE {table_name} REORGANIZE PARTITION pmax INTO '
+                f'({LogPartitionService._partition_clause(new_months)})'
+            ))
+        return len(new_months)
+
+    @staticmethod
+    def _live_months(model, before):
+        """当前表中早于before的日志所在的月份（逐月跳过没有日志的月份）"""
+        log_table = model.__table__
+        months = []
+        month = None
+        while True:
+            condition = log_table.c.created_at < _to_datetime(before)
+            if month is not None:
+                condition = condition & (log_table.c.created_at >= _to_datetime(_add_months(month, 1)))
+            oldest = db.session.query(func.min(log_table.c.created_at)).filter(condition).scalar()
+            if oldest is None:
+                return months
+            month = _month_start(oldest)
+            months.append(month)
+
+    @staticmethod
+    def _rotate_chunks(model):
+        """将当前表中超出LOG_PARTITION_HOT_MONTHS个月的日志按月移入分表，每月一个事务"""
+        table_name = model.__tablename__
+        columns = ', '.join(c.name for c in model.__table__.columns)
+        hot_months = max(current_app.config.get('LOG_PARTITION_HOT_MONTHS', 2), 1)
+        live_start = _add_months(_month_start(datetime.utcnow()), -(hot_months - 1))
+
+        rotated = 0
+        for month in LogPartitionService._live_months(model, live_start):
+            chunk = _chunk_name(table_name, month)
+            bounds = {'start': _to_datetime(month), 'end': _to_datetime(_add_months(month, 1))}
+            db.session.execute(text(f'CREATE TABLE IF NOT EXISTS {chunk} AS SELECT {columns} FROM {table_name} WHERE 1 = 0'))
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS idx_{chunk}_created_at ON {chunk} (created_at)'))
+            db.session.execute(text(
+                f'INSERT INTO {chunk} ({columns}) SELECT {columns} FROM {table_name} '
+                f'WHERE created_at >= :start AND created_at < :end'
+            ), bounds)
+            result = db.session.execute(text(
+                f'DELETE FROM {table_name} WHERE created_at >= :start AND created_at < :end'
+            ), bounds)
+            db.session.commit()
+            rotated += result.rowcount or 0
+        return rotated
+
+    @staticmethod
+    def _archive(table_name, month, source_sql):
+        """
+        将一个分区的日志流式写入gzip压缩的JSON Lines文件
+        先写临时文件再改名，归档文件完整写入后才会删除分区
+        :return: (归档文件路径, 行数)
+        """
+        archive_dir = os.path.join(LogPartitionService._archive_dir(), table_name)
+        os.makedirs(archive_dir, exist_ok=True)
+        archive_path = os.path.join(archive_dir, f'{_chunk_name(table_name, month)}.jsonl.gz')
+        temp_path = archive_path + '.part'
+
+        count = 0
+        result = db.session.connection().execution_options(stream_results=True).execute(text(source_sql))
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            for row in result.mappings():
+                f.write(json.dumps({key: _serialize(value) for key, value in row.items()}, ensure_ascii=False))
+                f.write('\n')
+                count += 1
+        os.replace(temp_path, archive_path)
+        return archive_path, count
+
+    @staticmethod
+    def maintain(dry_run=False):
+        """
+        分区维护：预建未来分区（MySQL）或轮转分表（SQLite），归档并删除超过保留期的分区
+        保留期由LOG_RETENTION_MONTHS按表配置，未配置的表不归档；
+        访问日志轮转到分表和归档前先完成访问分析汇总，保证移出主表或被删除的日志都已计入汇总表
+        :param dry_run: 只列出将归档的分区
+        :return: {表名: 统计信息}
+        """
+        from app.services.access_rollup_service import AccessRollupService
+
+        results = {}
+        current = _month_start(datetime.utcnow())
+        for model in PARTITIONED_MODELS:
+            table_name = model.__tablename__
+            stats = {'created': 0, 'rotated': 0, 'archived': [], 'archived_rows': 0}
+            results[table_name] = stats
+            retention = LogPartitionService._retention_months(table_name)
+            cutoff = _add_months(current, -retention) if retention else None
+
+            if LogPartitionService._is_mysql():
+                partitions = LogPartitionService._mysql_partitions(table_name)
+                if not partitions:
+                    stats['skipped'] = '未分区，请先执行log-partition-enable'
+                    continue
+                if not dry_run:
+                    stats['created'] = LogPartitionService._ensure_mysql_partitions(table_name, partitions)
+                    db.session.commit()
+                expired = [
+                    (_month_from_name(name), name) for name, _ in partitions
+                    if cutoff and _month_from_name(name) and _month_from_name(name) < cutoff
+                ]
+            elif dry_run:
+                # 尚未轮转的过期日志也会在本次维护中移入分表后归档
+                months = set(month for month, _ in LogPartitionService._list_chunks(table_name))
+                if cutoff:
+                    months.update(LogPartitionService._live_months(model, cutoff))
+                expired = [(month, _chunk_name(table_name, month)) for month in sorted(months) if cutoff and month < cutoff]
+            else:
+                # 访问分析汇总按ID水位只读取主表，轮转前先完成汇总，移入分表的日志都已计入
+                if model is AccessLog:
+                    AccessRollupService.run(lag_seconds=0)
+                stats['rotated'] = LogPartitionService._rotate_chunks(model)
+                expired = [
+                    (month, name) for month, name in LogPartitionService._list_chunks(table_name)
+                    if cutoff and month < cutoff
+                ]
+
+            if dry_run:
+                stats['archived'] = [name for _, name in expired]
+                continue
+            if expired and model is AccessLog:
+                AccessRollupService.run(lag_seconds=0)
+
+            for month, name in expired:
+                if LogPartitionService._is_mysql():
+                    source_sql = f'SELECT * FROM {table_name} PARTITION ({name})'
+                    drop_sql = f'ALTER TABLE {table_name} DROP PARTITION {name}'
+                else:
+                    source_sql = f'SELECT * FROM {name}'
+                    drop_sql = f'DROP TABLE {name}'
+                archive_path, count = LogPartitionService._archive(table_name, month, source_sql)
+                db.session.execute(text(drop_sql))
+                db.session.commit()
+                stats['archived'].append(os.path.basename(archive_path))
+                stats['archived_rows'] += count
+        return results
+
+    @staticmethod
+    def get_partitions():
+        """
+        获取各日志表的分区信息
+        :return: {表名: {'mode', 'retention_months', 'partitions': [{'name', 'month', 'rows'}]}}
+        """
+        info = {}
+        for model in PARTITIONED_MODELS:
+            table_name = model.__tablename__
+            if LogPartitionService._is_mysql():
+                partitions = [
+                    {'name': name, 'month': _month_from_name(name).strftime('%Y-%m') if _month_from_name(name) else None,
+                     'rows': rows}
+                    for name, rows in LogPartitionService._mysql_partitions(table_name)
+                ]
+                mode = 'mysql' if partitions else 'none'
+            else:
+                partitions = [{'name': table_name, 'month': None,
+                               'rows': db.session.query(func.count()).select_from(model.__table__).scalar()}]
+                for month, name in LogPartitionService._list_chunks(table_name):
+                    rows = db.session.execute(text(f'SELECT COUNT(*) FROM {name}')).scalar()
+                    partitions.append({'name': name, 'month': month.strftime('%Y-%m'), 'rows': rows})
+                mode = 'chunked'
+            info[table_name] = {
+                'mode': mode,
+                'retention_months': LogPartitionService._retention_months(table_name),
+                'partitions': partitions
+            }
+        return info
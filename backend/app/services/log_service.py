@@ -2,6 +2,7 @@ from datetime import datetime
 from app.models import db
 from app.models.system_log import SystemLog
 from app.models.access_log import AccessLog
+from app.services.access_log_writer import get_access_log_writer
 import json
 
 
@@ -54,6 +55,9 @@ class LogService:
     def log_document_access(user, document, action_type, request=None):
         """记录文档访问日志
         
+        日志先进入进程内队列，由后台线程批量写入数据库，不在请求中单独提交事务；
+        ACCESS_LOG_ASYNC关闭时同步写入
+        
         Args:
             user: 用户对象
             document: 文档对象
@@ -69,16 +73,21 @@ class LogService:
                 ip_address = request.remote_addr
                 user_agent = request.headers.get('User-Agent', '')[:500]  # 限制长度
             
-            # 创建访问日志
-            log = AccessLog(
-                user_id=user.id,
-                document_id=document.id,
-                action_type=action_type,
-                ip_address=ip_address,
-                user_agent=user_agent
-            )
+            event = {
+                'user_id': user.id,
+                'document_id': document.id,
+                'action_type': action_type,
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                'created_at': datetime.utcnow()
+            }
             
-            db.session.add(log)
+            writer = get_access_log_writer()
+            if writer is not None:
+                return writer.enqueue(event)
+            
+            # 未启用异步写入时直接插入
+            db.session.execute(AccessLog.__table__.insert(), [event])
             db.session.commit()
             return True
         except Exception as e:
@@ -87,6 +96,23 @@ class LogService:
             print(f"记录访问日志失败: {str(e)}")
             return False
     
+    @staticmethod
+    def discard_access_logs(document_id):
+        """丢弃队列中该文档尚未写入的访问日志（删除文档前调用）"""
+        writer = get_access_log_writer()
+        if writer is not None:
+            writer.discard_document(document_id)
+    
+    @staticmethod
+    def get_access_log_writer_stats():
+        """获取异步访问日志写入器的队列深度、写入和丢弃计数"""
+        writer = get_access_log_writer()
+        if writer is None:
+            return {'enabled': False}
+        stats = writer.get_stats()
+        stats['enabled'] = True
+        return stats
+    
     @staticmethod
     def log_auth_grant(admin_user, user, role, permission=None, request=None):
         """记录权限授予日志
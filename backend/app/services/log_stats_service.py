@@ -0,0 +1,181 @@
+import time
+import threading
+from collections import Counter
+from datetime import datetime, date, timedelta
+from flask import current_app
+from sqlalchemy import func
+from app.models import db
+from app.models.access_log import AccessLog
+from app.models.log_stats import AccessLogDailyStat, AccessLogDailyUser
+from app.services.log_partition_service import LogPartitionService
+
+# 进程内汇总状态：上次汇总时间（monotonic）和是否有汇总任务正在执行
+_state = {'last_rollup': None, 'rolled_up_at': None, 'running': False}
+_lock = threading.Lock()
+
+
+def _to_date(value):
+    """DATE()在MySQL中返回date，在SQLite中返回字符串"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+class LogStatsService:
+    """访问日志统计服务类 - 由按天汇总表提供统计，接口耗时与日志量无关"""
+
+    @staticmethod
+    def rollup_days(start_day, end_day):
+        """
+        重新汇总指定日期范围（含首尾）内的访问日志
+        使用 GROUP BY DATE(created_at), action_type 和 GROUP BY DATE(created_at), user_id 两条查询
+        :param start_day: 起始日期
+        :param end_day: 结束日期
+        :return: 写入的汇总记录数
+        """
+        start_time = datetime.combine(start_day, datetime.min.time())
+        end_time = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+
+        # 日志可能分布在多个分表中，分别汇总后合并
+        action_counts = Counter()
+        user_days = set()
+        for log_table in LogPartitionService.tables_for_range(AccessLog, start_time, end_time):
+            in_range = (log_table.c.created_at >= start_time, log_table.c.created_at < end_time)
+            day_column = func.date(log_table.c.created_at)
+
+            action_rows = db.session.query(day_column, log_table.c.action_type, func.count()).select_from(
+                log_table
+            ).filter(*in_range).group_by(day_column, log_table.c.action_type)
+            for day, action_type, count in action_rows:
+                action_counts[(_to_date(day), action_type)] += count
+            user_rows = db.session.query(day_column, log_table.c.user_id).select_from(
+                log_table
+            ).filter(*in_range).group_by(day_column, log_table.c.user_id)
+            user_days.update((_to_date(day), user_id) for day, user_id in user_rows)
+
+        now = datetime.utcnow()
+        AccessLogDailyStat.query.filter(
+            AccessLogDailyStat.day >= start_day, AccessLogDailyStat.day <= end_day
+        ).delete(synchronize_session=False)
+        AccessLogDailyUser.query.filter(
+            AccessLogDailyUser.day >= start_day, AccessLogDailyUser.day <= end_day
+        ).delete(synchronize_session=False)
+
+        if action_counts:
+            db.session.execute(AccessLogDailyStat.__table__.insert(), [
+                {'day': day, 'action_type': action_type, 'count': count, 'updated_at': now}
+                for (day, action_type), count in action_counts.items()
+            ])
+        if user_days:
+            db.session.execute(AccessLogDailyUser.__table__.insert(), [
+                {'day': day, 'user_id': user_id} for day, user_id in user_days
+            ])
+        db.session.commit()
+        return len(action_counts) + len(user_days)
+
+    @staticmethod
+    def rollup_recent(days=None):
+        """
+        汇总最近的访问日志：首次执行时回填LOG_STATS_DAYS天，之后只重算最近一次汇总日期的前一天至今天
+        （异步写入的日志可能稍晚入库，因此前一天也重新汇总）
+        :param days: 指定重新汇总的天数，None表示自动判断
+        :return: 写入的汇总记录数
+        """
+        today = datetime.utcnow().date()
+        if days:
+            start_day = today - timedelta(days=days - 1)
+        else:
+            last_day = db.session.query(func.max(AccessLogDailyStat.day)).scalar()
+            if last_day is None:
+                start_day = today - timedelta(days=current_app.config.get('LOG_STATS_DAYS', 30))
+            else:
+                start_day = min(_to_date(last_day), today) - timedelta(days=1)
+
+        count = LogStatsService.rollup_days(start_day, today)
+        with _lock:
+            _state['last_rollup'] = time.monotonic()
+            _state['rolled_up_at'] = datetime.utcnow()
+        return count
+
+    @staticmethod
+    def _refresh_in_background(app):
+        try:
+            with app.app_context():
+                LogStatsService.rollup_recent()
+        except Exception as e:
+            print(f"访问日志统计汇总失败: {str(e)}")
+        finally:
+            with _lock:
+                _state['running'] = False
+
+    @staticmethod
+    def schedule_refresh():
+        """汇总结果超过LOG_STATS_REFRESH_INTERVAL秒未更新时，在后台线程中重新汇总，不阻塞请求"""
+        interval = current_app.config.get('LOG_STATS_REFRESH_INTERVAL', 300)
+        with _lock:
+            fresh = _state['last_rollup'] is not None and time.monotonic() - _state['last_rollup'] < interval
+            if fresh or _state['running']:
+                return False
+            _state['running'] = True
+
+        threading.Thread(
+            target=LogStatsService._refresh_in_background,
+            args=(current_app._get_current_object(),),
+            name='log-stats-rollup',
+            daemon=True
+        ).start()
+        return True
+
+    @staticmethod
+    def get_statistics(days=30, daily_days=7):
+        """
+        从汇总表读取访问日志统计
+        :param days: 操作类型和活跃用户的统计天数
+        :param daily_days: 日访问量的统计天数
+        :return: 统计信息字典
+        """
+        LogStatsService.schedule_refresh()
+
+        end_time = datetime.utcnow()
+        today = end_time.date()
+        start_day = today - timedelta(days=days)
+
+        operation_counts = dict(
+            db.session.query(AccessLogDailyStat.action_type, func.sum(AccessLogDailyStat.count))
+            .filter(AccessLogDailyStat.day >= start_day)
+            .group_by(AccessLogDailyStat.action_type)
+        )
+        operation_counts = {action: int(count) for action, count in operation_counts.items()}
+
+        active_users = db.session.query(func.count(func.distinct(AccessLogDailyUser.user_id))).filter(
+            AccessLogDailyUser.day >= start_day
+        ).scalar() or 0
+
+        daily_start = today - timedelta(days=daily_days - 1)
+        daily_counts = {
+            _to_date(day): int(count) for day, count in
+            db.session.query(AccessLogDailyStat.day, func.sum(AccessLogDailyStat.count))
+            .filter(AccessLogDailyStat.day >= daily_start)
+            .group_by(AccessLogDailyStat.day)
+        }
+        daily_stats = []
+        for i in range(daily_days):
+            day = daily_start + timedelta(days=i)
+            daily_stats.append({'date': day.strftime('%Y-%m-%d'), 'count': daily_counts.get(day, 0)})
+
+        with _lock:
+            rolled_up_at = _state['rolled_up_at']
+
+        return {
+            'operation_counts': operation_counts,
+            'active_users': active_users,
+            'daily_access_stats': daily_stats,
+            'total_access_logs': sum(operation_counts.values()),
+            'time_range': {
+                'start': (end_time - timedelta(days=days)).isoformat(),
+                'end': end_time.isoformat()
+            },
+            'rolled_up_at': rolled_up_at.isoformat() if rolled_up_at else None
+        }
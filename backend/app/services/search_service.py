@@ -0,0 +1,271 @@
+import re
+from collections import Counter
+from flask import current_app
+from sqlalchemy import func, select, literal, union_all, text
+from sqlalchemy.dialects.mysql import match
+from app.models import db
+from app.models.document import Document
+from app.models.search_index import SearchTerm
+
+
+# 各字段词项权重：标题命中优先于描述，描述优先于内容
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'description': 2.0,
+    'content': 1.0
+}
+
+# 词项最大长度（与SearchTerm.term列长度一致）
+MAX_TERM_LENGTH = 64
+
+# 中日韩字符按单字和二元组切分，其余按字母数字连续串切分
+_CJK_PATTERN = re.compile(r'[\u4e00-\u9fff\u3400-\u4dbf\u3040-\u30ff\uac00-\ud7af]+')
+_WORD_PATTERN = re.compile(r'[0-9a-z_]+')
+# 字母数字串中的纯字母、纯数字片段（report2024 -> report、2024）
+_WORD_PART_PATTERN = re.compile(r'[a-z]+|[0-9]+')
+
+
+def _word_terms(word):
+    """字母数字串及其中的纯字母、纯数字片段"""
+    terms = [word[:MAX_TERM_LENGTH]]
+    parts = _WORD_PART_PATTERN.findall(word)
+    if len(parts) > 1:
+        terms.extend(part[:MAX_TERM_LENGTH] for part in parts)
+    return terms
+
+
+def tokenize(text):
+    """
+    将文本切分为检索词项
+    中文等CJK文本切分为单字和二元组（单字用于单字检索，二元组与MySQL ngram全文解析器一致）；
+    英文和数字按连续字母数字串切分并转为小写，字母和数字混合的串同时索引其中的字母、数字片段
+    :param text: 原始文本
+    :return: 词项列表（可能包含重复项）
+    """
+    if not text:
+        return []
+
+    text = text.lower()
+    tokens = []
+
+    for run in _CJK_PATTERN.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+
+    for word in _WORD_PATTERN.findall(_CJK_PATTERN.sub(' ', text)):
+        tokens.extend(_word_terms(word))
+
+    return tokens
+
+
+def query_terms(keyword):
+    """
+    将检索关键词切分为查询词项
+    单个CJK字符按单字匹配，连续CJK文本按二元组匹配，字母数字串按前缀匹配（Rep可命中report）
+    :param keyword: 检索关键词
+    :return: [(词项, 是否前缀匹配)]
+    """
+    if not keyword:
+        return []
+
+    keyword = keyword.lower()
+    terms = []
+    for run in _CJK_PATTERN.findall(keyword):
+        if len(run) == 1:
+            terms.append((run, False))
+        else:
+            terms.extend((run[i:i + 2], False) for i in range(len(run) - 1))
+
+    for word in _WORD_PATTERN.findall(_CJK_PATTERN.sub(' ', keyword)):
+        terms.append((word[:MAX_TERM_LENGTH], True))
+
+    # 去重并保持顺序
+    return list(dict.fromkeys(terms))
+
+
+class LikeSearchBackend:
+    """LIKE模糊匹配检索（原有实现，保留用于对比和兜底）"""
+    name = 'like'
+
+    def index_document(self, document):
+        pass
+
+    def add_documents(self, documents):
+        pass
+
+    def remove_document(self, document_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def ensure_index(self):
+        """创建检索所需的数据库索引（已存在时跳过）"""
+        return False
+
+    def filter_query(self, query, keyword):
+        return query.filter(
+            (Document.title.like(f'%{keyword}%')) | (Document.description.like(f'%{keyword}%'))
+        ), None
+
+
+class InvertedIndexSearchBackend(LikeSearchBackend):
+    """基于search_terms表的倒排索引检索，适用于SQLite等不支持ngram全文索引的数据库"""
+    name = 'inverted'
+
+    def index_document(self, document):
+        """重建单个文档的倒排索引（不提交事务，由调用方统一提交）"""
+        self.remove_document(document.id)
+        self.add_documents([document])
+
+    def add_documents(self, documents):
+        """批量写入文档词项"""
+        mappings = []
+        for document in documents:
+            weights = Counter()
+            for field, field_weight in FIELD_WEIGHTS.items():
+                for term in tokenize(getattr(document, field, None)):
+                    weights[term] += field_weight
+            mappings.extend(
+                {'term': term, 'document_id': document.id, 'weight': weight}
+                for term, weight in weights.items()
+            )
+
+        if mappings:
+            db.session.bulk_insert_mappings(SearchTerm, mappings)
+
+    def remove_document(self, document_id):
+        SearchTerm.query.filter_by(document_id=document_id).delete(synchronize_session=False)
+
+    def clear(self):
+        SearchTerm.query.delete(synchronize_session=False)
+
+    def filter_query(self, query, keyword):
+        terms = query_terms(keyword)
+        # 只有单个字母或数字时前缀匹配的词项过多，使用LIKE
+        if not terms or all(prefix and len(term) < 2 for term, prefix in terms):
+            return LikeSearchBackend().filter_query(query, keyword)
+
+        # 每个查询词项对应一组命中记录（前缀匹配可命中多个词项），按词项序号区分
+        matches = []
+        for index, (term, prefix) in enumerate(terms):
+            if prefix:
+                # 前缀匹配使用范围条件，可利用(term, document_id)索引
+                condition = (SearchTerm.term >= term) & (SearchTerm.term < term + '\uffff')
+            else:
+                condition = SearchTerm.term == term
+            matches.append(
+                select(SearchTerm.document_id, literal(index).label('term_index'), SearchTerm.weight).where(condition)
+            )
+        matched = union_all(*matches).subquery() if len(matches) > 1 else matches[0].subquery()
+
+        # 要求命中全部查询词项，得分为命中词项权重之和
+        scores = db.session.query(
+            matched.c.document_id.label('document_id'),
+            func.sum(matched.c.weight).label('score')
+        ).group_by(
+            matched.c.document_id
+        ).having(
+            func.count(func.distinct(matched.c.term_index)) == len(terms)
+        ).subquery()
+
+        query = query.join(scores, scores.c.document_id == Document.id)
+        return query, scores.c.score
+
+
+class MySQLFulltextSearchBackend(LikeSearchBackend):
+    """基于MySQL FULLTEXT(ngram)索引的检索，索引由MySQL随写入自动维护"""
+    name = 'mysql'
+
+    # 随表创建的ngram全文索引（见app/models/document.py）
+    INDEX_NAME = 'ft_documents_text'
+
+    def ensure_index(self):
+        """已有数据库中documents表创建于全文索引之前时补建索引"""
+        indexes = {index['name'] for index in db.inspect(db.engine).get_indexes(Document.__tablename__)}
+        if self.INDEX_NAME in indexes:
+            return False
+        db.session.execute(text(
+            f'ALTER TABLE documents ADD FULLTEXT INDEX {self.INDEX_NAME} '
+            '(title, description, content) WITH PARSER ngram'
+        ))
+        db.session.commit()
+        return True
+
+    def filter_query(self, query, keyword):
+        # 布尔模式下每个关键词都必须命中
+        words = [w for w in re.split(r'\s+', keyword.strip()) if w]
+        against = ' '.join(f'+"{w.replace(chr(34), "")}"' for w in words)
+        # ngram分词的最小长度为2，单字关键词无法通过全文索引命中，使用LIKE
+        if not against or any(len(w) < 2 for w in words):
+            return LikeSearchBackend().filter_query(query, keyword)
+
+        score = match(
+            Document.title, Document.description, Document.content,
+            against=against
+        ).in_boolean_mode()
+        return query.filter(score > 0), score
+
+
+_BACKENDS = {
+    'like': LikeSearchBackend,
+    'inverted': InvertedIndexSearchBackend,
+    'mysql': MySQLFulltextSearchBackend
+}
+
+
+class SearchService:
+    """文档全文检索服务类"""
+
+    @staticmethod
+    def get_backend():
+        """根据SEARCH_BACKEND配置获取检索后端，auto时按数据库类型自动选择"""
+        backend_name = current_app.config.get('SEARCH_BACKEND', 'auto')
+        if backend_name == 'auto':
+            backend_name = 'mysql' if db.engine.dialect.name == 'mysql' else 'inverted'
+        return _BACKENDS.get(backend_name, LikeSearchBackend)()
+
+    @staticmethod
+    def index_document(document):
+        """文档新增或更新后维护检索索引"""
+        try:
+            SearchService.get_backend().index_document(document)
+        except Exception as e:
+            # 索引失败不应影响主流程
+            print(f"更新检索索引失败: {str(e)}")
+
+    @staticmethod
+    def remove_document(document_id):
+        """删除文档时移除检索索引"""
+        SearchService.get_backend().remove_document(document_id)
+
+    @staticmethod
+    def filter_query(query, keyword):
+        """
+        为文档查询添加关键词检索条件
+        :param query: Document查询对象
+        :param keyword: 搜索关键词
+        :return: (查询对象, 相关度得分表达式)，得分表达式为None时表示不支持排序
+        """
+        return SearchService.get_backend().filter_query(query, keyword)
+
+    @staticmethod
+    def rebuild_index(batch_size=500):
+        """重建全部文档的检索索引（MySQL下补建缺少的全文索引），返回处理的文档数"""
+        backend = SearchService.get_backend()
+        if backend.ensure_index():
+            print(f'已创建全文索引 {MySQLFulltextSearchBackend.INDEX_NAME}')
+        backend.clear()
+        db.session.commit()
+
+        count = 0
+        last_id = 0
+        while True:
+            documents = Document.query.filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+            if not documents:
+                break
+            backend.add_documents(documents)
+            db.session.commit()
+            count += len(documents)
+            last_id = documents[-1].id
+        return count
@@ -0,0 +1,220 @@
+import os
+import time
+import shutil
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from app.models import db
+from app.models.document import Document
+from app.models.file_blob import FileBlob
+from app.utils import blob_store, preview_cache
+from app.utils.file_handler import get_file_path, calculate_file_hash, build_storage_path
+
+
+class StorageService:
+    """文件存储服务类 - 存储迁移与引用计数维护"""
+
+    @staticmethod
+    def dedupe_legacy_files(batch_size=100, dry_run=False):
+        """
+        将历史文件（layout_files/flow_files下按唯一文件名保存的文件）迁入内容寻址存储并去重
+        每批文档先以硬链接放入文件块并提交数据库，提交成功后才删除原文件，中途中断可重复执行
+        :param batch_size: 每批处理的文档数
+        :param dry_run: 只统计可节省的空间，不修改文件和数据库
+        :return: 统计信息字典
+        """
+        stats = {'documents': 0, 'migrated': 0, 'duplicates': 0, 'missing': 0, 'saved_bytes': 0}
+        seen = set(h for (h,) in db.session.query(FileBlob.hash))
+        last_id = 0
+
+        while True:
+            documents = Document.query.filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+            if not documents:
+                break
+
+            legacy_paths = []
+            for document in documents:
+                last_id = document.id
+                if not document.file_path or blob_store.is_blob_path(document.file_path):
+                    continue
+                stats['documents'] += 1
+
+                full_path = get_file_path(document.file_path)
+                if not os.path.isfile(full_path):
+                    stats['missing'] += 1
+                    continue
+
+                digest = calculate_file_hash(document.file_path)
+                size = os.path.getsize(full_path)
+                if digest in seen:
+                    stats['duplicates'] += 1
+                    stats['saved_bytes'] += size
+                seen.add(digest)
+
+                if dry_run:
+                    continue
+
+                old_path = document.file_path
+                document.file_path = blob_store.store_file(old_path, digest, size, link=True)
+                document.content_hash = digest
+                legacy_paths.append(old_path)
+                stats['migrated'] += 1
+
+            if dry_run:
+                continue
+
+            db.session.commit()
+
+            # 数据库已指向文件块，删除原文件
+            for old_path in legacy_paths:
+                preview_cache.invalidate(old_path)
+                try:
+                    os.remove(get_file_path(old_path))
+                except OSError as e:
+                    current_app.logger.warning(f"删除已迁移的原文件失败: {old_path}, {str(e)}")
+
+        if not dry_run:
+            StorageService.reconcile_blob_references()
+        return stats
+
+    @staticmethod
+    def reconcile_blob_references():
+        """
+        按文档实际引用重新计算文件块引用计数，并删除不再被引用的文件块
+        :return: (修正的记录数, 删除的文件块数)
+        """
+        counts = dict(
+            db.session.query(Document.file_path, func.count(Document.id)).group_by(Document.file_path)
+        )
+        # 刚创建的文件块可能属于尚未提交的上传，不视为孤立
+        cutoff = datetime.utcnow() - timedelta(hours=1)
+        fixed = 0
+        orphans = []
+        for blob in FileBlob.query.all():
+            actual = counts.get(blob.path, 0)
+            if actual == 0:
+                if blob.created_at and blob.created_at > cutoff:
+                    continue
+                orphans.append(blob.hash)
+                blob.ref_count = 0
+            elif blob.ref_count != actual:
+                blob.ref_count = actual
+                fixed += 1
+        db.session.commit()
+
+        # 引用计数已清零，在持有行锁时删除记录和文件（期间有新上传引用的会跳过）
+        return fixed, blob_store.collect(orphans)
+
+    @staticmethod
+    def sweep_orphan_blob_files(min_age=3600, dry_run=False):
+        """
+        清理存储目录中没有文件块记录的文件（如释放引用后删除文件失败、进程中断遗留的文件），
+        以及超过min_age秒的临时文件；修改时间在min_age秒内的文件可能属于尚未提交的上传，不处理
+        :param min_age: 最短保留秒数
+        :param dry_run: 只统计，不删除文件
+        :return: {'files', 'orphans', 'orphan_bytes', 'temp_files'}
+        """
+        stats = {'files': 0, 'orphans': 0, 'orphan_bytes': 0, 'temp_files': 0}
+        cutoff = time.time() - min_age
+        known = set(h for (h,) in db.session.query(FileBlob.hash))
+        for digest, blob_path, mtime in blob_store.list_blob_files():
+            stats['files'] += 1
+            if digest in known or mtime > cutoff:
+                continue
+            full_path = get_file_path(blob_path)
+            # 遍历后可能有新上传创建了记录，删除前再确认一次
+            if FileBlob.query.get(digest) is not None:
+                continue
+            stats['orphans'] += 1
+            stats['orphan_bytes'] += os.path.getsize(full_path)
+            if not dry_run:
+                preview_cache.invalidate(blob_path)
+                os.remove(full_path)
+
+        for temp_path, mtime in list(blob_store.list_temp_files()):
+            if mtime > cutoff:
+                continue
+            stats['temp_files'] += 1
+            if not dry_run:
+                os.remove(get_file_path(temp_path))
+        return stats
+
+    @staticmethod
+    def _link_file(source_full, target_full):
+        """为文件建立硬链接（不支持时复制），原文件在数据库更新后再删除"""
+        os.makedirs(os.path.dirname(target_full), exist_ok=True)
+        try:
+            os.link(source_full, target_full)
+        except OSError:
+            shutil.copy2(source_full, target_full)
+
+    @staticmethod
+    def relayout_files(strategy=None, batch_size=200, pause=0.0):
+        """
+        在线迁移历史文件到分目录存储布局，并分批改写Document.file_path
+        每个文件先在新位置建立硬链接，数据库中路径未被并发修改时才更新，
+        每批提交后删除原文件，迁移期间新旧路径的请求都能读取到文件
+        :param strategy: 存储路径策略，默认使用STORAGE_PATH_STRATEGY配置
+        :param batch_size: 每批处理的文档数
+        :param pause: 每批之间暂停的秒数，降低对线上服务的影响
+        :return: 统计信息字典
+        """
+        stats = {'documents': 0, 'moved': 0, 'skipped': 0, 'missing': 0}
+        table = Document.__table__
+        last_id = 0
+
+        while True:
+            rows = db.session.query(
+                Document.id, Document.file_path, Document.file_type, Document.created_at
+            ).filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            moved = []
+            for row in rows:
+                last_id = row.id
+                if not row.file_path or blob_store.is_blob_path(row.file_path):
+                    continue
+                stats['documents'] += 1
+
+                target = build_storage_path(
+                    row.file_type, os.path.basename(row.file_path), row.created_at, strategy
+                )
+                if os.path.normpath(target) == os.path.normpath(row.file_path):
+                    stats['skipped'] += 1
+                    continue
+
+                source_full = get_file_path(row.file_path)
+                target_full = get_file_path(target)
+                if not os.path.isfile(source_full):
+                    stats['missing'] += 1
+                    continue
+                # 上次迁移中断时新位置可能已存在同一文件
+                if not os.path.exists(target_full):
+                    StorageService._link_file(source_full, target_full)
+
+                # 只在路径未被并发修改（如替换文件）时更新
+                result = db.session.execute(
+                    table.update().where(table.c.id == row.id, table.c.file_path == row.file_path)
+                    .values(file_path=target)
+                )
+                if result.rowcount:
+                    moved.append(row.file_path)
+                else:
+                    os.remove(target_full)
+                    stats['skipped'] += 1
+
+            db.session.commit()
+
+            for old_path in moved:
+                preview_cache.invalidate(old_path)
+                try:
+                    os.remove(get_file_path(old_path))
+                except OSError as e:
+                    current_app.logger.warning(f"删除已迁移的原文件失败: {old_path}, {str(e)}")
+            stats['moved'] += len(moved)
+
+            if pause:
+                time.sleep(pause)
+
+        return stats
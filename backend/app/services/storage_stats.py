@@ -0,0 +1,296 @@
+import os
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func
+from app.models import db
+from app.models.document import Document
+from app.models.storage_stat import StorageStat
+from app.utils.upsert import upsert_increment
+
+# 随文档变更实时维护的统计维度
+DOCUMENT_DIMENSIONS = ('total', 'document_type', 'category', 'user')
+
+# 聚合已按文档表初始化的标记记录（由迁移或rebuild_from_documents写入），
+# 升级前已有文档的数据库在初始化之前，读取时回退到按文档表统计
+SEEDED_KEY = ('meta', 'seeded')
+
+# 回退统计时各维度对应的文档列
+_DIMENSION_COLUMNS = {
+    'document_type': Document.document_type,
+    'category': Document.category_id,
+    'user': Document.creator_id
+}
+
+
+def _document_keys(document_type, category_id, creator_id):
+    """文档计入的各维度统计键"""
+    return [
+        ('total', 'all'),
+        ('document_type', document_type or ''),
+        ('category', str(category_id)),
+        ('user', str(creator_id))
+    ]
+
+
+def _upsert(connection, dimension, key, count, size):
+    """在当前事务中累加一条统计记录，不存在时创建"""
+    upsert_increment(
+        connection, StorageStat.__table__,
+        {'dimension': dimension, 'key': key},
+        {'document_count': count, 'total_size': size},
+        updated_column='updated_at'
+    )
+
+
+def _apply(connection, deltas):
+    """按固定顺序写入统计增量，避免并发事务间死锁"""
+    for (dimension, key), (count, size) in sorted(deltas.items()):
+        if count or size:
+            _upsert(connection, dimension, key, count, size)
+
+
+def _add(deltas, keys, count, size):
+    for key in keys:
+        current = deltas.setdefault(key, [0, 0])
+        current[0] += count
+        current[1] += size
+
+
+def _after_insert(mapper, connection, target):
+    deltas = {}
+    _add(deltas, _document_keys(target.document_type, target.category_id, target.creator_id), 1, target.file_size or 0)
+    _apply(connection, deltas)
+
+
+def _after_delete(mapper, connection, target):
+    deltas = {}
+    _add(deltas, _document_keys(target.document_type, target.category_id, target.creator_id), -1, -(target.file_size or 0))
+    _apply(connection, deltas)
+
+
+def _old_value(state, attr):
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, attr)
+
+
+def _after_update(mapper, connection, target):
+    state = db.inspect(target)
+    attrs = ('document_type', 'category_id', 'creator_id', 'file_size')
+    if not any(state.attrs[attr].history.has_changes() for attr in attrs):
+        return
+
+    old = {attr: _old_value(state, attr) for attr in attrs}
+    deltas = {}
+    _add(deltas, _document_keys(old['document_type'], old['category_id'], old['creator_id']), -1, -(old['file_size'] or 0))
+    _add(deltas, _document_keys(target.document_type, target.category_id, target.creator_id), 1, target.file_size or 0)
+    _apply(connection, deltas)
+
+
+def register_storage_stats_listeners():
+    """注册文档增删改监听，在同一事务中更新存储统计"""
+    for event_name, listener in (
+        ('after_insert', _after_insert),
+        ('after_update', _after_update),
+        ('after_delete', _after_delete)
+    ):
+        if not db.event.contains(Document, event_name, listener):
+            db.event.listen(Document, event_name, listener)
+
+
+def _mark_seeded(connection):
+    upsert_increment(
+        connection, StorageStat.__table__,
+        {'dimension': SEEDED_KEY[0], 'key': SEEDED_KEY[1]},
+        {'document_count': 0},
+        updated_column='updated_at'
+    )
+
+
+class StorageStatsService:
+    """存储统计服务类 - 读取实时聚合，并与数据库、文件系统对账"""
+
+    @staticmethod
+    def is_seeded():
+        """
+        聚合是否已按文档表初始化
+        新建的空数据库（还没有文档）直接标记为已初始化，之后的文档变更由监听维护；
+        已有文档但尚未初始化时返回False，读取方回退到按文档表统计，直到执行迁移或storage-reconcile --rebuild
+        """
+        if current_app.extensions.get('storage_stats_seeded'):
+            return True
+        seeded = StorageStat.query.filter_by(dimension=SEEDED_KEY[0], key=SEEDED_KEY[1]).first() is not None
+        if not seeded and db.session.query(Document.id).first() is None:
+            with db.engine.begin() as connection:
+                _mark_seeded(connection)
+            seeded = True
+        if seeded:
+            current_app.extensions['storage_stats_seeded'] = True
+        return seeded
+
+    @staticmethod
+    def _rows(dimension, limit=None):
+        query = StorageStat.query.filter(
+            StorageStat.dimension == dimension, StorageStat.document_count > 0
+        ).order_by(StorageStat.total_size.desc())
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+    @staticmethod
+    def _count_documents(dimension, limit=None):
+        """按文档表统计某一维度（聚合尚未初始化时使用）"""
+        column = _DIMENSION_COLUMNS[dimension]
+        size = func.coalesce(func.sum(Document.file_size), 0)
+        query = db.session.query(column, func.count(Document.id), size).group_by(column).order_by(size.desc())
+        if limit:
+            query = query.limit(limit)
+        return [('' if key is None else str(key), count, int(total)) for key, count, total in query]
+
+    @staticmethod
+    def get_counts(dimension):
+        """
+        获取某一维度全部取值的文档数和文件总大小
+        :param dimension: document_type/category/user
+        :return: {维度取值: (文档数, 文件总大小)}
+        """
+        if not StorageStatsService.is_seeded():
+            return {key: (count, size) for key, count, size in StorageStatsService._count_documents(dimension)}
+        rows = db.session.query(StorageStat.key, StorageStat.document_count, StorageStat.total_size).filter(
+            StorageStat.dimension == dimension
+        )
+        return {key: (count, size) for key, count, size in rows}
+
+    @staticmethod
+    def get_document_count(dimension, key):
+        """获取某一维度取值（如某个用户）的文档数"""
+        if not StorageStatsService.is_seeded():
+            column = _DIMENSION_COLUMNS[dimension]
+            return db.session.query(func.count(Document.id)).filter(column == key).scalar() or 0
+        stat = StorageStat.query.filter_by(dimension=dimension, key=str(key)).first()
+        return stat.document_count if stat else 0
+
+    @staticmethod
+    def get_summary():
+        """
+        获取存储统计概要（总数和按文档类型），只读取聚合记录
+        :return: 统计信息字典
+        """
+        summary = {'total_documents': 0, 'total_size': 0, 'by_document_type': {}, 'disk': {}}
+        dimensions = ('total', 'document_type', 'disk')
+        if not StorageStatsService.is_seeded():
+            for key, count, size in StorageStatsService._count_documents('document_type'):
+                summary['by_document_type'][key] = {'count': count, 'size': size}
+                summary['total_documents'] += count
+                summary['total_size'] += size
+            dimensions = ('disk',)
+
+        rows = StorageStat.query.filter(StorageStat.dimension.in_(dimensions)).all()
+        for row in rows:
+            if row.dimension == 'total':
+                summary['total_documents'] = row.document_count
+                summary['total_size'] = row.total_size
+            elif row.dimension == 'document_type':
+                summary['by_document_type'][row.key] = {'count': row.document_count, 'size': row.total_size}
+            else:
+                summary['disk'][row.key] = {
+                    'count': row.document_count,
+                    'size': row.total_size,
+                    'updated_at': row.updated_at.isoformat() if row.updated_at else None
+                }
+        return summary
+
+    @staticmethod
+    def get_breakdown(dimension, limit=20):
+        """
+        获取按分类或用户的存储统计，按文件总大小倒序
+        :param dimension: category/user
+        :param limit: 返回数量
+        :return: [{'key', 'count', 'size'}]
+        """
+        if not StorageStatsService.is_seeded():
+            return [
+                {'key': key, 'count': count, 'size': size}
+                for key, count, size in StorageStatsService._count_documents(dimension, limit)
+            ]
+        return [
+            {'key': row.key, 'count': row.document_count, 'size': row.total_size}
+            for row in StorageStatsService._rows(dimension, limit)
+        ]
+
+    @staticmethod
+    def rebuild_from_documents():
+        """
+        按文档表重新计算各维度聚合（聚合与文档表不一致时使用）
+        :return: 写入的统计记录数
+        """
+        deltas = {}
+        grouped = db.session.query(
+            Document.document_type, Document.category_id, Document.creator_id,
+            func.count(Document.id), func.coalesce(func.sum(Document.file_size), 0)
+        ).group_by(Document.document_type, Document.category_id, Document.creator_id)
+        for document_type, category_id, creator_id, count, size in grouped:
+            _add(deltas, _document_keys(document_type, category_id, creator_id), count, int(size))
+
+        StorageStat.query.filter(StorageStat.dimension.in_(DOCUMENT_DIMENSIONS)).delete(synchronize_session=False)
+        connection = db.session.connection()
+        _apply(connection, deltas)
+        _mark_seeded(connection)
+        db.session.commit()
+        current_app.extensions['storage_stats_seeded'] = True
+        return len(deltas)
+
+    @staticmethod
+    def reconcile_filesystem(batch_size=500, fix_sizes=False):
+        """
+        与文件系统对账：检查文档文件是否存在、大小是否一致，并统计实际占用空间
+        结果写入disk维度（referenced：文档引用的不重复文件，missing：文件缺失的文档），
+        供统计接口直接读取；fix_sizes为True时按实际大小修正文档记录（聚合随之更新）
+        :param batch_size: 每批检查的文档数
+        :param fix_sizes: 是否修正大小不一致的文档
+        :return: 统计信息字典
+        """
+        stats = {'documents': 0, 'missing': 0, 'size_mismatch': 0, 'fixed': 0, 'referenced_files': 0, 'referenced_size': 0}
+        storage_root = current_app.config['FTP_STORAGE_PATH']
+        seen_paths = set()
+        last_id = 0
+
+        while True:
+            documents = Document.query.filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+            if not documents:
+                break
+
+            for document in documents:
+                last_id = document.id
+                stats['documents'] += 1
+                full_path = os.path.join(storage_root, document.file_path or '')
+                if not document.file_path or not os.path.isfile(full_path):
+                    stats['missing'] += 1
+                    continue
+
+                size = os.path.getsize(full_path)
+                if document.file_path not in seen_paths:
+                    # 内容寻址存储中多个文档共享同一文件，只计算一次
+                    seen_paths.add(document.file_path)
+                    stats['referenced_files'] += 1
+                    stats['referenced_size'] += size
+
+                if size != document.file_size:
+                    stats['size_mismatch'] += 1
+                    if fix_sizes:
+                        document.file_size = size
+                        stats['fixed'] += 1
+            db.session.commit()
+
+        table = StorageStat.__table__
+        now = datetime.utcnow()
+        StorageStat.query.filter_by(dimension='disk').delete(synchronize_session=False)
+        db.session.execute(table.insert(), [
+            {'dimension': 'disk', 'key': 'referenced', 'document_count': stats['referenced_files'],
+             'total_size': stats['referenced_size'], 'updated_at': now},
+            {'dimension': 'disk', 'key': 'missing', 'document_count': stats['missing'],
+             'total_size': 0, 'updated_at': now}
+        ])
+        db.session.commit()
+        return stats
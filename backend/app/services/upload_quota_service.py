@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, update
+from app.models import db
+from app.models.document import Document
+from app.models.upload_quota import UploadQuota
+from app.utils.upsert import upsert_increment
+
+# 统计周期 -> 上限配置项（未配置或为None时不限制，仅计数）
+QUOTA_PERIODS = {
+    'day': 'MAX_UPLOAD_PER_DAY',
+    'week': 'MAX_UPLOAD_PER_WEEK',
+    'month': 'MAX_UPLOAD_PER_MONTH'
+}
+
+PERIOD_NAMES = {'day': '今日', 'week': '本周', 'month': '本月'}
+
+
+class UploadLimitExceeded(ValueError):
+    """上传数量超过配额"""
+
+    def __init__(self, period):
+        self.period = period
+        super().__init__(f'{PERIOD_NAMES[period]}上传文件数量已达上限')
+
+
+def period_starts(now=None):
+    """各统计周期的开始日期（本地时间）：当天、本周一、本月1日"""
+    today = (now or datetime.now()).date()
+    return {
+        'day': today,
+        'week': today - timedelta(days=today.weekday()),
+        'month': today.replace(day=1)
+    }
+
+
+class UploadQuotaService:
+    """上传配额服务类 - 按用户、周期维护上传计数，检查和统计只读取计数行，不再统计documents表"""
+
+    @staticmethod
+    def get_limits():
+        """各统计周期的上传上限 {周期: 上限或None}"""
+        return {period: current_app.config.get(key) for period, key in QUOTA_PERIODS.items()}
+
+    @staticmethod
+    def consume(user_id):
+        """
+        占用一次上传配额（随调用方事务提交，回滚时计数一并撤销）
+        计数行不存在时先以0插入，再以“计数小于上限”为条件递增：
+        并发上传在同一计数行上串行执行条件更新，不会超过上限
+        :param user_id: 用户ID
+        :raises UploadLimitExceeded: 任一周期已达上限
+        """
+        connection = db.session.connection()
+        table = UploadQuota.__table__
+        limits = UploadQuotaService.get_limits()
+        # 按固定顺序更新各周期的计数行，避免并发事务间死锁
+        for period, start in period_starts().items():
+            keys = {'user_id': user_id, 'period': period, 'period_start': start}
+            limit = limits.get(period)
+            if limit is None:
+                upsert_increment(connection, table, keys, {'count': 1}, updated_column='updated_at')
+                continue
+
+            upsert_increment(connection, table, keys, {'count': 0})
+            result = connection.execute(
+                update(table).where(
+                    table.c.user_id == user_id, table.c.period == period,
+                    table.c.period_start == start, table.c.count < limit
+                ).values(count=table.c.count + 1, updated_at=datetime.utcnow())
+            )
+            if not result.rowcount:
+                raise UploadLimitExceeded(period)
+
+    @staticmethod
+    def get_counts(user_id):
+        """
+        用户当前各周期的上传数
+        :return: {周期: 上传数}
+        """
+        starts = period_starts()
+        rows = UploadQuota.query.filter(
+            UploadQuota.user_id == user_id,
+            db.or_(*[
+                db.and_(UploadQuota.period == period, UploadQuota.period_start == start)
+                for period, start in starts.items()
+            ])
+        ).all()
+        counts = {period: 0 for period in starts}
+        for row in rows:
+            counts[row.period] = row.count
+        return counts
+
+    @staticmethod
+    def get_remaining(user_id, counts=None):
+        """
+        用户剩余可上传数（各有上限周期中的最小值），均不限制时返回None
+        :param counts: 已查询的各周期上传数
+        """
+        counts = counts if counts is not None else UploadQuotaService.get_counts(user_id)
+        remaining = [
+            max(0, limit - counts.get(period, 0))
+            for period, limit in UploadQuotaService.get_limits().items() if limit is not None
+        ]
+        return min(remaining) if remaining else None
+
+    @staticmethod
+    def rebuild(user_id=None):
+        """
+        按documents表重新统计当前各周期的上传数（首次部署或修正计数时使用）
+        已删除的文档无法统计，因此重建后的计数可能小于实际上传数
+        :param user_id: 只重建该用户的计数
+        :return: 写入的计数行数
+        """
+        table = UploadQuota.__table__
+        starts = period_starts()
+        count = 0
+        for period, start in starts.items():
+            # 周期开始时间为本地时间，与datetime.now()计算的当日零点一致
+            since = datetime.combine(start, datetime.min.time())
+            query = db.session.query(Document.creator_id, func.count(Document.id)).filter(
+                Document.created_at >= since
+            )
+            if user_id:
+                query = query.filter(Document.creator_id == user_id)
+            totals = dict(query.group_by(Document.creator_id).all())
+
+            delete = table.delete().where(table.c.period == period, table.c.period_start == start)
+            if user_id:
+                delete = delete.where(table.c.user_id == user_id)
+            db.session.execute(delete)
+            if totals:
+                db.session.execute(table.insert(), [
+                    {'user_id': creator_id, 'period': period, 'period_start': start,
+                     'count': total, 'updated_at': datetime.utcnow()}
+                    for creator_id, total in totals.items()
+                ])
+            count += len(totals)
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def prune(keep_days=None):
+        """
+        删除已结束周期的计数行
+        :param keep_days: 保留最近的天数，默认使用UPLOAD_QUOTA_RETENTION_DAYS配置
+        :return: 删除的行数
+        """
+        if keep_days is None:
+            keep_days = current_app.config.get('UPLOAD_QUOTA_RETENTION_DAYS', 90)
+        cutoff = period_starts()['month'] - timedelta(days=keep_days)
+        result = db.session.execute(UploadQuota.__table__.delete().where(UploadQuota.period_start < cutoff))
+        db.session.commit()
+        return result.rowcount or 0
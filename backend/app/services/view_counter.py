@@ -0,0 +1,155 @@
+import os
+import atexit
+import threading
+from flask import current_app
+from sqlalchemy import bindparam, func
+from app.models import db
+from app.models.document import Document
+from app.services.document_query import document_list_query
+
+
+class ViewCounter:
+    """文档查看次数聚合器：在内存中累加各文档的查看次数，由后台线程定期批量写回数据库"""
+
+    def __init__(self, app, flush_interval=5.0):
+        self.app = app
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {'views': 0, 'flushes': 0, 'flushed_views': 0, 'errors': 0}
+
+    def _ensure_started(self):
+        """首次计数时启动后台线程（fork出的工作进程中会重新启动）"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='view-counter', daemon=True)
+            self._thread.start()
+
+    def increment(self, document_id, count=1):
+        """累加文档查看次数（只修改内存，不访问数据库）"""
+        self._ensure_started()
+        with self._lock:
+            self._pending[document_id] = self._pending.get(document_id, 0) + count
+            self._stats['views'] += count
+
+    def get_pending(self):
+        """获取尚未写回数据库的查看次数 {document_id: 次数}"""
+        with self._lock:
+            return dict(self._pending)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        将累计的查看次数写回数据库：每个文档执行一次 views_count = views_count + N，
+        所有文档的更新在同一事务中批量提交
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        table = Document.__table__
+        stmt = table.update().where(table.c.id == bindparam('doc_id')).values(
+            views_count=func.coalesce(table.c.views_count, 0) + bindparam('delta')
+        )
+        rows = [{'doc_id': doc_id, 'delta': delta} for doc_id, delta in sorted(pending.items())]
+
+        with self.app.app_context():
+            try:
+                db.session.execute(stmt, rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                # 写回失败时把次数放回内存，下次再写
+                with self._lock:
+                    for doc_id, delta in pending.items():
+                        self._pending[doc_id] = self._pending.get(doc_id, 0) + delta
+                    self._stats['errors'] += 1
+                print(f"写回文档查看次数失败: {str(e)}")
+                return 0
+            finally:
+                db.session.remove()
+
+        total = sum(pending.values())
+        with self._lock:
+            self._stats['flushes'] += 1
+            self._stats['flushed_views'] += total
+        return total
+
+    def stop(self, timeout=5):
+        """停止后台线程并写回剩余计数（进程退出时调用）"""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending_documents'] = len(self._pending)
+            stats['pending_views'] = sum(self._pending.values())
+        return stats
+
+
+def get_view_counter():
+    """获取当前应用的查看次数聚合器"""
+    counter = current_app.extensions.get('view_counter')
+    if counter is None:
+        counter = ViewCounter(
+            current_app._get_current_object(),
+            flush_interval=current_app.config.get('VIEW_COUNT_FLUSH_INTERVAL', 5)
+        )
+        current_app.extensions['view_counter'] = counter
+        atexit.register(counter.stop)
+    return counter
+
+
+class ViewCountService:
+    """文档查看次数服务类"""
+
+    @staticmethod
+    def record_view(document):
+        """记录一次文档查看"""
+        get_view_counter().increment(document.id)
+
+    @staticmethod
+    def get_views_count(document):
+        """获取文档查看次数（包含尚未写回数据库的部分）"""
+        pending = get_view_counter().get_pending()
+        return (document.views_count or 0) + pending.get(document.id, 0)
+
+    @staticmethod
+    def get_most_viewed(user=None, limit=10):
+        """
+        获取查看次数最多的文档：数据库中已写回的次数加上内存中尚未写回的次数
+        :param user: 当前用户（用于可见性过滤）
+        :param limit: 返回数量
+        :return: [(文档行, 查看次数)]，按查看次数倒序
+        """
+        pending = get_view_counter().get_pending()
+        query = document_list_query(user).add_columns(Document.views_count)
+
+        # 取数据库中的前N名，再补上有未写回计数的文档，合并后重新排序
+        rows = {row.id: row for row in query.order_by(Document.views_count.desc(), Document.id.desc()).limit(limit)}
+        missing = [doc_id for doc_id in pending if doc_id not in rows]
+        if missing:
+            for row in query.filter(Document.id.in_(missing)):
+                rows[row.id] = row
+
+        ranked = sorted(
+            ((row, (row.views_count or 0) + pending.get(row.id, 0)) for row in rows.values()),
+            key=lambda item: (item[1], item[0].id),
+            reverse=True
+        )
+        return ranked[:limit]
@@ -1,9 +1,134 @@
+import time
+import threading
+from types import SimpleNamespace
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-from app.models.user import User
+from flask import jsonify, g, current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from sqlalchemy.orm import joinedload
+from app.models.user import User, Role, Permission
+from app.utils.auth_versions import get_permission_version, bump_user_version, bump_role_version
 # 注：当前文件位于 app/utils/ 目录下
 
+# 权限位定义，令牌中以位掩码形式携带已启用的权限
+PERMISSION_BITS = {
+    'view': 1,
+    'upload': 2,
+    'edit': 4,
+    'user_manage': 8,
+    'category_manage': 16
+}
+
+# 进程级角色权限缓存：role_id -> (过期时间, 角色名, 已启用的权限集合)
+_role_cache = {}
+_role_cache_lock = threading.Lock()
+
+
+def get_role_permissions(role_id, use_cache=True):
+    """
+    获取角色名和已启用的权限集合，结果在进程内按PERMISSION_CACHE_TTL缓存
+    :param role_id: 角色ID
+    :param use_cache: 为False时直接查询数据库（并刷新缓存）
+    :return: (角色名, 权限集合)，角色不存在时返回(None, 空集合)
+    """
+    now = time.monotonic()
+    if use_cache:
+        with _role_cache_lock:
+            cached = _role_cache.get(role_id)
+        if cached and cached[0] > now:
+            return cached[1], cached[2]
+
+    role = Role.query.get(role_id) if role_id is not None else None
+    if not role:
+        return None, frozenset()
+
+    permissions = frozenset(
+        p.permission_type for p in Permission.query.filter_by(role_id=role_id, is_enabled=True)
+    )
+    ttl = current_app.config.get('PERMISSION_CACHE_TTL', 60)
+    with _role_cache_lock:
+        _role_cache[role_id] = (now + ttl, role.name, permissions)
+    return role.name, permissions
+
+
+def invalidate_permission_cache(role_id=None, user_id=None):
+    """
+    角色权限或用户信息变更后清除缓存，并使已签发令牌中的权限声明失效
+    :param role_id: 权限变更的角色ID
+    :param user_id: 信息变更的用户ID（禁用、删除、更换角色等）
+    两者都为None时清除全部角色缓存
+    """
+    with _role_cache_lock:
+        if role_id is None and user_id is None:
+            _role_cache.clear()
+        elif role_id is not None:
+            _role_cache.pop(role_id, None)
+
+    if role_id is not None:
+        bump_role_version(role_id)
+    if user_id is not None:
+        bump_user_version(user_id)
+
+    # 清除本次请求中已缓存的用户
+    g.pop('current_user', None)
+    g.pop('token_user', None)
+
+
+class TokenUser:
+    """由令牌中权限声明构造的轻量用户对象，用于读接口免查库鉴权和记录日志"""
+
+    def __init__(self, user_id, claims):
+        self.id = int(user_id)
+        self.username = claims.get('username')
+        self.role_id = claims.get('role_id')
+        self.role = SimpleNamespace(id=self.role_id, name=claims.get('role'))
+        self.status = True
+        self.permission_mask = claims.get('perm_mask', 0)
+
+    @property
+    def is_admin(self):
+        return self.role.name == 'admin'
+
+    def has_permission(self, permission_type):
+        return self.is_admin or bool(self.permission_mask & PERMISSION_BITS.get(permission_type, 0))
+
+
+def build_permission_claims(user):
+    """
+    生成令牌中的权限声明：角色、权限位掩码和权限版本号
+    :param user: 用户对象
+    :return: 声明字典
+    """
+    # 先读取版本号，再从数据库读取权限（不使用进程缓存）：
+    # 两次读取之间权限发生变更时版本号随之递增，令牌中的旧版本号会被判定为失效
+    version = get_permission_version(user.id, user.role_id)
+    _, permissions = get_role_permissions(user.role_id, use_cache=False)
+    mask = 0
+    for permission_type in permissions:
+        mask |= PERMISSION_BITS.get(permission_type, 0)
+    return {
+        'role_id': user.role_id,
+        'perm_mask': mask,
+        'perm_ver': version
+    }
+
+
+def _get_token_user():
+    """
+    令牌中的权限版本号与版本表一致时，直接由声明构造用户对象；
+    用户被禁用或权限变更后版本号不一致，返回None以回退到数据库校验
+    """
+    if current_app.config.get('AUTH_PERMISSION_MODE', 'claims') != 'claims':
+        return None
+
+    claims = get_jwt()
+    if 'perm_ver' not in claims or 'role_id' not in claims:
+        return None
+
+    user_id = get_jwt_identity()
+    if claims['perm_ver'] != get_permission_version(user_id, claims['role_id']):
+        return None
+    return TokenUser(user_id, claims)
+
 
 def verify_permission(required_permission):
     """
@@ -16,33 +141,31 @@ def verify_permission(required_permission):
         def decorated_function(*args, **kwargs):
             # 验证JWT令牌
             verify_jwt_in_request()
-            
-            # 获取当前用户ID
-            user_id = get_jwt_identity()
-            
-            # 查找用户
-            user = User.query.get(user_id)
+
+            # 令牌中的权限声明仍然有效时，无需查询数据库
+            token_user = _get_token_user()
+            if token_user is not None:
+                if not token_user.has_permission(required_permission):
+                    return jsonify({'message': '无权限访问此资源'}), 403
+                g.token_user = token_user
+                return f(*args, **kwargs)
+
+            # 查找用户（同一请求内缓存，视图中的get_current_user不再查询数据库）
+            user = get_current_user()
             if not user:
                 return jsonify({'message': '用户不存在'}), 404
-            
+
             # 检查用户状态
             if not user.status:
                 return jsonify({'message': '用户账号已被禁用'}), 403
-            
-            # 检查权限
-            has_permission = False
-            for permission in user.role.permissions:
-                if permission.permission_type == required_permission and permission.is_enabled:
-                    has_permission = True
-                    break
-            
-            # 如果是管理员，默认有所有权限
-            if user.role.name == 'admin':
-                has_permission = True
-            
+
+            # 检查权限（如果是管理员，默认有所有权限）
+            role_name, permissions = get_role_permissions(user.role_id)
+            has_permission = role_name == 'admin' or required_permission in permissions
+
             if not has_permission:
                 return jsonify({'message': '无权限访问此资源'}), 403
-            
+
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -50,11 +173,37 @@ def verify_permission(required_permission):
 
 def get_current_user():
     """
-    获取当前登录用户
+    获取当前登录用户，同一请求内只查询一次（同时加载角色）
     :return: User对象
     """
     user_id = get_jwt_identity()
-    return User.query.get(user_id)
+    cached = g.get('current_user')
+    if cached is not None and str(cached.id) == str(user_id):
+        return cached
+
+    user = User.query.options(joinedload(User.role)).get(user_id)
+    if user is not None:
+        g.current_user = user
+    return user
+
+
+def get_request_user():
+    """
+    获取当前请求的用户：权限声明有效时返回TokenUser（不查询数据库），否则返回User对象
+    仅用于只读取id、用户名和角色的读接口
+    """
+    token_user = g.get('token_user')
+    if token_user is not None:
+        return token_user
+    return get_current_user()
+
+
+def is_admin_user(user):
+    """判断用户是否为管理员（使用角色权限缓存）"""
+    if isinstance(user, TokenUser):
+        return user.is_admin
+    role_name, _ = get_role_permissions(user.role_id)
+    return role_name == 'admin'
 
 
 def check_document_permission(user, document):
@@ -65,17 +214,17 @@ def check_document_permission(user, document):
     :return: 布尔值，表示是否有权限
     """
     # 管理员可以访问所有文档
-    if user.role.name == 'admin':
+    if is_admin_user(user):
         return True
-    
+
     # 文档所有者可以访问
     if document.creator_id == user.id:
         return True
-    
+
     # 非私有文档所有人都可以访问
     if not document.is_private:
         return True
-    
+
     return False
 
 
@@ -87,12 +236,9 @@ def check_permission(user, required_permission):
     :return: 布尔值
     """
     # 管理员默认有所有权限
-    if user.role.name == 'admin':
+    role_name, permissions = get_role_permissions(user.role_id)
+    if role_name == 'admin':
         return True
-    
+
     # 检查用户权限
-    for permission in user.role.permissions:
-        if permission.permission_type == required_permission and permission.is_enabled:
-            return True
-    
-    return False
\ No newline at end of file
+    return required_permission in permissions
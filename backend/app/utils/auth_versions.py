@@ -0,0 +1,116 @@
+import os
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from flask import current_app
+
+# 版本类型：用户（禁用、改角色、删除等）/ 角色（权限变更）
+USER = 'user'
+ROLE = 'role'
+
+
+class MemoryVersionStore:
+    """进程内权限版本表，仅适用于单进程部署"""
+
+    def __init__(self):
+        # 每次启动生成新的纪元，重启前签发的令牌自动失去免查库资格
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, key):
+        with self._lock:
+            return self._versions.get((kind, key), 0)
+
+    def bump(self, kind, key):
+        with self._lock:
+            self._versions[(kind, key)] = self._versions.get((kind, key), 0) + 1
+
+
+class SQLiteVersionStore:
+    """基于本地SQLite文件的权限版本表，同一主机上的多个工作进程共享"""
+
+    def __init__(self, path, cache_ttl=2):
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.epoch = self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS versions (kind TEXT NOT NULL, key INTEGER NOT NULL, '
+                         'version INTEGER NOT NULL, PRIMARY KEY (kind, key))')
+            conn.execute('INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)', ('epoch', uuid.uuid4().hex[:8]))
+            return conn.execute('SELECT value FROM meta WHERE key = ?', ('epoch',)).fetchone()[0]
+
+    def get(self, kind, key):
+        # 短时间缓存读取结果，其他进程的变更最迟在cache_ttl秒后生效
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get((kind, key))
+        if cached and cached[0] > now:
+            return cached[1]
+
+        with self._connect() as conn:
+            row = conn.execute('SELECT version FROM versions WHERE kind = ? AND key = ?', (kind, key)).fetchone()
+        version = row[0] if row else 0
+        with self._lock:
+            self._cache[(kind, key)] = (now + self.cache_ttl, version)
+        return version
+
+    def bump(self, kind, key):
+        with self._connect() as conn:
+            conn.execute('INSERT INTO versions (kind, key, version) VALUES (?, ?, 1) '
+                         'ON CONFLICT (kind, key) DO UPDATE SET version = version + 1', (kind, key))
+        with self._lock:
+            self._cache.pop((kind, key), None)
+
+
+def get_version_store():
+    """获取当前应用的权限版本表（按AUTH_VERSION_STORE配置创建）"""
+    store = current_app.extensions.get('auth_version_store')
+    if store is None:
+        if current_app.config.get('AUTH_VERSION_STORE', 'sqlite') == 'memory':
+            store = MemoryVersionStore()
+        else:
+            path = current_app.config.get('AUTH_VERSION_DB') or os.path.join(
+                tempfile.gettempdir(), 'document_system_auth_versions.db'
+            )
+            store = SQLiteVersionStore(path, current_app.config.get('AUTH_VERSION_CACHE_TTL', 2))
+        current_app.extensions['auth_version_store'] = store
+    return store
+
+
+def get_permission_version(user_id, role_id):
+    """
+    获取用户当前的权限版本号，格式为"纪元.用户版本.角色版本"
+    令牌中的版本号与此不一致时，说明签发后用户或角色已变更
+    """
+    store = get_version_store()
+    return f'{store.epoch}.{store.get(USER, int(user_id))}.{store.get(ROLE, int(role_id or 0))}'
+
+
+def bump_user_version(user_id):
+    """用户被禁用、删除或更换角色后调用"""
+    get_version_store().bump(USER, int(user_id))
+
+
+def bump_role_version(role_id):
+    """角色权限变更后调用"""
+    get_version_store().bump(ROLE, int(role_id))
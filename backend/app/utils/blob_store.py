@@ -0,0 +1,235 @@
+import os
+import uuid
+import shutil
+import hashlib
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app.models import db
+from app.models.file_blob import FileBlob
+
+
+def is_enabled():
+    """是否启用内容寻址存储（关闭时沿用按类型目录+唯一文件名的存储方式）"""
+    return current_app.config.get('BLOB_STORE_ENABLED', True)
+
+
+def _get_blob_dir():
+    return current_app.config.get('BLOB_STORE_DIR', 'blobs')
+
+
+def _full_path(relative_path):
+    return os.path.join(current_app.config['FTP_STORAGE_PATH'], relative_path)
+
+
+def get_blob_path(digest):
+    """
+    根据内容哈希生成文件块相对路径，按哈希前两级分目录，避免单个目录下文件过多
+    :param digest: SHA-256十六进制摘要
+    :return: 如 blobs/ab/cd/abcd...
+    """
+    return os.path.join(_get_blob_dir(), digest[:2], digest[2:4], digest)
+
+
+def is_blob_path(relative_path):
+    """判断相对路径是否位于内容寻址存储中"""
+    if not relative_path:
+        return False
+    return relative_path.replace('\\', '/').startswith(_get_blob_dir().rstrip('/') + '/')
+
+
+def digest_from_path(relative_path):
+    """从文件块路径中取出内容哈希，非文件块路径返回None"""
+    if not is_blob_path(relative_path):
+        return None
+    return os.path.basename(relative_path)
+
+
+def _temp_path():
+    """在存储目录内分配临时文件，保证之后可以原子重命名到最终位置"""
+    temp_dir = os.path.join(_get_blob_dir(), 'tmp')
+    os.makedirs(_full_path(temp_dir), exist_ok=True)
+    return os.path.join(temp_dir, uuid.uuid4().hex)
+
+
+def _place(source_full, blob_full, link=False):
+    """
+    将文件放到文件块位置
+    :param link: 为True时保留源文件（硬链接，不支持时复制），否则直接移动
+    """
+    os.makedirs(os.path.dirname(blob_full), exist_ok=True)
+    if not link:
+        os.replace(source_full, blob_full)
+        return
+
+    temp_full = _full_path(_temp_path())
+    try:
+        os.link(source_full, temp_full)
+    except OSError:
+        shutil.copy2(source_full, temp_full)
+    os.replace(temp_full, blob_full)
+
+
+def _add_reference(digest):
+    """引用计数加一，文件块记录不存在时返回False"""
+    table = FileBlob.__table__
+    result = db.session.execute(
+        table.update().where(table.c.hash == digest).values(ref_count=table.c.ref_count + 1)
+    )
+    return result.rowcount > 0
+
+
+def store_file(source_path, digest, size=None, link=False):
+    """
+    将已计算哈希的文件存入内容寻址存储，相同内容已存在时只增加引用计数
+    引用计数的变更在当前数据库会话中，随文档记录一起提交
+    :param source_path: 源文件相对路径
+    :param digest: 源文件SHA-256
+    :param size: 文件大小，为None时读取文件系统
+    :param link: 为True时保留源文件（迁移历史文件时使用），否则源文件被移动或删除
+    :return: 文件块相对路径
+    """
+    blob_path = get_blob_path(digest)
+    source_full = _full_path(source_path)
+    blob_full = _full_path(blob_path)
+    if size is None:
+        size = os.path.getsize(source_full)
+
+    if not _add_reference(digest):
+        _place(source_full, blob_full, link)
+        try:
+            with db.session.begin_nested():
+                db.session.add(FileBlob(hash=digest, path=blob_path, size=size, ref_count=1))
+            return blob_path
+        except IntegrityError:
+            # 并发上传了相同内容，对方已创建记录，改为增加引用计数
+            _add_reference(digest)
+            return blob_path
+
+    if not os.path.exists(blob_full):
+        # 记录存在但文件丢失时，用新文件修复
+        _place(source_full, blob_full, link)
+    elif not link:
+        os.remove(source_full)
+    return blob_path
+
+
+def store_stream(stream, buffer_size=1024 * 1024):
+    """
+    边写入边计算哈希，将数据流存入内容寻址存储
+    :param stream: 可读的数据流（如上传文件的stream）
+    :return: 文件块相对路径，SHA-256，文件大小
+    """
+    temp_path = _temp_path()
+    temp_full = _full_path(temp_path)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_full, 'wb') as f:
+            for data in iter(lambda: stream.read(buffer_size), b''):
+                f.write(data)
+                digest.update(data)
+                size += len(data)
+        blob_path = store_file(temp_path, digest.hexdigest(), size)
+    finally:
+        if os.path.exists(temp_full):
+            os.remove(temp_full)
+    return blob_path, digest.hexdigest(), size
+
+
+def release(blob_path):
+    """
+    引用计数减一（随调用方事务提交）
+    最后一个引用释放时不在事务中删除文件，事务提交后再删除记录和文件块，
+    调用方回滚时引用计数和文件都保持不变
+    :param blob_path: 文件块相对路径
+    :return: 是否释放了引用
+    """
+    digest = digest_from_path(blob_path)
+    table = FileBlob.__table__
+    result = db.session.execute(
+        table.update().where(table.c.hash == digest, table.c.ref_count > 0)
+        .values(ref_count=table.c.ref_count - 1)
+    )
+    db.session.info.setdefault('released_blobs', set()).add(digest)
+    return result.rowcount > 0
+
+
+def _remove_blob_file(blob_path):
+    full_path = _full_path(blob_path)
+    if os.path.exists(full_path):
+        from app.utils import preview_cache
+        preview_cache.invalidate(blob_path)
+        os.remove(full_path)
+
+
+def collect(digests):
+    """
+    删除引用计数已为0的文件块记录和文件
+    在删除记录的事务中（持有行锁）删除文件后才提交，并发上传相同内容时会等待本事务结束后重新放置文件；
+    删除文件失败时记录保留，由storage-reconcile清理
+    :param digests: 内容哈希列表
+    :return: 删除的文件块数
+    """
+    table = FileBlob.__table__
+    removed = 0
+    for digest in digests:
+        try:
+            with db.engine.begin() as connection:
+                result = connection.execute(table.delete().where(table.c.hash == digest, table.c.ref_count <= 0))
+                if result.rowcount:
+                    _remove_blob_file(get_blob_path(digest))
+                    removed += 1
+        except Exception as e:
+            print(f"删除文件块失败: {digest}, {str(e)}")
+    return removed
+
+
+def list_blob_files():
+    """
+    遍历存储目录中的文件块（不含临时目录）
+    :return: 生成器，(内容哈希, 文件块相对路径, 修改时间)
+    """
+    blob_dir = _get_blob_dir()
+    root = _full_path(blob_dir)
+    for dirpath, dirnames, filenames in os.walk(root):
+        if dirpath == root and 'tmp' in dirnames:
+            dirnames.remove('tmp')
+        for filename in filenames:
+            full_path = os.path.join(dirpath, filename)
+            relative_path = os.path.join(blob_dir, os.path.relpath(full_path, root))
+            yield filename, relative_path, os.path.getmtime(full_path)
+
+
+def list_temp_files():
+    """遍历临时目录中的文件，(相对路径, 修改时间)"""
+    temp_dir = os.path.join(_get_blob_dir(), 'tmp')
+    temp_full = _full_path(temp_dir)
+    if not os.path.isdir(temp_full):
+        return
+    for filename in os.listdir(temp_full):
+        full_path = os.path.join(temp_full, filename)
+        if os.path.isfile(full_path):
+            yield os.path.join(temp_dir, filename), os.path.getmtime(full_path)
+
+
+def _after_commit(session):
+    # 保存点（begin_nested）提交时同样触发，此时外层事务尚未提交
+    if session.in_nested_transaction():
+        return
+    digests = session.info.pop('released_blobs', None)
+    if digests:
+        collect(digests)
+
+
+def _after_rollback(session):
+    session.info.pop('released_blobs', None)
+
+
+def register_blob_store_listeners():
+    """注册会话监听：释放最后一个引用的事务提交后删除文件块，回滚时放弃删除"""
+    for event_name, listener in (
+        ('after_commit', _after_commit),
+        ('after_rollback', _after_rollback)
+    ):
+        if not db.event.contains(db.session, event_name, listener):
+            db.event.listen(db.session, event_name, listener)
@@ -0,0 +1,111 @@
+import io
+import csv
+import json
+import zlib
+from datetime import datetime, date
+from flask import Response, stream_with_context
+from app.models import db
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# 每次从数据库游标读取的行数，同时也是输出的缓冲行数
+FETCH_SIZE = 1000
+
+
+def _format_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+# 以这些字符开头的单元格会被Excel等表格软件当作公式执行
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _escape_csv_value(value):
+    """CSV单元格以公式字符开头时加单引号前缀，防止打开导出文件时执行公式（CSV注入）"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_rows(statements):
+    """
+    依次执行查询并逐批读取结果（服务端游标），不把结果集一次性载入内存
+    :param statements: select语句列表
+    """
+    connection = db.session.connection().execution_options(stream_results=True)
+    for statement in statements:
+        result = connection.execute(statement)
+        try:
+            while True:
+                rows = result.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            result.close()
+
+
+def _encode_rows(rows, columns, fmt):
+    """按格式把结果行编码为文本块，每FETCH_SIZE行输出一次"""
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        # 带BOM，便于Excel正确识别中文
+        buffer.write('\ufeff')
+        writer.writerow(columns)
+    count = 0
+    for row in rows:
+        values = [_format_value(row[i]) for i in range(len(columns))]
+        if fmt == 'csv':
+            writer.writerow([_escape_csv_value(value) for value in values])
+        else:
+            buffer.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+            buffer.write('\n')
+        count += 1
+        if count % FETCH_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _gzip_chunks(chunks):
+    """流式gzip压缩"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(statements, columns, fmt='csv', compress=False, filename='export'):
+    """
+    创建流式导出响应，边查询边输出CSV/NDJSON，导出任意行数时内存占用不变
+    :param statements: select语句列表，按顺序输出，列顺序与columns一致
+    :param columns: 列名列表
+    :param fmt: csv/ndjson
+    :param compress: 是否gzip压缩
+    :param filename: 下载文件名（不含扩展名）
+    :return: Response
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError('导出格式无效，支持csv和ndjson')
+
+    chunks = _encode_rows(iter_rows(statements), columns, fmt)
+    filename = f'{filename}.{fmt}'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if compress:
+        chunks = _gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    # 禁止反向代理缓冲，数据生成后立即发送
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
@@ -2,8 +2,10 @@ import os
 import uuid
 from datetime import datetime
 import shutil
+import hashlib
 from flask import current_app
 from werkzeug.utils import secure_filename
+from app.utils import blob_store
 
 # 支持的文件格式配置
 supported_formats = {
@@ -21,6 +23,55 @@ def get_file_type(filename):
     else:
         return 'flow'
 
+def _flat_path(type_dir, unique_filename, created_at):
+    """平铺：layout_files/<文件名>（原有布局）"""
+    return os.path.join(type_dir, unique_filename)
+
+def _date_path(type_dir, unique_filename, created_at):
+    """按日期分目录：layout_files/2024/05/20/<文件名>"""
+    return os.path.join(type_dir, created_at.strftime('%Y'), created_at.strftime('%m'), created_at.strftime('%d'), unique_filename)
+
+def _hash_path(type_dir, unique_filename, created_at):
+    """按文件名哈希前缀分两级目录：layout_files/ab/cd/<文件名>"""
+    digest = hashlib.md5(unique_filename.encode('utf-8')).hexdigest()
+    return os.path.join(type_dir, digest[:2], digest[2:4], unique_filename)
+
+def _date_hash_path(type_dir, unique_filename, created_at):
+    """按月份和文件名哈希前缀分目录：layout_files/2024/05/ab/<文件名>"""
+    digest = hashlib.md5(unique_filename.encode('utf-8')).hexdigest()
+    return os.path.join(type_dir, created_at.strftime('%Y'), created_at.strftime('%m'), digest[:2], unique_filename)
+
+# 存储路径策略：名称 -> 函数(类型目录, 唯一文件名, 创建时间) -> 相对路径
+PATH_STRATEGIES = {
+    'flat': _flat_path,
+    'date': _date_path,
+    'hash': _hash_path,
+    'date_hash': _date_hash_path
+}
+
+def register_path_strategy(name, strategy):
+    """
+    注册自定义存储路径策略
+    :param name: 策略名称（STORAGE_PATH_STRATEGY配置使用）
+    :param strategy: 函数(类型目录, 唯一文件名, 创建时间)，返回相对存储根目录的路径
+    """
+    PATH_STRATEGIES[name] = strategy
+
+def build_storage_path(file_type, unique_filename, created_at=None, strategy=None):
+    """
+    按存储路径策略生成文件的相对路径
+    :param file_type: 文件类型
+    :param unique_filename: 唯一文件名
+    :param created_at: 文件创建时间（按日期分目录时使用），默认为当前时间
+    :param strategy: 策略名称，默认使用STORAGE_PATH_STRATEGY配置
+    :return: 相对存储根目录的路径
+    """
+    strategy = strategy or current_app.config.get('STORAGE_PATH_STRATEGY', 'date_hash')
+    if strategy not in PATH_STRATEGIES:
+        raise ValueError(f'不支持的存储路径策略: {strategy}')
+    type_dir = f'{file_type}_files' if file_type in supported_formats else 'flow_files'
+    return PATH_STRATEGIES[strategy](type_dir, unique_filename, created_at or datetime.now())
+
 def generate_unique_filename(original_filename):
     """
     生成唯一的文件名
@@ -58,6 +109,13 @@ def save_uploaded_file(file, file_type):
                 current_app.logger.error(f"[ERROR] 创建存储根目录失败: {str(e)}")
                 raise Exception(f"保存文件失败: 无法创建存储目录")
         
+        # 启用内容寻址存储时按内容哈希保存，相同内容只保存一份
+        if blob_store.is_enabled():
+            relative_path, digest, size = blob_store.store_stream(file.stream)
+            unique_filename = generate_unique_filename(file.filename)
+            current_app.logger.debug(f"[DEBUG] 文件已存入内容寻址存储: {relative_path}, 大小: {size} 字节")
+            return relative_path, unique_filename
+        
         # 根据文件类型选择存储目录
         if file_type in supported_formats:
             upload_dir = os.path.join(storage_root, f'{file_type}_files')
@@ -87,8 +145,9 @@ def save_uploaded_file(file, file_type):
         unique_filename = generate_unique_filename(file.filename)
         current_app.logger.debug(f"[DEBUG] 生成唯一文件名: {unique_filename}")
         
-        # 完整文件路径
-        file_path = os.path.join(upload_dir, unique_filename)
+        # 完整文件路径（按存储路径策略分目录）
+        file_path = os.path.join(storage_root, build_storage_path(file_type, unique_filename))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
         current_app.logger.debug(f"[DEBUG] 文件完整路径: {file_path}")
         
         # 保存文件
@@ -123,6 +182,10 @@ def delete_file(file_path):
     :return: 是否删除成功
     """
     try:
+        # 内容寻址存储中的文件按引用计数释放，最后一个引用释放时才删除
+        if blob_store.is_blob_path(file_path):
+            return blob_store.release(file_path)
+        
         # 获取存储根目录
         storage_root = current_app.config['FTP_STORAGE_PATH']
         
@@ -131,6 +194,10 @@ def delete_file(file_path):
         
         # 检查文件是否存在
         if os.path.exists(full_path):
+            # 清除预览缓存
+            from app.utils import preview_cache
+            preview_cache.invalidate(file_path)
+            
             # 删除文件
             os.remove(full_path)
             return True
@@ -272,36 +339,128 @@ def update_uploaded_file(file, file_type, existing_file_path=None):
 
 def get_document_statistics():
     """
-    获取文档统计信息
+    获取文档统计信息（读取随文档增删改维护的存储统计聚合，不再遍历文件系统）
     :return: 统计信息字典
     """
+    from app.services.storage_stats import StorageStatsService
+    summary = StorageStatsService.get_summary()
+    by_type = summary['by_document_type']
+    
     stats = {
-        'total_documents': 0,
-        'layout_documents': 0,
-        'stream_documents': 0,
-        'total_size': 0
+        'total_documents': summary['total_documents'],
+        'layout_documents': by_type.get('layout', {}).get('count', 0),
+        'stream_documents': by_type.get('flow', {}).get('count', 0),
+        'total_size': summary['total_size']
     }
     
-    storage_root = current_app.config['FTP_STORAGE_PATH']
+    return stats
+
+def get_upload_dir(file_type):
+    """
+    获取指定文件类型的上传目录，不存在时自动创建
+    :param file_type: 文件类型
+    :return: 上传目录完整路径
+    """
+    storage_root = current_app.config.get('FTP_STORAGE_PATH')
+    if not storage_root:
+        raise Exception("保存文件失败: FTP_STORAGE_PATH 配置不存在")
     
-    # 统计版式文件
-    layout_dir = os.path.join(storage_root, 'layout_files')
-    if os.path.exists(layout_dir):
-        for file in os.listdir(layout_dir):
-            file_path = os.path.join(layout_dir, file)
-            if os.path.isfile(file_path):
-                stats['layout_documents'] += 1
-                stats['total_size'] += os.path.getsize(file_path)
+    # 根据文件类型选择存储目录
+    if file_type in supported_formats:
+        upload_dir = os.path.join(storage_root, f'{file_type}_files')
+    else:
+        upload_dir = os.path.join(storage_root, 'flow_files')
     
-    # 统计流式文件
-    stream_dir = os.path.join(storage_root, 'stream_files')
-    if os.path.exists(stream_dir):
-        for file in os.listdir(stream_dir):
-            file_path = os.path.join(stream_dir, file)
-            if os.path.isfile(file_path):
-                stats['stream_documents'] += 1
-                stats['total_size'] += os.path.getsize(file_path)
+    os.makedirs(upload_dir, exist_ok=True)
+    if not os.access(upload_dir, os.W_OK):
+        raise Exception("保存文件失败: 目录权限不足")
+    return upload_dir
+
+def create_upload_target(original_filename, file_type):
+    """
+    为分片上传预先分配最终存储位置
+    :param original_filename: 原始文件名
+    :param file_type: 文件类型
+    :return: 相对路径，唯一文件名
+    """
+    get_upload_dir(file_type)
+    unique_filename = generate_unique_filename(original_filename)
+    relative_path = build_storage_path(file_type, unique_filename)
+    os.makedirs(os.path.dirname(get_file_path(relative_path)), exist_ok=True)
+    return relative_path, unique_filename
+
+def write_file_chunk(file_path, offset, stream, expected_size, buffer_size=64 * 1024):
+    """
+    将请求体数据流直接写入文件的指定偏移位置，同时计算SHA-256
+    :param file_path: 文件相对路径
+    :param offset: 写入偏移量（字节）
+    :param stream: 可读的数据流（如request.stream）
+    :param expected_size: 预期写入的字节数，超出时中止写入
+    :param buffer_size: 每次读取的字节数
+    :return: 实际写入字节数，SHA-256十六进制摘要
+    """
+    full_path = get_file_path(file_path)
+    digest = hashlib.sha256()
+    written = 0
     
-    stats['total_documents'] = stats['layout_documents'] + stats['stream_documents']
+    # 文件不存在时创建，存在时以读写模式打开以支持乱序、并发写入不同分片
+    mode = 'r+b' if os.path.exists(full_path) else 'w+b'
+    with open(full_path, mode) as f:
+        f.seek(offset)
+        while True:
+            data = stream.read(min(buffer_size, expected_size + 1 - written))
+            if not data:
+                break
+            written += len(data)
+            if written > expected_size:
+                raise ValueError("分片大小超过预期")
+            f.write(data)
+            digest.update(data)
     
-    return stats
\ No newline at end of file
+    return written, digest.hexdigest()
+
+def calculate_file_hash(file_path, buffer_size=1024 * 1024):
+    """
+    计算文件的SHA-256
+    :param file_path: 文件相对路径
+    :return: SHA-256十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(get_file_path(file_path), 'rb') as f:
+        for data in iter(lambda: f.read(buffer_size), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+def get_content_hash(file_path):
+    """
+    获取文件的SHA-256，内容寻址存储中的文件直接从路径取得
+    :param file_path: 文件相对路径
+    :return: SHA-256十六进制摘要
+    """
+    return blob_store.digest_from_path(file_path) or calculate_file_hash(file_path)
+
+def finalize_upload(part_path, target_path, digest, keep_part=False):
+    """
+    将分片上传完成的临时文件放到最终位置
+    :param part_path: 临时文件相对路径
+    :param target_path: 预先分配的最终相对路径（未启用内容寻址存储时使用）
+    :param digest: 文件SHA-256
+    :param keep_part: 为True时保留临时文件（硬链接，不支持时复制），文档入库失败时会话仍可重新完成
+    :return: 最终文件相对路径
+    """
+    if blob_store.is_enabled():
+        return blob_store.store_file(part_path, digest, link=keep_part)
+    
+    part_full = get_file_path(part_path)
+    target_full = get_file_path(target_path)
+    if not keep_part:
+        # 同目录下原子重命名为最终文件
+        os.replace(part_full, target_full)
+    else:
+        if os.path.exists(target_full):
+            os.remove(target_full)
+        try:
+            os.link(part_full, target_full)
+        except OSError:
+            shutil.copy2(part_full, target_full)
+    return target_path
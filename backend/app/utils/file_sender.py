@@ -0,0 +1,87 @@
+import os
+import mimetypes
+import unicodedata
+from urllib.parse import quote
+from flask import current_app, request, send_file, jsonify
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+
+# 文件发送方式：
+# direct     由应用发送（支持Range和304；整文件响应经wsgi.file_wrapper发送，Gunicorn等会使用os.sendfile）
+# x-sendfile 返回X-Sendfile头，由Apache(mod_xsendfile)/lighttpd发送文件
+# x-accel    返回X-Accel-Redirect头，由Nginx内部location发送文件
+SENDFILE_MODES = ('direct', 'x-sendfile', 'x-accel')
+
+
+def _content_disposition(download_name, as_attachment):
+    """生成Content-Disposition，非ASCII文件名按RFC 5987编码"""
+    value = 'attachment' if as_attachment else 'inline'
+    try:
+        download_name.encode('ascii')
+        return f'{value}; filename="{download_name}"'
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        return f'{value}; filename="{simple}"; filename*=UTF-8\'\'{quote(download_name, safe="")}'
+
+
+def _offload_response(file_path, relative_path, download_name, etag, as_attachment, mode):
+    """构造交给前端Web服务器发送文件的空响应，Range请求由Web服务器处理"""
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    response = current_app.response_class(mimetype=mimetype)
+    response.headers['Content-Disposition'] = _content_disposition(download_name, as_attachment)
+
+    if mode == 'x-accel':
+        prefix = current_app.config.get('DOWNLOAD_ACCEL_PREFIX', '/protected/').rstrip('/')
+        location = relative_path.replace(os.sep, '/').lstrip('/')
+        response.headers['X-Accel-Redirect'] = f'{prefix}/{quote(location)}'
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(file_path)
+
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.last_modified = os.path.getmtime(file_path)
+    if etag:
+        response.set_etag(etag)
+
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        # 部分实现会忽略304状态码仍然发送文件
+        response.headers.pop('X-Sendfile', None)
+        response.headers.pop('X-Accel-Redirect', None)
+    return response
+
+
+def send_document_file(file_path, relative_path, download_name, etag=None, as_attachment=False):
+    """
+    发送文档文件，支持If-None-Match/If-Modified-Since条件请求和Range分段请求
+    :param file_path: 文件绝对路径
+    :param relative_path: 文件相对存储根目录的路径（x-accel方式使用）
+    :param download_name: 下载文件名
+    :param etag: 强ETag（文件内容哈希），为None时按修改时间和大小生成
+    :param as_attachment: 是否作为附件下载
+    :return: Flask响应对象
+    """
+    mode = current_app.config.get('DOWNLOAD_SENDFILE_MODE', 'direct')
+    if mode not in SENDFILE_MODES:
+        raise ValueError(f'不支持的文件发送方式: {mode}')
+
+    if mode == 'direct':
+        try:
+            response = send_file(
+                file_path,
+                as_attachment=as_attachment,
+                download_name=download_name,
+                conditional=True,
+                etag=etag or True
+            )
+        except RequestedRangeNotSatisfiable:
+            response = jsonify({'message': '请求的范围无效'})
+            response.status_code = 416
+            response.headers['Content-Range'] = f'bytes */{os.path.getsize(file_path)}'
+            return response
+    else:
+        response = _offload_response(file_path, relative_path, download_name, etag, as_attachment, mode)
+
+    # 需要登录才能访问，只允许浏览器私有缓存，每次使用前用ETag重新验证
+    response.cache_control.public = None
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
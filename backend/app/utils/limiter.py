@@ -1,63 +1,43 @@
-from datetime import datetime, timedelta
-from app.models.document import Document
+from flask import current_app
+from app.services.storage_stats import StorageStatsService
+from app.services.upload_quota_service import UploadQuotaService
 
 
-# 每日上传限制配置
+# 每日上传限制配置（未配置MAX_UPLOAD_PER_DAY时使用）
 DAILY_UPLOAD_LIMIT = 20  # 普通用户每日上传文件限制
 
 
 def check_upload_limit(user_id):
     """
-    检查用户今日上传文件数量是否超过限制
+    检查用户是否还能上传（读取上传配额计数，日/周/月任一周期达到上限时不允许）
+    这里只做提前检查，实际占用配额在创建文档的事务中完成，并发上传不会超过上限
     :param user_id: 用户ID
     :return: 是否允许上传（True/False）
     """
     try:
-        # 计算今日开始时间
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # 查询用户今日上传的文件数量
-        upload_count = Document.query.filter(
-            Document.creator_id == user_id,
-            Document.created_at >= today
-        ).count()
-        
-        # 检查是否超过限制
-        if upload_count >= DAILY_UPLOAD_LIMIT:
-            return False
-        
-        return True
-    
+        remaining = UploadQuotaService.get_remaining(user_id)
+        return remaining is None or remaining > 0
+
     except Exception as e:
-        # 发生异常时默认允许上传，避免影响正常使用
+        # 发生异常时默认允许上传，避免影响正常使用（创建文档时仍会检查配额）
         print(f"检查上传限制时发生错误: {str(e)}")
         return True
 
 
 def get_upload_remaining(user_id):
     """
-    获取用户今日剩余上传次数
+    获取用户剩余上传次数（各有上限周期中的最小值）
     :param user_id: 用户ID
     :return: 剩余上传次数
     """
     try:
-        # 计算今日开始时间
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # 查询用户今日上传的文件数量
-        upload_count = Document.query.filter(
-            Document.creator_id == user_id,
-            Document.created_at >= today
-        ).count()
-        
-        # 计算剩余次数
-        remaining = DAILY_UPLOAD_LIMIT - upload_count
-        return max(0, remaining)
-    
+        remaining = UploadQuotaService.get_remaining(user_id)
+        return remaining if remaining is not None else _daily_limit()
+
     except Exception as e:
         # 发生异常时返回默认值
         print(f"获取剩余上传次数时发生错误: {str(e)}")
-        return DAILY_UPLOAD_LIMIT
+        return _daily_limit()
 
 
 def get_user_upload_stats(user_id):
@@ -67,42 +47,20 @@ def get_user_upload_stats(user_id):
     :return: 包含各种统计信息的字典
     """
     try:
-        # 计算今日开始时间
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # 计算本周开始时间（周一）
-        days_since_monday = datetime.now().weekday()
-        week_start = today - timedelta(days=days_since_monday)
-        
-        # 计算本月开始时间
-        month_start = today.replace(day=1)
-        
-        # 查询各种统计数据
-        today_count = Document.query.filter(
-            Document.creator_id == user_id,
-            Document.created_at >= today
-        ).count()
-        
-        week_count = Document.query.filter(
-            Document.creator_id == user_id,
-            Document.created_at >= week_start
-        ).count()
-        
-        month_count = Document.query.filter(
-            Document.creator_id == user_id,
-            Document.created_at >= month_start
-        ).count()
-        
-        total_count = Document.query.filter_by(user_id=user_id).count()
-        
+        counts = UploadQuotaService.get_counts(user_id)
+
+        # 现有文档总数读取存储统计中的用户维度
+        total_count = StorageStatsService.get_document_count('user', user_id)
+
+        remaining = UploadQuotaService.get_remaining(user_id, counts)
         return {
-            'today_count': today_count,
-            'week_count': week_count,
-            'month_count': month_count,
+            'today_count': counts['day'],
+            'week_count': counts['week'],
+            'month_count': counts['month'],
             'total_count': total_count,
-            'today_remaining': max(0, DAILY_UPLOAD_LIMIT - today_count)
+            'today_remaining': remaining if remaining is not None else _daily_limit()
         }
-    
+
     except Exception as e:
         # 发生异常时返回空字典
         print(f"获取上传统计信息时发生错误: {str(e)}")
@@ -111,5 +69,9 @@ def get_user_upload_stats(user_id):
             'week_count': 0,
             'month_count': 0,
             'total_count': 0,
-            'today_remaining': DAILY_UPLOAD_LIMIT
-        }
\ No newline at end of file
+            'today_remaining': _daily_limit()
+        }
+
+
+def _daily_limit():
+    return current_app.config.get('MAX_UPLOAD_PER_DAY') or DAILY_UPLOAD_LIMIT
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from flask import current_app
+from app.models import db
+
+
+class MemoryListCache:
+    """进程内LRU缓存，代数保存在进程内，仅适用于单进程部署（多进程时依靠TTL过期）"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_generation(self):
+        with self._lock:
+            return self._generation
+
+    def bump(self):
+        with self._lock:
+            self._generation += 1
+            # 旧代数的缓存已无法命中，直接清空
+            self._entries.clear()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteListCache(MemoryListCache):
+    """进程内LRU + 本地SQLite文件共享缓存，同一主机上的多个工作进程共享缓存内容和代数"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=1000, ttl=60, generation_ttl=1):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self.generation_ttl = generation_ttl
+        self._generation_expires = 0
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, generation INTEGER NOT NULL, '
+                         'value TEXT NOT NULL, expires_at REAL NOT NULL)')
+            conn.execute('INSERT OR IGNORE INTO meta (key, value) VALUES (?, 0)', ('generation',))
+
+    def get_generation(self):
+        # 短时间缓存代数，其他进程的变更最迟在generation_ttl秒后生效
+        now = time.monotonic()
+        with self._lock:
+            if self._generation_expires > now:
+                return self._generation
+        with self._connect() as conn:
+            generation = conn.execute('SELECT value FROM meta WHERE key = ?', ('generation',)).fetchone()[0]
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+            self._generation = generation
+            self._generation_expires = now + self.generation_ttl
+        return generation
+
+    def bump(self):
+        with self._connect() as conn:
+            conn.execute('UPDATE meta SET value = value + 1 WHERE key = ?', ('generation',))
+            generation = conn.execute('SELECT value FROM meta WHERE key = ?', ('generation',)).fetchone()[0]
+            conn.execute('DELETE FROM entries WHERE generation < ?', (generation,))
+        with self._lock:
+            self._generation = generation
+            self._generation_expires = time.monotonic() + self.generation_ttl
+            self._entries.clear()
+
+    def get_shared(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT value FROM entries WHERE key = ? AND expires_at > ?', (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_shared(self, key, generation, value):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO entries (key, generation, value, expires_at) VALUES (?, ?, ?, ?)',
+                         (key, generation, json.dumps(value, ensure_ascii=False), time.time() + self.ttl))
+
+    def size(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM entries WHERE expires_at > ?', (time.time(),)).fetchone()[0]
+
+
+# 命中统计
+_stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_list_cache():
+    """获取当前应用的列表缓存（按LIST_CACHE_BACKEND配置创建），未启用时返回None"""
+    if not current_app.config.get('LIST_CACHE_ENABLED', True):
+        return None
+
+    cache = current_app.extensions.get('list_cache')
+    if cache is None:
+        max_entries = current_app.config.get('LIST_CACHE_MAX_ENTRIES', 1000)
+        ttl = current_app.config.get('LIST_CACHE_TTL', 60)
+        if current_app.config.get('LIST_CACHE_BACKEND', 'memory') == 'sqlite':
+            path = current_app.config.get('LIST_CACHE_DB') or os.path.join(
+                tempfile.gettempdir(), 'document_system_list_cache.db'
+            )
+            cache = SQLiteListCache(path, max_entries, ttl, current_app.config.get('LIST_CACHE_GENERATION_TTL', 1))
+        else:
+            cache = MemoryListCache(max_entries, ttl)
+        current_app.extensions['list_cache'] = cache
+    return cache
+
+
+def visibility_class(user, own_only=False):
+    """
+    用户的可见范围：管理员看到的列表相同，共用缓存；
+    非管理员（或只看自己文档）的列表与用户相关，按用户区分
+    """
+    if user.role.name == 'admin' and not own_only:
+        return 'admin'
+    return f'user:{user.id}'
+
+
+def get_or_compute(namespace, visibility, params, compute):
+    """
+    读取缓存的列表结果，未命中时计算并写入缓存
+    缓存键包含当前代数，文档变更后代数递增，旧结果不再命中
+    :param namespace: 接口名
+    :param visibility: 可见范围（visibility_class的返回值）
+    :param params: 规范化后的筛选参数字典
+    :param compute: 计算结果的函数，结果须可JSON序列化
+    :return: 结果
+    """
+    cache = get_list_cache()
+    if cache is None:
+        return compute()
+
+    generation = cache.get_generation()
+    key = f'{generation}:{namespace}:{visibility}:{json.dumps(params, sort_keys=True, ensure_ascii=False)}'
+    value = cache.get(key)
+    if value is not None:
+        _count('hits')
+        return value
+
+    if isinstance(cache, SQLiteListCache):
+        value = cache.get_shared(key)
+        if value is not None:
+            _count('shared_hits')
+            cache.set(key, value)
+            return value
+
+    _count('misses')
+    value = compute()
+    cache.set(key, value)
+    if isinstance(cache, SQLiteListCache):
+        cache.set_shared(key, generation, value)
+    return value
+
+
+def invalidate():
+    """文档列表内容变更后使全部列表缓存失效"""
+    cache = get_list_cache()
+    if cache is not None:
+        cache.bump()
+        _count('invalidations')
+
+
+def get_cache_stats():
+    """获取列表缓存命中统计"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+    stats['hit_rate'] = round((stats['hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0.0
+    cache = get_list_cache()
+    if cache is not None:
+        stats['backend'] = cache.name
+        stats['generation'] = cache.get_generation()
+        stats['entries'] = cache.size()
+    return stats
+
+
+def _session_changed_lists(session):
+    from app.models.document import Document, DocumentCategory
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Document, DocumentCategory)):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            return True
+    return False
+
+
+def _after_flush(session, flush_context):
+    if _session_changed_lists(session):
+        session.info['list_cache_dirty'] = True
+
+
+def _after_commit(session):
+    if session.info.pop('list_cache_dirty', False):
+        try:
+            invalidate()
+        except Exception as e:
+            print(f"列表缓存失效失败: {str(e)}")
+
+
+def _after_rollback(session):
+    session.info.pop('list_cache_dirty', None)
+
+
+def register_list_cache_listeners():
+    """注册会话监听：提交的事务中有文档或分类的增删改时递增缓存代数"""
+    for event_name, listener in (
+        ('after_flush', _after_flush),
+        ('after_commit', _after_commit),
+        ('after_rollback', _after_rollback)
+    ):
+        if not db.event.contains(db.session, event_name, listener):
+            db.event.listen(db.session, event_name, listener)
@@ -0,0 +1,122 @@
+import json
+import math
+import base64
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import or_, and_
+
+# 总数统计方式：exact精确统计 / approx限量统计（超过上限时返回估计值）/ none不统计
+COUNT_MODES = ('exact', 'approx', 'none')
+
+
+class Page:
+    """分页结果"""
+
+    def __init__(self, items, page, per_page, total, has_more, next_cursor, total_is_estimate=False):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_more = has_more
+        self.next_cursor = next_cursor
+        self.total_is_estimate = total_is_estimate
+
+    @property
+    def pages(self):
+        """总页数，未统计总数时为None"""
+        if self.total is None:
+            return None
+        return int(math.ceil(self.total / float(self.per_page))) if self.per_page else 0
+
+
+def encode_cursor(created_at, item_id):
+    """将(created_at, id)编码为分页游标"""
+    raw = json.dumps([created_at.isoformat(), item_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析分页游标
+    :param cursor: 游标字符串
+    :return: (created_at, id)
+    :raises ValueError: 游标格式无效
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(item_id)
+    except Exception:
+        raise ValueError('分页游标无效')
+
+
+def _count(query, count_mode):
+    """统计总数，返回(总数, 是否为估计值)"""
+    if count_mode == 'none':
+        return None, False
+
+    query = query.order_by(None)
+    if count_mode == 'approx':
+        # 最多统计到上限，避免大表全量COUNT
+        limit = current_app.config.get('PAGINATION_COUNT_LIMIT', 10000)
+        total = query.limit(limit + 1).count()
+        if total > limit:
+            return limit, True
+        return total, False
+
+    return query.count(), False
+
+
+def paginate_query(query, time_column, id_column, page=1, per_page=20, cursor=None,
+                   count_mode=None, order_by=None):
+    """
+    分页查询，支持传统页码分页和基于(created_at, id)的游标分页
+    游标分页按时间倒序，利用索引直接定位起点，避免深分页时OFFSET扫描并丢弃大量行
+    :param query: 查询对象
+    :param time_column: 时间列（如Document.created_at）
+    :param id_column: 主键列（如Document.id）
+    :param page: 页码（页码分页时使用）
+    :param per_page: 每页数量
+    :param cursor: 分页游标，为None时使用页码分页，为空字符串时从第一条开始游标分页
+    :param count_mode: 总数统计方式exact/approx/none，默认页码分页为exact，游标分页为none
+    :param order_by: 页码分页时额外的前置排序条件（如检索相关度），游标分页时忽略
+    :return: Page对象
+    :raises ValueError: 游标或统计方式无效
+    """
+    per_page = max(1, per_page or 20)
+    page = max(1, page or 1)
+
+    if count_mode is None:
+        count_mode = 'exact' if cursor is None else 'none'
+    if count_mode not in COUNT_MODES:
+        raise ValueError('总数统计方式无效')
+
+    cursor_position = decode_cursor(cursor) if cursor else None
+    total, total_is_estimate = _count(query, count_mode)
+
+    if cursor is not None:
+        # 游标分页：按(created_at, id)倒序取游标之后的记录
+        ordered = query.order_by(time_column.desc(), id_column.desc())
+        if cursor_position:
+            cursor_time, cursor_id = cursor_position
+            ordered = ordered.filter(or_(
+                time_column < cursor_time,
+                and_(time_column == cursor_time, id_column < cursor_id)
+            ))
+        page = None
+    else:
+        ordered = query.order_by(*(list(order_by or []) + [time_column.desc(), id_column.desc()]))
+        ordered = ordered.offset((page - 1) * per_page)
+
+    # 多取一条用于判断是否还有下一页
+    items = ordered.limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    # 按相关度等其他条件排序时，时间游标无法衔接下一页
+    next_cursor = None
+    if has_more and items and (cursor is not None or not order_by):
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, time_column.key), getattr(last, id_column.key))
+
+    return Page(items, page, per_page, total, has_more, next_cursor, total_is_estimate)
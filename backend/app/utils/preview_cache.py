@@ -0,0 +1,208 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import current_app
+from app.utils.text_extractor import extract_text
+
+# 需要解析才能预览的文件格式，解析结果写入缓存
+CACHEABLE_EXTENSIONS = ['.docx']
+
+# 进程内缓存索引：缓存键 -> 文件大小，按最近访问时间排序（LRU）
+_lock = threading.Lock()
+_entries = OrderedDict()
+_state = {'loaded_dir': None, 'total_size': 0}
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+
+def _get_cache_dir():
+    """获取预览缓存目录，默认位于存储根目录下的preview_cache"""
+    cache_dir = current_app.config.get('PREVIEW_CACHE_DIR')
+    if not cache_dir:
+        cache_dir = os.path.join(current_app.config['FTP_STORAGE_PATH'], 'preview_cache')
+    return cache_dir
+
+
+def _get_max_size():
+    return current_app.config.get('PREVIEW_CACHE_MAX_SIZE', 200 * 1024 * 1024)
+
+
+def _make_key(full_path, relative_path):
+    """
+    根据文件路径、修改时间和大小生成缓存键
+    文件被替换后修改时间或大小变化，旧缓存自然失效
+    """
+    stat = os.stat(full_path)
+    raw = f'{relative_path}|{stat.st_mtime_ns}|{stat.st_size}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _entry_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], f'{key}.txt')
+
+
+def _load_index(cache_dir):
+    """首次使用时扫描缓存目录，按修改时间恢复LRU顺序（调用方需持有锁）"""
+    if _state['loaded_dir'] == cache_dir:
+        return
+
+    _entries.clear()
+    _state['total_size'] = 0
+    found = []
+    if os.path.exists(cache_dir):
+        for root, _, files in os.walk(cache_dir):
+            for name in files:
+                if not name.endswith('.txt'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+
+    for _, key, size in sorted(found):
+        _entries[key] = size
+        _state['total_size'] += size
+    _state['loaded_dir'] = cache_dir
+
+
+def _evict(cache_dir, max_size):
+    """淘汰最久未访问的缓存直到总大小不超过上限（调用方需持有锁）"""
+    while _entries and _state['total_size'] > max_size:
+        key, size = _entries.popitem(last=False)
+        _state['total_size'] -= size
+        _stats['evictions'] += 1
+        try:
+            os.remove(_entry_path(cache_dir, key))
+        except OSError:
+            pass
+
+
+def _read_entry(cache_dir, key):
+    """读取缓存内容，命中时刷新LRU顺序"""
+    with _lock:
+        _load_index(cache_dir)
+        if key not in _entries:
+            return None
+        _entries.move_to_end(key)
+
+    path = _entry_path(cache_dir, key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        # 更新修改时间，便于进程重启后恢复LRU顺序
+        os.utime(path, None)
+        return content
+    except OSError:
+        with _lock:
+            _state['total_size'] -= _entries.pop(key, 0)
+        return None
+
+
+def _write_entry(cache_dir, key, content):
+    """写入缓存内容（先写临时文件再原子替换）"""
+    path = _entry_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    size = os.path.getsize(path)
+
+    with _lock:
+        _load_index(cache_dir)
+        _state['total_size'] += size - _entries.pop(key, 0)
+        _entries[key] = size
+        _evict(cache_dir, _get_max_size())
+
+
+def is_cacheable(file_name):
+    """判断文件格式是否需要缓存解析结果"""
+    _, ext = os.path.splitext(file_name.lower())
+    return ext in CACHEABLE_EXTENSIONS
+
+
+def get_preview_text(relative_path, file_name):
+    """
+    获取文件的预览文本，优先读取缓存，未命中时解析文件并写入缓存
+    :param relative_path: 文件相对路径（Document.file_path）
+    :param file_name: 文件名（用于判断格式）
+    :return: 文本内容，解析失败返回None
+    """
+    storage_root = current_app.config['FTP_STORAGE_PATH']
+    full_path = os.path.join(storage_root, relative_path)
+    cache_dir = _get_cache_dir()
+
+    try:
+        key = _make_key(full_path, relative_path)
+    except OSError:
+        return None
+
+    content = _read_entry(cache_dir, key)
+    if content is not None:
+        with _lock:
+            _stats['hits'] += 1
+        return content
+
+    with _lock:
+        _stats['misses'] += 1
+
+    content = extract_text(full_path, file_name)
+    if content is not None:
+        try:
+            _write_entry(cache_dir, key, content)
+        except OSError as e:
+            current_app.logger.warning(f"[WARNING] 写入预览缓存失败: {str(e)}")
+    return content
+
+
+def populate(relative_path, file_name):
+    """上传完成后预先生成预览缓存，失败不影响上传流程"""
+    if not is_cacheable(file_name):
+        return
+    try:
+        get_preview_text(relative_path, file_name)
+    except Exception as e:
+        current_app.logger.warning(f"[WARNING] 生成预览缓存失败: {str(e)}")
+
+
+def invalidate(relative_path):
+    """文件被替换或删除前移除其预览缓存"""
+    storage_root = current_app.config['FTP_STORAGE_PATH']
+    full_path = os.path.join(storage_root, relative_path)
+    cache_dir = _get_cache_dir()
+
+    try:
+        key = _make_key(full_path, relative_path)
+    except OSError:
+        return
+
+    with _lock:
+        _load_index(cache_dir)
+        if key not in _entries:
+            return
+        _state['total_size'] -= _entries.pop(key)
+        _stats['invalidations'] += 1
+
+    try:
+        os.remove(_entry_path(cache_dir, key))
+    except OSError:
+        pass
+
+
+def get_cache_stats():
+    """获取预览缓存统计信息"""
+    cache_dir = _get_cache_dir()
+    with _lock:
+        _load_index(cache_dir)
+        total = _stats['hits'] + _stats['misses']
+        return {
+            'hits': _stats['hits'],
+            'misses': _stats['misses'],
+            'hit_rate': round(_stats['hits'] / total, 4) if total else 0,
+            'evictions': _stats['evictions'],
+            'invalidations': _stats['invalidations'],
+            'entries': len(_entries),
+            'size_bytes': _state['total_size'],
+            'max_size_bytes': _get_max_size()
+        }
@@ -0,0 +1,285 @@
+import os
+import math
+import time
+import sqlite3
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app, request, jsonify, g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from werkzeug.http import parse_range_header, unquote_etag
+from app.models.document import Document
+
+# 接口类别 -> (令牌桶容量, 每秒补充的令牌数)，未在RATE_LIMITS中配置的类别使用此默认值
+DEFAULT_RATE_LIMITS = {
+    'read': (120, 10),
+    'heavy_read': (20, 0.5),
+    'write': (30, 1)
+}
+
+# 需要解析文件或读取大量数据的接口（Word解析预览、文件下载、日志导出）
+DEFAULT_ENDPOINT_CLASSES = {
+    'documents.preview_document': 'heavy_read',
+    'documents.download_document': 'heavy_read',
+    'system_logs.export_system_logs': 'heavy_read',
+    'system_logs.export_access_logs': 'heavy_read',
+    # 分片数由上传会话确定，上传配额已在初始化时检查，不再逐个分片限流
+    'uploads.upload_chunk': None
+}
+
+# 不限流的接口
+EXEMPT_ENDPOINTS = {'index', 'static'}
+
+# 支持分段下载的接口（路由参数document_id）：只读取文件一部分的续传请求按read类别计数，
+# 避免一次下载的多个分段请求耗尽heavy_read额度
+RANGE_REQUEST_ENDPOINTS = {'documents.download_document'}
+
+
+class MemoryTokenBuckets:
+    """进程内令牌桶，仅适用于单进程部署（多进程时每个进程各自限流）"""
+
+    name = 'memory'
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """
+        从令牌桶中取一个令牌
+        :param key: 桶标识（类别:用户或IP）
+        :param capacity: 桶容量（允许的突发请求数）
+        :param rate: 每秒补充的令牌数
+        :return: (是否允许, 剩余令牌数, 需要等待的秒数)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, 0))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, capacity / rate if rate else 0)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed, int(tokens), 0 if allowed else (1 - tokens) / rate
+
+    def _prune(self, now):
+        # 超过补满时间未访问的桶已补满，删除后与新建的桶等价
+        for key in [key for key, (_, updated, idle) in self._buckets.items() if now - updated > idle]:
+            del self._buckets[key]
+
+    def size(self):
+        with self._lock:
+            return len(self._buckets)
+
+
+class SQLiteTokenBuckets:
+    """基于本地SQLite文件的令牌桶，同一主机上的多个工作进程共享限流状态"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, prune_interval=60):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._last_prune = time.monotonic()
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        # 自行管理事务，以BEGIN IMMEDIATE串行化同一时刻的读-改-写
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                         'updated_at REAL NOT NULL, idle_seconds REAL NOT NULL)')
+
+    def consume(self, key, capacity, rate):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                tokens = min(capacity, tokens + max(0, now - updated) * rate)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated_at, idle_seconds) VALUES (?, ?, ?, ?)',
+                             (key, tokens, now, capacity / rate if rate else 0))
+                if time.monotonic() - self._last_prune > self.prune_interval:
+                    self._last_prune = time.monotonic()
+                    conn.execute('DELETE FROM buckets WHERE updated_at + idle_seconds < ?', (now,))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return allowed, int(tokens), 0 if allowed else (1 - tokens) / rate
+
+    def size(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+
+
+# 限流统计：按类别的放行/拒绝次数，以及被拒绝最多的用户或IP
+_stats = {'allowed': Counter(), 'rejected': Counter(), 'rejected_keys': Counter(), 'errors': 0}
+_stats_lock = threading.Lock()
+# 被拒绝标识的统计上限，超过后清空重新统计
+MAX_TRACKED_KEYS = 10000
+
+
+def _record(endpoint_class, identity, allowed):
+    with _stats_lock:
+        if allowed:
+            _stats['allowed'][endpoint_class] += 1
+            return
+        _stats['rejected'][endpoint_class] += 1
+        if len(_stats['rejected_keys']) >= MAX_TRACKED_KEYS:
+            _stats['rejected_keys'].clear()
+        _stats['rejected_keys'][identity] += 1
+
+
+def get_token_buckets():
+    """获取当前应用的令牌桶存储（按RATE_LIMIT_BACKEND配置创建）"""
+    buckets = current_app.extensions.get('rate_limit_buckets')
+    if buckets is None:
+        if current_app.config.get('RATE_LIMIT_BACKEND', 'memory') == 'sqlite':
+            path = current_app.config.get('RATE_LIMIT_DB') or os.path.join(
+                tempfile.gettempdir(), 'document_system_rate_limit.db'
+            )
+            buckets = SQLiteTokenBuckets(path)
+        else:
+            buckets = MemoryTokenBuckets()
+        current_app.extensions['rate_limit_buckets'] = buckets
+    return buckets
+
+
+def get_endpoint_class(endpoint, method, partial=False):
+    """
+    请求所属的限流类别：RATE_LIMIT_ENDPOINT_CLASSES中指定的接口使用指定类别（None表示不限流），
+    其他接口GET/HEAD为read，其余为write；
+    partial为True（只读取文件的一部分，见is_partial_request）时，分段下载接口的heavy_read按read计
+    """
+    if endpoint is None or endpoint in EXEMPT_ENDPOINTS or method == 'OPTIONS':
+        return None
+    endpoint_classes = dict(DEFAULT_ENDPOINT_CLASSES)
+    endpoint_classes.update(current_app.config.get('RATE_LIMIT_ENDPOINT_CLASSES') or {})
+    if endpoint in endpoint_classes:
+        endpoint_class = endpoint_classes[endpoint]
+        if endpoint_class == 'heavy_read' and partial and endpoint in RANGE_REQUEST_ENDPOINTS:
+            return 'read'
+        return endpoint_class
+    return 'read' if method in ('GET', 'HEAD') else 'write'
+
+
+def is_partial_request(endpoint):
+    """
+    分段下载接口的请求是否只返回文件的一部分：Range为单个严格小于整个文件的范围，
+    且带If-Range时与文档当前的ETag（文件内容哈希，强比较）一致，否则服务端会返回完整文件
+    """
+    if endpoint not in RANGE_REQUEST_ENDPOINTS or 'Range' not in request.headers:
+        return False
+    document = Document.query.get((request.view_args or {}).get('document_id'))
+    if document is None or not document.file_size:
+        return False
+    byte_range = parse_range_header(request.headers.get('Range'))
+    span = byte_range.range_for_length(document.file_size) if byte_range else None
+    if span is None or span[1] - span[0] >= document.file_size:
+        return False
+    if 'If-Range' in request.headers:
+        etag, weak = unquote_etag(request.headers.get('If-Range'))
+        return not weak and document.content_hash is not None and etag == document.content_hash
+    return True
+
+
+def get_client_identity():
+    """限流标识：携带有效令牌时按用户，否则按客户端IP（经反向代理时需配置PROXY_FIX_X_FOR）"""
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+        if user_id is not None:
+            return f'user:{user_id}'
+    except Exception:
+        # 令牌过期或无效时按IP限流，由接口自身返回401
+        pass
+    return f'ip:{request.remote_addr}'
+
+
+def check_rate_limit():
+    """
+    请求前检查限流（before_request），超过限制时返回429及Retry-After响应头
+    限流存储异常时放行，避免影响正常使用
+    """
+    if not current_app.config.get('RATE_LIMIT_ENABLED', True):
+        return None
+    endpoint_class = get_endpoint_class(request.endpoint, request.method, is_partial_request(request.endpoint))
+    if endpoint_class is None:
+        return None
+
+    limits = current_app.config.get('RATE_LIMITS') or {}
+    capacity, rate = limits.get(endpoint_class) or DEFAULT_RATE_LIMITS[endpoint_class]
+    identity = get_client_identity()
+    try:
+        allowed, remaining, retry_after = get_token_buckets().consume(f'{endpoint_class}:{identity}', capacity, rate)
+    except Exception as e:
+        with _stats_lock:
+            _stats['errors'] += 1
+        print(f"限流检查时发生错误: {str(e)}")
+        return None
+
+    _record(endpoint_class, identity, allowed)
+    g.rate_limit = (capacity, remaining)
+    if allowed:
+        return None
+
+    response = jsonify({'message': '请求过于频繁，请稍后再试', 'retry_after': math.ceil(retry_after)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
+def add_rate_limit_headers(response):
+    """在响应中附加当前类别的限流额度（after_request）"""
+    rate_limit = g.pop('rate_limit', None)
+    if rate_limit:
+        response.headers['X-RateLimit-Limit'] = str(rate_limit[0])
+        response.headers['X-RateLimit-Remaining'] = str(rate_limit[1])
+    return response
+
+
+def get_rate_limit_stats(top=10):
+    """
+    获取限流统计
+    :param top: 返回被拒绝次数最多的前几个用户或IP
+    """
+    with _stats_lock:
+        stats = {
+            'allowed': dict(_stats['allowed']),
+            'rejected': dict(_stats['rejected']),
+            'top_rejected': [{'identity': key, 'count': count} for key, count in _stats['rejected_keys'].most_common(top)],
+            'errors': _stats['errors']
+        }
+    buckets = get_token_buckets()
+    stats['backend'] = buckets.name
+    stats['buckets'] = buckets.size()
+    stats['limits'] = {
+        name: dict(zip(('capacity', 'rate'), (current_app.config.get('RATE_LIMITS') or {}).get(name) or limit))
+        for name, limit in DEFAULT_RATE_LIMITS.items()
+    }
+    return stats
+
+
+def register_rate_limiter(app):
+    """注册请求限流中间件"""
+    app.before_request(check_rate_limit)
+    app.after_request(add_rate_limit_headers)
@@ -0,0 +1,51 @@
+import json
+import zlib
+from difflib import SequenceMatcher
+
+
+def make_delta(base, target):
+    """
+    按行计算从base到target的差异
+    差异为操作列表：[起始行, 结束行]表示复制base中的行，字符串表示插入的文本
+    :return: 操作列表
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, base_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(''.join(target_lines[j1:j2]))
+    return ops
+
+
+def apply_delta(base, ops):
+    """将差异应用到base，得到目标文本"""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return ''.join(parts)
+
+
+def pack_text(text):
+    """压缩保存完整文本"""
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def unpack_text(data):
+    return zlib.decompress(data).decode('utf-8')
+
+
+def pack_delta(ops):
+    """压缩保存差异"""
+    return zlib.compress(json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def unpack_delta(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
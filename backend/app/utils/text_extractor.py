@@ -0,0 +1,68 @@
+import os
+import docx
+
+# 可直接按文本读取的文件扩展名
+TEXT_EXTENSIONS = ['.txt', '.md', '.json', '.log', '.csv', '.xml', '.html', '.htm']
+
+
+def extract_docx_text(file_path):
+    """
+    提取Word文档(.docx)中的段落和表格文本
+    :param file_path: 文件完整路径
+    :return: 文本内容
+    """
+    doc = docx.Document(file_path)
+    content = []
+    # 提取文档中所有段落文本
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            content.append(paragraph.text)
+
+    # 提取表格内容
+    for table in doc.tables:
+        table_content = []
+        for row in table.rows:
+            row_text = []
+            for cell in row.cells:
+                if cell.text.strip():
+                    row_text.append(cell.text)
+            if row_text:
+                table_content.append(' | '.join(row_text))
+        if table_content:
+            content.append('\n表格内容:\n' + '\n'.join(table_content))
+
+    # 合并所有内容，用换行符分隔
+    return '\n\n'.join(content)
+
+
+def read_text_file(file_path):
+    """
+    读取文本文件，依次尝试utf-8和gbk编码
+    :param file_path: 文件完整路径
+    :return: 文本内容，无法解码时返回None
+    """
+    for encoding in ('utf-8', 'gbk'):
+        try:
+            with open(file_path, 'r', encoding=encoding) as f:
+                return f.read()
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def extract_text(file_path, file_name=None):
+    """
+    根据扩展名提取文件的纯文本内容
+    :param file_path: 文件完整路径
+    :param file_name: 文件名（用于判断扩展名，默认取file_path）
+    :return: 文本内容，不支持的格式或解析失败返回None
+    """
+    _, ext = os.path.splitext((file_name or file_path).lower())
+    try:
+        if ext == '.docx':
+            return extract_docx_text(file_path)
+        if ext in TEXT_EXTENSIONS:
+            return read_text_file(file_path)
+    except Exception as e:
+        print(f"提取文件文本失败: {e}")
+    return None
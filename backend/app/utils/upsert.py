@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+
+def upsert_increment(connection, table, keys, increments, updated_column=None):
+    """
+    按唯一键累加计数列，记录不存在时插入（MySQL使用ON DUPLICATE KEY UPDATE，SQLite使用ON CONFLICT）
+    :param connection: 数据库连接（如mapper事件中的connection或db.session.connection()）
+    :param table: Table对象
+    :param keys: 唯一键列及取值 {列名: 值}
+    :param increments: 需要累加的列及增量 {列名: 增量}
+    :param updated_column: 需要同时更新为当前时间的列名
+    """
+    values = dict(keys)
+    values.update(increments)
+    updates = {name: table.c[name] + delta for name, delta in increments.items()}
+    if updated_column:
+        values[updated_column] = updates[updated_column] = datetime.utcnow()
+
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        connection.execute(mysql_insert(table).values(**values).on_duplicate_key_update(**updates))
+    elif dialect == 'sqlite':
+        connection.execute(sqlite_insert(table).values(**values).on_conflict_do_update(
+            index_elements=list(keys), set_=updates
+        ))
+    else:
+        condition = [table.c[name] == value for name, value in keys.items()]
+        result = connection.execute(table.update().where(*condition).values(**updates))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**values))
@@ -0,0 +1,104 @@
+"""
+全文检索性能对比：LIKE模糊匹配 vs 倒排索引
+
+用法：
+    python benchmarks/search_benchmark.py --documents 50000 --rounds 20
+
+默认使用临时SQLite数据库，可通过 --database 指定其他数据库连接（如MySQL，可同时对比FULLTEXT后端）。
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User, Role
+from app.models.document import Document, DocumentCategory
+from app.services.search_service import SearchService
+
+random.seed(42)
+# 随机生成的中文双字词和英文单词组成的词表，保证关键词有一定区分度
+WORDS = [chr(random.randint(0x4e00, 0x9fa5)) + chr(random.randint(0x4e00, 0x9fa5)) for _ in range(3000)]
+WORDS += [''.join(random.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(6)) for _ in range(1000)]
+KEYWORDS = [random.choice(WORDS) for _ in range(5)]
+
+
+def random_text(n):
+    return ' '.join(random.choice(WORDS) for _ in range(n))
+
+
+def seed(count):
+    """生成测试数据"""
+    role = Role(name='admin', description='benchmark')
+    db.session.add(role)
+    db.session.flush()
+    user = User(username='bench', password_hash='-', email='bench@example.com', role_id=role.id)
+    category = DocumentCategory(name='benchmark')
+    db.session.add_all([user, category])
+    db.session.flush()
+
+    for start in range(0, count, 1000):
+        documents = []
+        for _ in range(min(1000, count - start)):
+            documents.append(Document(
+                title=random_text(4), description=random_text(20), content=random_text(200),
+                file_name='bench.md', file_type='flow', document_type='flow',
+                category_id=category.id, creator_id=user.id
+            ))
+        db.session.add_all(documents)
+        db.session.commit()
+
+
+def run(backend, rounds):
+    """对每个关键词执行检索，返回平均耗时（毫秒）和命中数"""
+    timings = []
+    hits = 0
+    for _ in range(rounds):
+        for keyword in KEYWORDS:
+            start = time.perf_counter()
+            query, score = SearchService.filter_query(Document.query, keyword)
+            order_by = [Document.created_at.desc()]
+            if score is not None:
+                order_by.insert(0, score.desc())
+            query.order_by(*order_by).limit(20).all()
+            hits = query.count()
+            timings.append((time.perf_counter() - start) * 1000)
+    return sum(timings) / len(timings), hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全文检索性能对比')
+    parser.add_argument('--documents', type=int, default=20000, help='生成的文档数量')
+    parser.add_argument('--rounds', type=int, default=10, help='每个关键词的查询轮数')
+    parser.add_argument('--database', help='数据库连接URI，默认使用临时SQLite数据库')
+    args = parser.parse_args()
+
+    app = create_app('production')
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    with app.app_context():
+        db.create_all()
+        print(f'生成{args.documents}个测试文档...')
+        seed(args.documents)
+
+        backends = ['like', 'inverted']
+        if db.engine.dialect.name == 'mysql':
+            backends.append('mysql')
+
+        app.config['SEARCH_BACKEND'] = 'inverted'
+        start = time.perf_counter()
+        SearchService.rebuild_index()
+        print(f'倒排索引构建耗时: {time.perf_counter() - start:.2f}s')
+
+        for backend in backends:
+            app.config['SEARCH_BACKEND'] = backend
+            avg, hits = run(backend, args.rounds)
+            print(f'{backend:>10}: 平均 {avg:8.2f} ms/次 (最后一次命中 {hits} 条)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+文档版本存储基准测试：模拟自动保存时对大文档的连续小修改，
+比较逐版本保存完整内容与“快照 + 差异”存储的大小，以及保存和还原版本的耗时
+
+用法：
+    python benchmarks/version_storage.py --size 1048576 --versions 120 --interval 20
+
+默认使用临时SQLite数据库，可通过 --database 指定其他数据库连接（如MySQL）。
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User, Role
+from app.models.document import Document, DocumentCategory, DocumentVersion
+from app.services import document_version_service
+from app.services.document_version_service import DocumentVersionService
+
+random.seed(42)
+
+WORDS = ['文档', '管理', '系统', '版本', '内容', '编辑', '保存', 'document', 'version', 'storage', 'delta', 'snapshot']
+
+
+def make_line():
+    return ' '.join(random.choice(WORDS) for _ in range(random.randint(5, 20))) + '\n'
+
+
+def make_text(size):
+    """生成约size字节（UTF-8）的多段文本"""
+    lines = []
+    total = 0
+    while total < size:
+        line = make_line()
+        lines.append(line)
+        total += len(line.encode('utf-8'))
+    return lines
+
+
+def edit(lines):
+    """模拟一次自动保存间隔内的修改：改写、插入或删除少量行"""
+    lines = list(lines)
+    for _ in range(random.randint(1, 5)):
+        index = random.randrange(len(lines))
+        action = random.random()
+        if action < 0.6:
+            lines[index] = make_line()
+        elif action < 0.85:
+            lines.insert(index, make_line())
+        elif len(lines) > 1:
+            del lines[index]
+    return lines
+
+
+def clear_cache():
+    with document_version_service._lock:
+        document_version_service._cache.clear()
+        document_version_service._cache_state['size'] = 0
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def summary(values):
+    values = sorted(values)
+    return (f'平均 {statistics.mean(values):.1f}ms，中位数 {statistics.median(values):.1f}ms，'
+            f'P95 {values[int(len(values) * 0.95) - 1]:.1f}ms，最大 {values[-1]:.1f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文档版本存储基准测试')
+    parser.add_argument('--size', type=int, default=1024 * 1024, help='文档大小（字节）')
+    parser.add_argument('--versions', type=int, default=120, help='版本数（默认相当于每30秒自动保存、编辑1小时）')
+    parser.add_argument('--interval', type=int, default=20, help='快照间隔（VERSION_SNAPSHOT_INTERVAL）')
+    parser.add_argument('--database', help='数据库连接URI，默认使用临时SQLite数据库')
+    args = parser.parse_args()
+
+    app = create_app('production')
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app.config['VERSION_SNAPSHOT_INTERVAL'] = args.interval
+    app.config['JOB_QUEUE_MODE'] = 'external'
+
+    with app.app_context():
+        db.create_all()
+        role = Role(name='user', description='benchmark')
+        db.session.add(role)
+        db.session.flush()
+        user = User(username='bench', password_hash='-', email='bench@example.com', role_id=role.id)
+        category = DocumentCategory(name='benchmark')
+        db.session.add_all([user, category])
+        db.session.flush()
+        document = Document(title='benchmark', file_name='bench.docx', file_type='flow', document_type='flow',
+                            category_id=category.id, creator_id=user.id)
+        db.session.add(document)
+        db.session.commit()
+
+        print(f'文档约{args.size}字节，保存{args.versions}个版本，快照间隔{args.interval}')
+        lines = make_text(args.size)
+        texts = []
+        save_times = []
+        for _ in range(args.versions):
+            text = ''.join(lines)
+            texts.append(text)
+            _, elapsed = timed(DocumentVersionService.save_version, document, user.id, text)
+            db.session.commit()
+            save_times.append(elapsed)
+            lines = edit(lines)
+
+        versions = DocumentVersion.query.filter_by(document_id=document.id).order_by(DocumentVersion.version_num).all()
+        full_size = sum(len(text.encode('utf-8')) for text in texts)
+        stored_size = sum(version.stored_size for version in versions)
+        snapshots = sum(1 for version in versions if version.storage == 'full')
+        print(f'完整保存每个版本: {full_size / 1024 / 1024:.1f}MB')
+        print(f'快照 + 差异:       {stored_size / 1024 / 1024:.2f}MB（{snapshots}个快照，'
+              f'{len(versions) - snapshots}个差异，为完整保存的{stored_size / full_size:.2%}）')
+        print(f'保存版本（含计算差异）: {summary(save_times)}')
+
+        # 冷读取：每次读取前清空缓存，需从快照开始应用差异
+        cold_times = []
+        for version in versions:
+            clear_cache()
+            content, elapsed = timed(DocumentVersionService.get_content, version)
+            assert content == texts[version.version_num - 1], f'版本{version.version_num}还原结果不一致'
+            cold_times.append(elapsed)
+        print(f'还原版本（未缓存）:     {summary(cold_times)}')
+
+        warm_times = []
+        for version in versions:
+            DocumentVersionService.get_content(version)
+            _, elapsed = timed(DocumentVersionService.get_content, version)
+            warm_times.append(elapsed)
+        print(f'读取版本（已缓存）:     {summary(warm_times)}')
+
+        # 模拟多进程部署时保存版本未命中缓存，全部保存为快照后由压缩任务改写
+        clear_cache()
+        DocumentVersion.query.filter_by(document_id=document.id).delete()
+        db.session.commit()
+        for text in texts:
+            clear_cache()
+            DocumentVersionService.save_version(document, user.id, text)
+            db.session.commit()
+        result, elapsed = timed(DocumentVersionService.compact, document.id)
+        print(f"压缩任务: {result['size_before'] / 1024 / 1024:.1f}MB -> {result['size_after'] / 1024 / 1024:.2f}MB，"
+              f"改写{result['rewritten']}个版本，耗时{elapsed:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
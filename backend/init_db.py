@@ -1,6 +1,7 @@
 import os
 import sys
 from flask import Flask
+from flask_migrate import Migrate, stamp
 from app.config.config import config
 from app.models import db
 from app.models.user import User, Role, Permission
@@ -17,6 +18,7 @@ def create_app(config_name='development'):
     
     # 初始化数据库
     db.init_app(app)
+    Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
     
     return app
 
@@ -29,8 +31,16 @@ def init_database():
     with app.app_context():
         # 创建所有表
         print("创建数据库表...")
+        new_database = 'documents' not in db.inspect(db.engine).get_table_names()
         db.create_all()
         
+        # 新建的数据库已是最新表结构，标记为最新迁移版本；
+        # 已有数据库create_all不会添加新列，需执行flask db upgrade
+        if new_database:
+            stamp(directory=app.extensions['migrate'].directory)
+        else:
+            print("已有数据库请执行 flask db upgrade 升级表结构（首次使用迁移时先执行 flask db stamp 0001_baseline）")
+        
         # 检查是否已存在角色数据
         if Role.query.count() == 0:
             print("初始化角色和权限数据...")
@@ -86,6 +96,10 @@ def init_database():
             db.session.add_all(default_categories)
             
             db.session.commit()
+            
+            # 建立分类闭包表
+            from app.services.category_service import CategoryService
+            CategoryService.rebuild_closure()
             print("角色和权限数据初始化完成！")
         else:
             print("数据库已有初始数据，跳过初始化步骤。")
@@ -0,0 +1,175 @@
+"""基线表结构（分片上传、检索索引等改动之前的模型，与随代码提供的document_system.db一致）
+
+Revision ID: 0001_baseline
+Revises: 
+Create Date: 2026-10-17 23:09:03.635874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_categories',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False, comment='分类名称'),
+    sa.Column('parent_id', sa.Integer(), nullable=True, comment='父分类ID'),
+    sa.Column('description', sa.String(length=200), nullable=True, comment='分类描述'),
+    sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+    sa.ForeignKeyConstraint(['parent_id'], ['document_categories.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('roles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False, comment='角色名称'),
+    sa.Column('description', sa.String(length=200), nullable=True, comment='角色描述'),
+    sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('permissions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('role_id', sa.Integer(), nullable=False, comment='角色ID'),
+    sa.Column('permission_type', sa.String(length=50), nullable=False, comment='权限类型：view/upload/edit/user_manage/category_manage'),
+    sa.Column('is_enabled', sa.Boolean(), nullable=True, comment='是否启用'),
+    sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('role_id', 'permission_type', name='_role_permission_uc')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False, comment='用户名'),
+    sa.Column('password_hash', sa.String(length=128), nullable=False, comment='密码哈希'),
+    sa.Column('email', sa.String(length=100), nullable=False, comment='邮箱'),
+    sa.Column('role_id', sa.Integer(), nullable=True, comment='角色ID'),
+    sa.Column('status', sa.Boolean(), nullable=True, comment='用户状态：True启用，False禁用'),
+    sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+    sa.Column('last_login_at', sa.DateTime(), nullable=True, comment='最后登录时间'),
+    sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    op.create_table('documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False, comment='文档标题'),
+    sa.Column('description', sa.Text(), nullable=True, comment='文档描述'),
+    sa.Column('file_name', sa.String(length=255), nullable=False, comment='文件名'),
+    sa.Column('file_type', sa.String(length=50), nullable=False, comment='文件类型'),
+    sa.Column('file_size', sa.Integer(), nullable=True, comment='文件大小（字节）'),
+    sa.Column('document_type', sa.String(length=20), nullable=False, comment='文档类型：layout(版式)/flow(流式)'),
+    sa.Column('category_id', sa.Integer(), nullable=False, comment='分类ID'),
+    sa.Column('creator_id', sa.Integer(), nullable=False, comment='创建者ID'),
+    sa.Column('is_private', sa.Boolean(), nullable=True, comment='是否私有'),
+    sa.Column('file_path', sa.String(length=500), nullable=True, comment='文件存储路径（FTP）'),
+    sa.Column('content', sa.Text(), nullable=True, comment='流式文件内容'),
+    sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+    sa.Column('views_count', sa.Integer(), nullable=True, comment='查看次数'),
+    sa.ForeignKeyConstraint(['category_id'], ['document_categories.id'], ),
+    sa.ForeignKeyConstraint(['creator_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('system_logs',
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('operator_id', sa.Integer(), nullable=False, comment='操作人ID'),
+    sa.Column('operator_name', sa.String(length=100), nullable=False, comment='操作人姓名'),
+    sa.Column('operation_type', sa.String(length=50), nullable=False, comment='操作类型：auth_grant/auth_revoke/user_create/user_update/user_delete/category_manage'),
+    sa.Column('operation_desc', sa.String(length=255), nullable=False, comment='操作描述'),
+    sa.Column('target_entity', sa.String(length=50), nullable=True, comment='操作目标实体：user/role/permission/category'),
+    sa.Column('target_id', sa.Integer(), nullable=True, comment='操作目标ID'),
+    sa.Column('target_name', sa.String(length=100), nullable=True, comment='操作目标名称'),
+    sa.Column('details', sa.Text(), nullable=True, comment='详细操作内容（JSON格式）'),
+    sa.Column('ip_address', sa.String(length=50), nullable=True, comment='IP地址'),
+    sa.Column('created_at', sa.DateTime(), nullable=False, comment='操作时间'),
+    sa.ForeignKeyConstraint(['operator_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_operator_time', 'system_logs', ['operator_id', 'created_at'], unique=False)
+    op.create_index('idx_type_time', 'system_logs', ['operation_type', 'created_at'], unique=False)
+    op.create_table('access_logs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False, comment='用户ID'),
+    sa.Column('document_id', sa.Integer(), nullable=False, comment='文档ID'),
+    sa.Column('action_type', sa.String(length=20), nullable=False, comment='操作类型：view/upload/edit/download/annotate'),
+    sa.Column('ip_address', sa.String(length=50), nullable=True, comment='IP地址'),
+    sa.Column('user_agent', sa.String(length=500), nullable=True, comment='用户代理'),
+    sa.Column('created_at', sa.DateTime(), nullable=True, comment='操作时间'),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_user_document_time', 'access_logs', ['user_id', 'document_id', 'created_at'], unique=False)
+    op.create_table('annotations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False, comment='文档ID'),
+    sa.Column('user_id', sa.Integer(), nullable=False, comment='用户ID'),
+    sa.Column('annotation_type', sa.String(length=20), nullable=False, comment='标注类型：text图形标注/shape(图形标注)/arrow(箭头标注)'),
+    sa.Column('content', sa.Text(), nullable=True, comment='标注内容'),
+    sa.Column('position', sa.JSON(), nullable=True, comment='标注位置信息（x, y坐标、大小等）'),
+    sa.Column('style', sa.JSON(), nullable=True, comment='标注样式（颜色、线条粗细、字体等）'),
+    sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('document_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False, comment='文档ID'),
+    sa.Column('version_num', sa.Integer(), nullable=False, comment='版本号'),
+    sa.Column('content', sa.Text(), nullable=True, comment='版本内容'),
+    sa.Column('created_by', sa.Integer(), nullable=False, comment='创建者ID'),
+    sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+    sa.Column('description', sa.String(length=200), nullable=True, comment='版本说明'),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('favorites',
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('user_favorites',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False, comment='用户ID'),
+    sa.Column('document_id', sa.Integer(), nullable=False, comment='文档ID'),
+    sa.Column('created_at', sa.DateTime(), nullable=True, comment='收藏时间'),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'document_id', name='_user_document_favorite_uc')
+    )
+
+
+def downgrade():
+    op.drop_table('user_favorites')
+    op.drop_table('favorites')
+    op.drop_table('document_versions')
+    op.drop_table('annotations')
+    op.drop_index('idx_user_document_time', table_name='access_logs')
+    op.drop_table('access_logs')
+    op.drop_index('idx_type_time', table_name='system_logs')
+    op.drop_index('idx_operator_time', table_name='system_logs')
+    op.drop_table('system_logs')
+    op.drop_table('documents')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_table('users')
+    op.drop_table('permissions')
+    op.drop_table('roles')
+    op.drop_table('document_categories')
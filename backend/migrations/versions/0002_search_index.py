@@ -0,0 +1,42 @@
+"""全文检索倒排索引表；MySQL另建ngram全文索引
+
+已有文档的词项由flask search-reindex生成
+
+Revision ID: 0002_search_index
+Revises: 0001_baseline
+Create Date: 2026-10-17 23:09:16.963205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002_search_index'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'search_terms',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('term', sa.String(length=64), nullable=False, comment='词项'),
+        sa.Column('document_id', sa.Integer(), nullable=False, comment='文档ID'),
+        sa.Column('weight', sa.Float(), nullable=False, comment='词项权重（标题>描述>内容）'),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_term_document', 'search_terms', ['term', 'document_id'], unique=False)
+    op.create_index('idx_search_document', 'search_terms', ['document_id'], unique=False)
+    if op.get_bind().dialect.name == 'mysql':
+        op.execute('ALTER TABLE documents ADD FULLTEXT INDEX ft_documents_text '
+                   '(title, description, content) WITH PARSER ngram')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        op.drop_index('ft_documents_text', table_name='documents')
+    op.drop_index('idx_search_document', table_name='search_terms')
+    op.drop_index('idx_term_document', table_name='search_terms')
+    op.drop_table('search_terms')
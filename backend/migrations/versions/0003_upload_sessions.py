@@ -0,0 +1,62 @@
+"""分片上传会话和已接收分片表
+
+Revision ID: 0003_upload_sessions
+Revises: 0002_search_index
+Create Date: 2026-10-17 23:09:17.104512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003_upload_sessions'
+down_revision = '0002_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(length=32), nullable=False, comment='上传会话ID'),
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='上传用户ID'),
+        sa.Column('original_filename', sa.String(length=255), nullable=False, comment='原始文件名'),
+        sa.Column('file_type', sa.String(length=50), nullable=False, comment='文件类型：layout/flow'),
+        sa.Column('file_size', sa.BigInteger(), nullable=False, comment='文件总大小（字节）'),
+        sa.Column('chunk_size', sa.Integer(), nullable=False, comment='分片大小（字节）'),
+        sa.Column('total_chunks', sa.Integer(), nullable=False, comment='分片总数'),
+        sa.Column('file_path', sa.String(length=500), nullable=False, comment='最终文件相对路径'),
+        sa.Column('file_name', sa.String(length=255), nullable=False, comment='存储文件名'),
+        sa.Column('checksum', sa.String(length=64), nullable=True, comment='整个文件的SHA-256（可选）'),
+        sa.Column('title', sa.String(length=200), nullable=True, comment='文档标题'),
+        sa.Column('description', sa.Text(), nullable=True, comment='文档描述'),
+        sa.Column('category_id', sa.Integer(), nullable=True, comment='分类ID'),
+        sa.Column('is_private', sa.Boolean(), nullable=True, comment='是否私有'),
+        sa.Column('status', sa.String(length=20), nullable=False, comment='状态：uploading/completed/aborted'),
+        sa.Column('document_id', sa.Integer(), nullable=True, comment='完成后生成的文档ID'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.ForeignKeyConstraint(['category_id'], ['document_categories.id'], ),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_upload_user_status', 'upload_sessions', ['user_id', 'status'], unique=False)
+    op.create_table(
+        'upload_chunks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.String(length=32), nullable=False, comment='上传会话ID'),
+        sa.Column('chunk_index', sa.Integer(), nullable=False, comment='分片序号（从0开始）'),
+        sa.Column('size', sa.Integer(), nullable=False, comment='分片大小（字节）'),
+        sa.Column('checksum', sa.String(length=64), nullable=False, comment='分片SHA-256'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='接收时间'),
+        sa.ForeignKeyConstraint(['session_id'], ['upload_sessions.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('session_id', 'chunk_index', name='_session_chunk_uc')
+    )
+
+
+def downgrade():
+    op.drop_table('upload_chunks')
+    op.drop_index('idx_upload_user_status', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
@@ -0,0 +1,29 @@
+"""文档增加文件内容哈希列（下载ETag）
+
+已有文档的哈希由flask document-hash-backfill计算
+
+Revision ID: 0004_document_content_hash
+Revises: 0003_upload_sessions
+Create Date: 2026-10-17 23:09:17.251873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_document_content_hash'
+down_revision = '0003_upload_sessions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True, comment='文件内容SHA-256'))
+    op.create_index('ix_documents_content_hash', 'documents', ['content_hash'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_documents_content_hash', table_name='documents')
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_column('content_hash')
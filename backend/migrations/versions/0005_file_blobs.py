@@ -0,0 +1,33 @@
+"""内容寻址文件块表（相同内容的文件只保存一份，按引用计数回收）
+
+已有文件由flask storage-dedupe迁移到文件块存储
+
+Revision ID: 0005_file_blobs
+Revises: 0004_document_content_hash
+Create Date: 2026-10-17 23:09:17.398214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005_file_blobs'
+down_revision = '0004_document_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'file_blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False, comment='文件内容SHA-256'),
+        sa.Column('path', sa.String(length=500), nullable=False, comment='文件块相对路径'),
+        sa.Column('size', sa.BigInteger(), nullable=True, comment='文件大小（字节）'),
+        sa.Column('ref_count', sa.Integer(), nullable=False, comment='引用此文件块的文档数'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.PrimaryKeyConstraint('hash')
+    )
+
+
+def downgrade():
+    op.drop_table('file_blobs')
@@ -0,0 +1,79 @@
+"""存储统计聚合表（存储统计、分类文档数、用户文档数读取此表），并按文档表初始化
+
+写入已初始化标记，之后由文档增删改在同一事务中维护
+
+Revision ID: 0006_storage_stats
+Revises: 0005_file_blobs
+Create Date: 2026-10-17 23:40:12.218305
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006_storage_stats'
+down_revision = '0005_file_blobs'
+branch_labels = None
+depends_on = None
+
+documents = sa.table(
+    'documents',
+    sa.column('id', sa.Integer),
+    sa.column('document_type', sa.String),
+    sa.column('category_id', sa.Integer),
+    sa.column('creator_id', sa.Integer),
+    sa.column('file_size', sa.Integer)
+)
+
+storage_stats = sa.table(
+    'storage_stats',
+    sa.column('dimension', sa.String),
+    sa.column('key', sa.String),
+    sa.column('document_count', sa.BigInteger),
+    sa.column('total_size', sa.BigInteger),
+    sa.column('updated_at', sa.DateTime)
+)
+
+
+def upgrade():
+    op.create_table(
+        'storage_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('dimension', sa.String(length=20), nullable=False, comment='统计维度：total/document_type/category/user/disk'),
+        sa.Column('key', sa.String(length=64), nullable=False, comment='维度取值（文档类型、分类ID、用户ID等）'),
+        sa.Column('document_count', sa.BigInteger(), nullable=False, comment='文档数'),
+        sa.Column('total_size', sa.BigInteger(), nullable=False, comment='文件总大小（字节）'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('dimension', 'key', name='uq_storage_stat_dimension_key')
+    )
+
+    # 按文档表初始化聚合，升级前已有的文档不会触发聚合监听
+    connection = op.get_bind()
+    grouped = connection.execute(sa.select(
+        documents.c.document_type, documents.c.category_id, documents.c.creator_id,
+        sa.func.count(documents.c.id), sa.func.coalesce(sa.func.sum(documents.c.file_size), 0)
+    ).group_by(documents.c.document_type, documents.c.category_id, documents.c.creator_id))
+
+    totals = {}
+    for document_type, category_id, creator_id, count, size in grouped:
+        # 与StorageStatsService的文档维度一致
+        for key in (('total', 'all'), ('document_type', document_type or ''),
+                    ('category', str(category_id)), ('user', str(creator_id))):
+            current = totals.setdefault(key, [0, 0])
+            current[0] += count
+            current[1] += int(size)
+
+    now = datetime.utcnow()
+    rows = [
+        {'dimension': dimension, 'key': key, 'document_count': count, 'total_size': size, 'updated_at': now}
+        for (dimension, key), (count, size) in sorted(totals.items())
+    ]
+    rows.append({'dimension': 'meta', 'key': 'seeded', 'document_count': 0, 'total_size': 0, 'updated_at': now})
+
+    op.bulk_insert(storage_stats, rows)
+
+
+def downgrade():
+    op.drop_table('storage_stats')
@@ -0,0 +1,63 @@
+"""分类闭包表（子树查询），并按已有分类的parent_id初始化
+
+Revision ID: 0007_category_closure
+Revises: 0006_storage_stats
+Create Date: 2026-10-17 23:09:17.545306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_category_closure'
+down_revision = '0006_storage_stats'
+branch_labels = None
+depends_on = None
+
+document_categories = sa.table(
+    'document_categories',
+    sa.column('id', sa.Integer),
+    sa.column('parent_id', sa.Integer)
+)
+
+category_closure = sa.table(
+    'category_closure',
+    sa.column('ancestor_id', sa.Integer),
+    sa.column('descendant_id', sa.Integer),
+    sa.column('depth', sa.Integer)
+)
+
+
+def upgrade():
+    op.create_table(
+        'category_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False, comment='祖先分类ID'),
+        sa.Column('descendant_id', sa.Integer(), nullable=False, comment='后代分类ID'),
+        sa.Column('depth', sa.Integer(), nullable=False, comment='层级距离（自身为0）'),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['document_categories.id'], ),
+        sa.ForeignKeyConstraint(['descendant_id'], ['document_categories.id'], ),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('idx_closure_descendant', 'category_closure', ['descendant_id', 'ancestor_id'], unique=False)
+
+    # 按parent_id写入每个分类到自身及各级祖先的路径（与CategoryService.rebuild_closure一致），遇到环时停止
+    parents = dict(op.get_bind().execute(
+        sa.select(document_categories.c.id, document_categories.c.parent_id)
+    ).fetchall())
+    rows = []
+    for category_id in parents:
+        depth = 0
+        current = category_id
+        visited = set()
+        while current is not None and current in parents and current not in visited:
+            visited.add(current)
+            rows.append({'ancestor_id': current, 'descendant_id': category_id, 'depth': depth})
+            current = parents[current]
+            depth += 1
+    if rows:
+        op.bulk_insert(category_closure, rows)
+
+
+def downgrade():
+    op.drop_index('idx_closure_descendant', table_name='category_closure')
+    op.drop_table('category_closure')
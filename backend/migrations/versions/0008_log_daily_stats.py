@@ -0,0 +1,39 @@
+"""访问日志按天统计表（/api/logs/statistics读取）
+
+已有日志由flask log-stats-rollup汇总
+
+Revision ID: 0008_log_daily_stats
+Revises: 0007_category_closure
+Create Date: 2026-10-17 23:09:17.692147
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008_log_daily_stats'
+down_revision = '0007_category_closure'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'access_log_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False, comment='日期'),
+        sa.Column('action_type', sa.String(length=20), nullable=False, comment='操作类型'),
+        sa.Column('count', sa.Integer(), nullable=False, comment='访问次数'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='汇总时间'),
+        sa.PrimaryKeyConstraint('day', 'action_type')
+    )
+    op.create_table(
+        'access_log_daily_users',
+        sa.Column('day', sa.Date(), nullable=False, comment='日期'),
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='用户ID'),
+        sa.PrimaryKeyConstraint('day', 'user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('access_log_daily_users')
+    op.drop_table('access_log_daily_stats')
@@ -0,0 +1,57 @@
+"""访问日志按小时、按天汇总表（按文档、用户、操作类型）和汇总水位表
+
+已有日志由flask access-rollup汇总
+
+Revision ID: 0009_access_rollups
+Revises: 0008_log_daily_stats
+Create Date: 2026-10-17 23:09:17.838921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009_access_rollups'
+down_revision = '0008_log_daily_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'access_rollup_hourly',
+        sa.Column('bucket', sa.DateTime(), nullable=False, comment='小时（整点）'),
+        sa.Column('document_id', sa.Integer(), nullable=False, comment='文档ID'),
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='用户ID'),
+        sa.Column('action_type', sa.String(length=20), nullable=False, comment='操作类型'),
+        sa.Column('count', sa.Integer(), nullable=False, comment='访问次数'),
+        sa.PrimaryKeyConstraint('bucket', 'document_id', 'user_id', 'action_type')
+    )
+    op.create_index('idx_rollup_hourly_document', 'access_rollup_hourly', ['document_id', 'bucket'], unique=False)
+    op.create_table(
+        'access_rollup_daily',
+        sa.Column('day', sa.Date(), nullable=False, comment='日期'),
+        sa.Column('document_id', sa.Integer(), nullable=False, comment='文档ID'),
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='用户ID'),
+        sa.Column('action_type', sa.String(length=20), nullable=False, comment='操作类型'),
+        sa.Column('count', sa.Integer(), nullable=False, comment='访问次数'),
+        sa.PrimaryKeyConstraint('day', 'document_id', 'user_id', 'action_type')
+    )
+    op.create_index('idx_rollup_daily_document', 'access_rollup_daily', ['document_id', 'day'], unique=False)
+    op.create_index('idx_rollup_daily_user', 'access_rollup_daily', ['user_id', 'day'], unique=False)
+    op.create_table(
+        'rollup_watermarks',
+        sa.Column('name', sa.String(length=50), nullable=False, comment='汇总任务名称'),
+        sa.Column('last_id', sa.BigInteger(), nullable=False, comment='已汇总的最大日志ID'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_watermarks')
+    op.drop_index('idx_rollup_daily_user', table_name='access_rollup_daily')
+    op.drop_index('idx_rollup_daily_document', table_name='access_rollup_daily')
+    op.drop_table('access_rollup_daily')
+    op.drop_index('idx_rollup_hourly_document', table_name='access_rollup_hourly')
+    op.drop_table('access_rollup_hourly')
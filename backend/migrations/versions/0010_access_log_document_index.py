@@ -0,0 +1,24 @@
+"""访问日志按文档、时间的索引（按文档删除日志、分区维护使用）
+
+MySQL日志表的按月分区由flask log-partition-enable转换
+
+Revision ID: 0010_access_log_document_index
+Revises: 0009_access_rollups
+Create Date: 2026-10-17 23:09:17.985102
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0010_access_log_document_index'
+down_revision = '0009_access_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_document_time', 'access_logs', ['document_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_document_time', table_name='access_logs')
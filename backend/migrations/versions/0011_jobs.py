@@ -0,0 +1,51 @@
+"""持久化后台任务队列表，文档增加后台处理状态列（已有文档均已处理完成）
+
+Revision ID: 0011_jobs
+Revises: 0010_access_log_document_index
+Create Date: 2026-10-17 23:09:18.131755
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0011_jobs'
+down_revision = '0010_access_log_document_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.add_column(sa.Column('processing_status', sa.String(length=20), nullable=True,
+                                      comment='后台处理状态：pending/processing/ready/failed'))
+    op.execute("UPDATE documents SET processing_status = 'ready'")
+
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_type', sa.String(length=50), nullable=False, comment='任务类型'),
+        sa.Column('document_id', sa.Integer(), nullable=True, comment='关联文档ID'),
+        sa.Column('payload', sa.Text(), nullable=True, comment='任务参数（JSON格式）'),
+        sa.Column('status', sa.String(length=20), nullable=False, comment='状态：pending/running/succeeded/failed'),
+        sa.Column('attempts', sa.Integer(), nullable=False, comment='已执行次数'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, comment='最大执行次数'),
+        sa.Column('run_at', sa.DateTime(), nullable=False, comment='最早执行时间（重试退避）'),
+        sa.Column('locked_by', sa.String(length=100), nullable=True, comment='执行中的工作线程'),
+        sa.Column('locked_at', sa.DateTime(), nullable=True, comment='领取时间'),
+        sa.Column('last_error', sa.Text(), nullable=True, comment='最近一次失败原因'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.Column('finished_at', sa.DateTime(), nullable=True, comment='完成时间'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_job_status_run_at', 'jobs', ['status', 'run_at'], unique=False)
+    op.create_index('ix_jobs_document_id', 'jobs', ['document_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_document_id', table_name='jobs')
+    op.drop_index('idx_job_status_run_at', table_name='jobs')
+    op.drop_table('jobs')
+
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_column('processing_status')
@@ -0,0 +1,30 @@
+"""文档列表筛选的复合索引（按创建时间倒序分页，可见性、创建者、分类、文件类型筛选）
+
+Revision ID: 0012_document_list_indexes
+Revises: 0011_jobs
+Create Date: 2026-10-17 23:09:18.278431
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0012_document_list_indexes'
+down_revision = '0011_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_document_created', 'documents', ['created_at'], unique=False)
+    op.create_index('idx_document_creator_created', 'documents', ['creator_id', 'created_at'], unique=False)
+    op.create_index('idx_document_private_created', 'documents', ['is_private', 'created_at'], unique=False)
+    op.create_index('idx_document_category_created', 'documents', ['category_id', 'created_at'], unique=False)
+    op.create_index('idx_document_type_created', 'documents', ['file_type', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_document_type_created', table_name='documents')
+    op.drop_index('idx_document_category_created', table_name='documents')
+    op.drop_index('idx_document_private_created', table_name='documents')
+    op.drop_index('idx_document_creator_created', table_name='documents')
+    op.drop_index('idx_document_created', table_name='documents')
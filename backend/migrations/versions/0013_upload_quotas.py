@@ -0,0 +1,75 @@
+"""上传配额计数表，并按文档表初始化当前日/周/月的计数
+
+升级当天之前已上传的文档计入当前周期，升级后不会多出一轮配额
+
+Revision ID: 0013_upload_quotas
+Revises: 0012_document_list_indexes
+Create Date: 2026-10-17 23:09:18.425067
+
+"""
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0013_upload_quotas'
+down_revision = '0012_document_list_indexes'
+branch_labels = None
+depends_on = None
+
+documents = sa.table(
+    'documents',
+    sa.column('id', sa.Integer),
+    sa.column('creator_id', sa.Integer),
+    sa.column('created_at', sa.DateTime)
+)
+
+upload_quotas = sa.table(
+    'upload_quotas',
+    sa.column('user_id', sa.Integer),
+    sa.column('period', sa.String),
+    sa.column('period_start', sa.Date),
+    sa.column('count', sa.Integer),
+    sa.column('updated_at', sa.DateTime)
+)
+
+
+def upgrade():
+    op.create_table(
+        'upload_quotas',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='用户ID'),
+        sa.Column('period', sa.String(length=10), nullable=False, comment='统计周期：day/week/month'),
+        sa.Column('period_start', sa.Date(), nullable=False, comment='周期开始日期（本地时间）'),
+        sa.Column('count', sa.Integer(), nullable=False, comment='周期内上传数'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'period', 'period_start', name='uq_upload_quota_user_period')
+    )
+
+    # 与UploadQuotaService.period_starts、rebuild一致：当天、本周一、本月1日（本地时间）起的文档数
+    today = datetime.now().date()
+    starts = {
+        'day': today,
+        'week': today - timedelta(days=today.weekday()),
+        'month': today.replace(day=1)
+    }
+    connection = op.get_bind()
+    now = datetime.utcnow()
+    rows = []
+    for period, start in starts.items():
+        totals = connection.execute(
+            sa.select(documents.c.creator_id, sa.func.count(documents.c.id))
+            .where(documents.c.created_at >= datetime.combine(start, datetime.min.time()))
+            .group_by(documents.c.creator_id)
+        ).fetchall()
+        rows.extend(
+            {'user_id': creator_id, 'period': period, 'period_start': start, 'count': total, 'updated_at': now}
+            for creator_id, total in totals
+        )
+    if rows:
+        op.bulk_insert(upload_quotas, rows)
+
+
+def downgrade():
+    op.drop_table('upload_quotas')
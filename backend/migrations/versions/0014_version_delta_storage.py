@@ -0,0 +1,42 @@
+"""文档版本按“快照 + 差异”压缩存储，增加内容摘要列（保存差异前校验缓存的上一版本内容）
+
+旧版本的storage为空，仍读取content，摘要为空，保存下一个版本时按快照保存；
+执行flask version-compact后改写为差异并补全摘要
+
+Revision ID: 0014_version_delta_storage
+Revises: 0013_upload_quotas
+Create Date: 2026-10-18 01:12:40.503127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = '0014_version_delta_storage'
+down_revision = '0013_upload_quotas'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('document_versions') as batch_op:
+        batch_op.add_column(sa.Column('storage', sa.String(length=10), nullable=True,
+                                      comment='存储方式：full（压缩的完整快照）/delta（相对上一版本的压缩差异），为空时读取content'))
+        batch_op.add_column(sa.Column('data', sa.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'), nullable=True,
+                                      comment='压缩后的快照或差异'))
+        batch_op.add_column(sa.Column('content_size', sa.Integer(), nullable=True, comment='版本内容长度（字符）'))
+        batch_op.add_column(sa.Column('stored_size', sa.Integer(), nullable=True, comment='实际存储的字节数'))
+        batch_op.add_column(sa.Column('content_digest', sa.String(length=64), nullable=True,
+                                      comment='版本内容的SHA-256摘要，保存差异前校验缓存的上一版本内容'))
+        batch_op.create_unique_constraint('uq_document_version_num', ['document_id', 'version_num'])
+
+
+def downgrade():
+    with op.batch_alter_table('document_versions') as batch_op:
+        batch_op.drop_constraint('uq_document_version_num', type_='unique')
+        batch_op.drop_column('content_digest')
+        batch_op.drop_column('stored_size')
+        batch_op.drop_column('content_size')
+        batch_op.drop_column('data')
+        batch_op.drop_column('storage')
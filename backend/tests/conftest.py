@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    """使用临时SQLite数据库和文件存储目录的应用（同一测试模块共用）"""
+    path = tmp_path_factory.mktemp('app')
+    app = create_app('production')
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + str(path / 'test.db'),
+        FTP_STORAGE_PATH=str(path / 'files'),
+        AUTH_VERSION_DB=str(path / 'auth_version.db'),
+        JOB_QUEUE_MODE='external'
+    )
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def login(client, username, password):
+    """登录并返回携带访问令牌的请求头"""
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+
+
+def create_users():
+    """新建库中创建管理员admin/admin、普通用户user/user（查看、上传、编辑权限）和分类1（需已建表）"""
+    from werkzeug.security import generate_password_hash
+    from app.models.user import User, Role, Permission
+    from app.models.document import DocumentCategory
+    admin_role = Role(name='admin')
+    user_role = Role(name='user')
+    db.session.add_all([admin_role, user_role])
+    db.session.flush()
+    for permission in ('view', 'upload', 'edit', 'user_manage', 'category_manage'):
+        db.session.add(Permission(role_id=admin_role.id, permission_type=permission, is_enabled=True))
+        db.session.add(Permission(role_id=user_role.id, permission_type=permission,
+                                  is_enabled=permission in ('view', 'upload', 'edit')))
+    db.session.add_all([
+        User(username='admin', password_hash=generate_password_hash('admin'), email='admin@example.com',
+             role_id=admin_role.id),
+        User(username='user', password_hash=generate_password_hash('user'), email='user@example.com',
+             role_id=user_role.id),
+        DocumentCategory(name='category')
+    ])
+    db.session.commit()
@@ -0,0 +1,79 @@
+"""分类闭包表迁移检查：升级已有数据库时按parent_id初始化闭包表，子分类查询包含升级前已有的分类"""
+import os
+from datetime import datetime
+
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.category_closure import CategoryClosure
+from conftest import login
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+# 升级前的分类树：1 -> 2 -> 3，4为独立的顶层分类
+CATEGORIES = [(1, None), (2, 1), (3, 2), (4, None)]
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    """按基线表结构写入分类、用户和文档后升级到最新版本"""
+    upgrade(directory=MIGRATIONS_DIR, revision='0001_baseline')
+    now = datetime.utcnow()
+    db.session.execute(text("INSERT INTO roles (id, name) VALUES (1, 'admin')"))
+    for permission in ('view', 'upload', 'edit', 'category_manage', 'user_manage'):
+        db.session.execute(text('INSERT INTO permissions (role_id, permission_type, is_enabled) VALUES (1, :p, 1)'),
+                           {'p': permission})
+    db.session.execute(text('INSERT INTO users (id, username, password_hash, email, role_id, status, created_at) '
+                            "VALUES (1, 'admin', :password, 'admin@example.com', 1, 1, :now)"),
+                       {'password': generate_password_hash('admin'), 'now': now})
+    for category_id, parent_id in CATEGORIES:
+        db.session.execute(text('INSERT INTO document_categories (id, name, parent_id, created_at) '
+                                'VALUES (:id, :name, :parent_id, :now)'),
+                           {'id': category_id, 'name': f'category{category_id}', 'parent_id': parent_id, 'now': now})
+        db.session.execute(text('INSERT INTO documents (title, file_name, file_type, file_size, document_type, '
+                                'category_id, creator_id, is_private, created_at, updated_at, views_count) '
+                                "VALUES (:title, 'a.pdf', 'layout', 1, 'layout', :category_id, 1, 0, :now, :now, 0)"),
+                           {'title': f'document{category_id}', 'category_id': category_id, 'now': now})
+    db.session.commit()
+
+    upgrade(directory=MIGRATIONS_DIR)
+    return app.test_client()
+
+
+def _ancestors(category_id):
+    return dict(db.session.query(CategoryClosure.ancestor_id, CategoryClosure.depth)
+                .filter(CategoryClosure.descendant_id == category_id).all())
+
+
+def test_closure_seeded_from_parent_id(client):
+    assert _ancestors(1) == {1: 0}
+    assert _ancestors(2) == {2: 0, 1: 1}
+    assert _ancestors(3) == {3: 0, 2: 1, 1: 2}
+    assert _ancestors(4) == {4: 0}
+
+
+@pytest.mark.parametrize('category_id, titles', [
+    (1, {'document1', 'document2', 'document3'}),
+    (2, {'document2', 'document3'}),
+    (4, {'document4'}),
+])
+def test_include_children_on_existing_categories(client, category_id, titles):
+    headers = login(client, 'admin', 'admin')
+    response = client.get(f'/api/documents/?category_id={category_id}&include_children=true', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert {item['title'] for item in response.get_json()['documents']} == titles
+
+    response = client.get(f'/api/categories/{category_id}/documents?include_children=true', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert {item['title'] for item in response.get_json()['documents']} == titles
+
+
+def test_new_child_of_existing_category(client):
+    headers = login(client, 'admin', 'admin')
+    response = client.post('/api/categories/', json={'name': 'category5', 'parent_id': 3}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    category_id = response.get_json()['category']['id']
+    assert _ancestors(category_id) == {category_id: 0, 3: 1, 2: 2, 1: 3}
@@ -0,0 +1,65 @@
+"""文档后台处理任务检查：任务延迟或重试期间用户修改的内容不会被提取的文本覆盖"""
+import io
+
+import pytest
+
+from app import db
+from app.models.document import Document, DocumentVersion
+from app.services.document_version_service import DocumentVersionService
+from app.services.job_queue import JobQueue
+from conftest import create_users, login
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    db.create_all()
+    create_users()
+    return app.test_client()
+
+
+def _upload(client, headers, text):
+    response = client.post('/api/documents/', headers=headers, content_type='multipart/form-data', data={
+        'file': (io.BytesIO(text.encode('utf-8')), 'notes.md'), 'title': 'notes', 'category_id': '1'
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['document_id']
+
+
+def _run_jobs():
+    while JobQueue.run_next('test'):
+        pass
+    db.session.expire_all()
+
+
+def test_extracted_text_fills_new_document(client):
+    headers = login(client, 'user', 'user')
+    document_id = _upload(client, headers, 'from file')
+    _run_jobs()
+    assert Document.query.get(document_id).content == 'from file'
+
+
+def test_edit_before_job_runs_is_kept(client):
+    headers = login(client, 'user', 'user')
+    document_id = _upload(client, headers, 'from file')
+    response = client.put(f'/api/documents/{document_id}', json={'content': 'edited'}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+
+    _run_jobs()
+    document = Document.query.get(document_id)
+    assert document.content == 'edited'
+    assert document.processing_status == 'ready'
+
+
+def test_replaced_file_keeps_previous_content_as_version(client):
+    headers = login(client, 'user', 'user')
+    document_id = _upload(client, headers, 'first file')
+    _run_jobs()
+
+    response = client.put(f'/api/documents/{document_id}', headers=headers, content_type='multipart/form-data',
+                          data={'file': (io.BytesIO('second file'.encode('utf-8')), 'notes.md')})
+    assert response.status_code == 200, response.get_json()
+    _run_jobs()
+
+    assert Document.query.get(document_id).content == 'second file'
+    versions = DocumentVersion.query.filter_by(document_id=document_id).all()
+    assert [DocumentVersionService.get_content(version) for version in versions] == ['first file']
@@ -0,0 +1,118 @@
+"""文档版本存储检查：快照/差异还原、跨快照间隔还原，以及回滚或版本号重用后不读到缓存中的旧内容"""
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models.document import Document, DocumentVersion
+from app.models.user import User
+from app.services import document_version_service
+from app.services.document_version_service import DocumentVersionService, _set_encoded, _encode
+from conftest import create_users
+
+INTERVAL = 3
+
+
+@pytest.fixture(scope='module')
+def user(app):
+    app.config.update(VERSION_SNAPSHOT_INTERVAL=INTERVAL)
+    db.create_all()
+    create_users()
+    return User.query.filter_by(username='user').first()
+
+
+@pytest.fixture
+def document(user):
+    """新建文档并清空版本内容缓存"""
+    now = datetime.utcnow()
+    document = Document(title='notes', file_name='notes.md', file_type='md', file_size=1, document_type='md',
+                        category_id=1, creator_id=user.id, is_private=False, created_at=now, updated_at=now)
+    db.session.add(document)
+    db.session.commit()
+    _clear_cache()
+    return document
+
+
+def _clear_cache():
+    with document_version_service._lock:
+        document_version_service._cache.clear()
+        document_version_service._cache_state['size'] = 0
+
+
+def _contents(count):
+    """逐版本小幅修改的内容，保证差异比完整快照小"""
+    lines = [f'line {i}' for i in range(50)]
+    contents = []
+    for i in range(count):
+        lines[i % len(lines)] = f'line {i % len(lines)} edited in version {i + 1}'
+        contents.append('\n'.join(lines))
+    return contents
+
+
+def _save_all(document, user, contents):
+    for content in contents:
+        DocumentVersionService.save_version(document, user.id, content)
+        db.session.commit()
+
+
+def _version(document, version_num):
+    return DocumentVersion.query.filter_by(document_id=document.id, version_num=version_num).one()
+
+
+def test_snapshot_and_delta_round_trip(document, user):
+    contents = _contents(3 * INTERVAL + 1)
+    _save_all(document, user, contents)
+    storages = [_version(document, n).storage for n in range(1, len(contents) + 1)]
+    assert storages == ['full' if (n - 1) % INTERVAL == 0 else 'delta' for n in range(1, len(contents) + 1)]
+
+    # 清空缓存后逐版本从数据库还原，包括每个快照间隔内的最后一个差异
+    _clear_cache()
+    for n, content in enumerate(contents, 1):
+        assert DocumentVersionService.get_content(_version(document, n)) == content
+
+
+def test_reconstruct_across_changed_snapshot_interval(app, document, user):
+    contents = _contents(2 * INTERVAL + 2)
+    _save_all(document, user, contents)
+    app.config['VERSION_SNAPSHOT_INTERVAL'] = INTERVAL + 2
+    try:
+        DocumentVersionService.compact(document.id)
+        _clear_cache()
+        for n, content in enumerate(contents, 1):
+            version = _version(document, n)
+            assert version.storage == ('full' if (n - 1) % (INTERVAL + 2) == 0 else 'delta')
+            assert DocumentVersionService.get_content(version) == content
+    finally:
+        app.config['VERSION_SNAPSHOT_INTERVAL'] = INTERVAL
+
+
+def test_rolled_back_version_is_not_cached(document, user):
+    first, rolled_back, saved = 'first', 'rolled back', 'saved'
+    _save_all(document, user, [first])
+    DocumentVersionService.save_version(document, user.id, rolled_back)
+    db.session.rollback()
+    assert (document.id, 2) not in document_version_service._cache
+
+    # 同一版本号重新保存后读取的是新内容，后续差异以新内容为基准
+    _save_all(document, user, [saved, saved + ' and more'])
+    assert DocumentVersionService.get_content(_version(document, 2)) == saved
+    _clear_cache()
+    assert DocumentVersionService.get_content(_version(document, 3)) == saved + ' and more'
+
+
+def test_cached_content_checked_against_digest(document, user):
+    contents = _contents(2)
+    _save_all(document, user, contents)
+    assert DocumentVersionService.get_content(_version(document, 2)) == contents[1]
+
+    # 其他进程删除版本后以同一版本号保存了不同内容（不经过本进程的缓存）
+    DocumentVersion.query.filter_by(document_id=document.id, version_num=2).delete()
+    version = DocumentVersion(document_id=document.id, version_num=2, created_by=user.id)
+    _set_encoded(version, 'replaced', *_encode('replaced', None))
+    db.session.add(version)
+    db.session.commit()
+
+    assert DocumentVersionService.get_content(_version(document, 2)) == 'replaced'
+    _save_all(document, user, ['replaced and more'])
+    _clear_cache()
+    assert DocumentVersionService.get_content(_version(document, 3)) == 'replaced and more'
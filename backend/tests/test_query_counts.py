@@ -0,0 +1,88 @@
+"""文档列表接口的SQL语句数检查：语句数不随文档、分类和上传者数量增长（无N+1查询）"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.document import Document, DocumentCategory
+from app.models.user import User
+from app.services.category_service import CategoryService
+from conftest import create_users, login
+
+ENDPOINTS = [
+    '/api/documents/?per_page=50',
+    '/api/documents/?per_page=50&category_id=1&include_children=true',
+    '/api/overview/recent-documents?limit=50',
+    '/api/categories/1/documents?per_page=50&include_children=true',
+]
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    """关闭列表缓存和限流，保证每次请求都实际查询数据库"""
+    app.config.update(LIST_CACHE_ENABLED=False, RATE_LIMIT_ENABLED=False)
+    db.create_all()
+    create_users()
+    return app.test_client()
+
+
+def _add_documents(count):
+    """新增count篇公开文档，每篇文档使用新的上传者和分类1下新的子分类"""
+    now = datetime.utcnow()
+    role_id = User.query.filter_by(username='user').first().role_id
+    start = Document.query.count()
+    for i in range(start, start + count):
+        user = User(username=f'uploader{i}', password_hash=generate_password_hash('x'),
+                    email=f'uploader{i}@example.com', role_id=role_id)
+        category = DocumentCategory(name=f'category{i}', parent_id=1)
+        db.session.add_all([user, category])
+        db.session.flush()
+        db.session.add(Document(
+            title=f'document{i}', file_name='a.pdf', file_type='layout', file_size=1, document_type='layout',
+            category_id=category.id, creator_id=user.id, is_private=False,
+            created_at=now - timedelta(seconds=i), updated_at=now
+        ))
+    db.session.commit()
+    CategoryService.rebuild_closure()
+
+
+@contextmanager
+def _count_statements():
+    """统计代码块内执行的SQL语句数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _statement_counts(client, headers):
+    counts = {}
+    for url in ENDPOINTS:
+        # 先请求一次，排除登录状态等首次请求才有的查询
+        assert client.get(url, headers=headers).status_code == 200
+        with _count_statements() as statements:
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        assert len(response.get_json()['documents']) == Document.query.count()
+        counts[url] = len(statements)
+    return counts
+
+
+@pytest.mark.parametrize('username', ['admin', 'user'])
+def test_statement_count_is_constant(client, username):
+    headers = login(client, username, username)
+    if Document.query.count() == 0:
+        _add_documents(3)
+    small = _statement_counts(client, headers)
+    _add_documents(3 * Document.query.count())
+    large = _statement_counts(client, headers)
+    assert small == large
@@ -0,0 +1,148 @@
+"""
+文档列表查询计划检查：生成测试文档后对各列表接口使用的查询执行EXPLAIN，
+出现全表扫描documents或额外排序（filesort / TEMP B-TREE）时测试失败
+"""
+import re
+import random
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models.user import User, Role
+from app.models.document import Document, DocumentCategory
+from app.services.category_service import CategoryService
+from app.services.document_query import document_list_query
+from app.services.search_service import InvertedIndexSearchBackend, SearchService
+
+DOCUMENTS = 20000
+USERS = 200
+CATEGORIES = 50
+# 每5个分类为一组：第1个为顶层分类，其余4个为其子分类
+CATEGORY_GROUP = 5
+WORDS = ['report', 'budget', 'meeting', 'plan', 'design', 'review', '季度', '报告', '会议', '纪要']
+
+
+@pytest.fixture(scope='module')
+def seeded(app):
+    """生成测试数据：文档均匀分布在多个用户、分类和近一年内，约20%为私有，并建立检索索引和分类闭包表"""
+    rng = random.Random(42)
+    db.create_all()
+    admin_role = Role(name='admin', description='test')
+    user_role = Role(name='user', description='test')
+    db.session.add_all([admin_role, user_role])
+    db.session.flush()
+    db.session.add_all([
+        User(username=f'user{i}', password_hash='-', email=f'user{i}@example.com',
+             role_id=admin_role.id if i == 0 else user_role.id)
+        for i in range(USERS)
+    ])
+    db.session.add_all([
+        DocumentCategory(name=f'category{i}', parent_id=None if i % CATEGORY_GROUP == 0 else i - i % CATEGORY_GROUP + 1)
+        for i in range(CATEGORIES)
+    ])
+    db.session.commit()
+    CategoryService.rebuild_closure()
+
+    now = datetime.utcnow()
+    documents = [
+        {
+            'id': i + 1, 'title': ' '.join(rng.sample(WORDS, 3)) + f' {i}', 'file_name': 'test.pdf',
+            'file_type': rng.choice(('layout', 'flow')), 'document_type': 'layout',
+            'category_id': rng.randint(1, CATEGORIES), 'creator_id': rng.randint(1, USERS),
+            'is_private': rng.random() < 0.2, 'file_size': 1024,
+            'created_at': now - timedelta(seconds=rng.randint(0, 365 * 86400))
+        }
+        for i in range(DOCUMENTS)
+    ]
+    db.session.execute(Document.__table__.insert(), documents)
+    InvertedIndexSearchBackend().add_documents([SimpleNamespace(**document) for document in documents])
+    # 更新统计信息，使查询计划与线上数据量接近
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+
+
+def _listing(query, limit=20):
+    """列表接口的排序和分页方式（与paginate_query一致）"""
+    return query.order_by(Document.created_at.desc(), Document.id.desc()).limit(limit)
+
+
+def _queries():
+    """各接口使用的文档查询"""
+    admin = User.query.filter_by(username='user0').first()
+    user = User.query.filter_by(username='user1').first()
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'documents (admin)': _listing(document_list_query(admin)),
+        'documents (user)': _listing(document_list_query(user)),
+        'documents (user, category)': _listing(document_list_query(user).filter(Document.category_id == 7)),
+        'documents (user, file_type)': _listing(document_list_query(user).filter(Document.file_type == 'flow')),
+        'documents (admin, category)': _listing(document_list_query(admin).filter(Document.category_id == 7)),
+        'documents (user, include_children)': _listing(
+            document_list_query(user).filter(Document.category_id.in_(CategoryService.subtree_ids(1)))
+        ),
+        'documents (admin, include_children)': _listing(
+            document_list_query(admin).filter(Document.category_id.in_(CategoryService.subtree_ids(1)))
+        ),
+        'documents (my documents)': _listing(document_list_query(user).filter(Document.creator_id == user.id)),
+        'recent documents (user)': _listing(document_list_query(user), limit=5),
+        'upload limit': db.session.query(db.func.count(Document.id)).filter(
+            Document.creator_id == user.id, Document.created_at >= today
+        ),
+    }
+
+
+def _search_queries():
+    """关键词检索使用的文档查询（按相关度排序，结果集较小，允许额外排序）"""
+    user = User.query.filter_by(username='user1').first()
+    queries = {}
+    for keyword in ['report', 'rep', '季度报告', 'budget 会议']:
+        query, score = SearchService.filter_query(document_list_query(user), keyword)
+        queries[f'search ({keyword})'] = query.order_by(
+            score.desc(), Document.created_at.desc(), Document.id.desc()
+        ).limit(20)
+    return queries
+
+
+def _explain(query):
+    """返回查询计划的文本行"""
+    compiled = query.statement.compile(db.engine)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def _problems(plan):
+    """全表扫描documents或需要额外排序时视为退化"""
+    problems = []
+    for line in plan:
+        if 'TEMP B-TREE' in line:
+            problems.append(f'额外排序: {line}')
+        elif re.fullmatch(r'SCAN (TABLE )?documents( AS \w+)?', line.strip()):
+            problems.append(f'全表扫描: {line}')
+    return problems
+
+
+def test_document_queries_use_indexes(seeded):
+    failures = {}
+    for name, query in _queries().items():
+        plan = _explain(query)
+        if _problems(plan):
+            failures[name] = plan
+    assert not failures, failures
+
+
+def test_search_queries_use_term_index(seeded):
+    failures = {}
+    for name, query in _search_queries().items():
+        plan = _explain(query)
+        problems = [line for line in _problems(plan) if 'TEMP B-TREE' not in line]
+        problems += [line for line in plan if re.match(r'SCAN (TABLE )?search_terms', line.strip())]
+        if problems or not any('idx_term_document' in line for line in plan):
+            failures[name] = plan
+    assert not failures, failures
@@ -0,0 +1,81 @@
+"""请求限流检查：超过额度返回429和Retry-After，只有返回文件一部分的分段下载请求按read类别计数"""
+import io
+
+import pytest
+
+from app import db
+from app.models.document import Document
+from conftest import create_users, login
+
+CONTENT = b'0123456789' * 10
+HEAVY_READ = (2, 0.001)
+READ = (50, 0.001)
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    app.config.update(RATE_LIMITS={'heavy_read': HEAVY_READ, 'read': READ, 'write': (50, 1)})
+    db.create_all()
+    create_users()
+    return app.test_client()
+
+
+@pytest.fixture
+def document(client):
+    """上传一个文档并清空令牌桶，返回(文档, 请求头)"""
+    headers = login(client, 'user', 'user')
+    response = client.post('/api/documents/', headers=headers, content_type='multipart/form-data', data={
+        'file': (io.BytesIO(CONTENT), 'notes.txt'), 'title': 'notes', 'category_id': '1'
+    })
+    assert response.status_code == 201, response.get_json()
+    client.application.extensions.pop('rate_limit_buckets', None)
+    return Document.query.get(response.get_json()['document_id']), headers
+
+
+def _download(client, document, headers, **extra):
+    return client.get(f'/api/documents/{document.id}/download', headers={**headers, **extra})
+
+
+def test_heavy_read_limit_returns_429(client, document):
+    document, headers = document
+    for _ in range(HEAVY_READ[0]):
+        assert _download(client, document, headers).status_code == 200
+    response = _download(client, document, headers)
+    assert response.status_code == 429
+    retry_after = int(response.headers['Retry-After'])
+    assert retry_after >= 1
+    assert response.get_json()['retry_after'] == retry_after
+
+
+@pytest.mark.parametrize('extra', [
+    {'Range': 'bytes=0-'},
+    {'Range': f'bytes=0-{len(CONTENT) - 1}'},
+    {'Range': f'bytes=-{len(CONTENT)}'},
+    {'Range': 'bytes=0-1,4-5'},
+    {'Range': 'bytes=10-', 'If-Range': '"stale"'},
+    {'If-Range': 'current'},
+])
+def test_whole_file_requests_count_as_heavy_read(client, document, extra):
+    document, headers = document
+    if extra.get('If-Range') == 'current':
+        extra = {'If-Range': f'"{document.content_hash}"'}
+    # 覆盖整个文件的Range仍返回206，多段Range不支持时返回416，均按heavy_read计数
+    response = _download(client, document, headers, **extra)
+    assert response.headers['X-RateLimit-Limit'] == str(HEAVY_READ[0])
+
+
+@pytest.mark.parametrize('extra', [
+    {'Range': 'bytes=0-9'},
+    {'Range': 'bytes=10-'},
+    {'Range': 'bytes=10-', 'If-Range': 'current'},
+])
+def test_partial_requests_count_as_read(client, document, extra):
+    document, headers = document
+    if extra.get('If-Range') == 'current':
+        extra = {**extra, 'If-Range': f'"{document.content_hash}"'}
+    for _ in range(HEAVY_READ[0] + 1):
+        response = _download(client, document, headers, **extra)
+        assert response.status_code == 206
+        assert response.headers['X-RateLimit-Limit'] == str(READ[0])
+    # 分段请求不消耗heavy_read额度
+    assert _download(client, document, headers).status_code == 200
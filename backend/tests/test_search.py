@@ -0,0 +1,80 @@
+"""检索分词和倒排索引检查：前缀匹配、单字匹配、中文二元组匹配和字母数字片段匹配"""
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models.document import Document
+from app.models.user import User
+from app.services.search_service import SearchService, tokenize, query_terms
+from conftest import create_users, login
+
+DOCUMENTS = {
+    'report': ('Quarterly Report', '季度财务报告'),
+    'budget': ('Budget2024 plan', '年度预算'),
+    'meeting': ('Meeting notes', '项目会议纪要'),
+}
+
+
+def test_tokenize():
+    assert tokenize('季度报告') == ['季', '度', '报', '告', '季度', '度报', '报告']
+    assert tokenize('Report2024 v2') == ['report2024', 'report', '2024', 'v2', 'v', '2']
+    assert tokenize('会议 Notes') == ['会', '议', '会议', 'notes']
+    assert tokenize('') == []
+    assert tokenize(None) == []
+
+
+def test_query_terms():
+    assert query_terms('Rep') == [('rep', True)]
+    assert query_terms('季') == [('季', False)]
+    assert query_terms('季度报告') == [('季度', False), ('度报', False), ('报告', False)]
+    assert query_terms('会议 notes 会议') == [('会议', False), ('notes', True)]
+    assert query_terms('') == []
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    """写入测试文档并建立倒排索引（SQLite使用inverted检索后端）"""
+    app.config.update(SEARCH_BACKEND='inverted', LIST_CACHE_ENABLED=False)
+    db.create_all()
+    create_users()
+    now = datetime.utcnow()
+    creator_id = User.query.filter_by(username='admin').first().id
+    for title, description in DOCUMENTS.values():
+        document = Document(title=title, description=description, file_name='a.pdf', file_type='layout',
+                            file_size=1, document_type='layout', category_id=1, creator_id=creator_id,
+                            is_private=False, created_at=now, updated_at=now)
+        db.session.add(document)
+        db.session.flush()
+        SearchService.index_document(document)
+    db.session.commit()
+    assert SearchService.get_backend().name == 'inverted'
+    return app.test_client()
+
+
+@pytest.mark.parametrize('keyword, expected', [
+    # 字母数字前缀匹配，不区分大小写
+    ('rep', {'report'}),
+    ('REPORT', {'report'}),
+    # 字母数字混合串中的片段
+    ('budget', {'budget'}),
+    ('2024', {'budget'}),
+    ('budget2024', {'budget'}),
+    # 单个中文字符
+    ('季', {'report'}),
+    ('会', {'meeting'}),
+    ('度', {'report', 'budget'}),
+    # 中文二元组，需命中全部二元组
+    ('财务报告', {'report'}),
+    ('会议纪要', {'meeting'}),
+    ('季度预算', set()),
+    # 多个关键词需全部命中
+    ('meeting 会议', {'meeting'}),
+    ('meeting 预算', set()),
+])
+def test_inverted_index_search(client, keyword, expected):
+    headers = login(client, 'admin', 'admin')
+    response = client.get('/api/documents/', query_string={'keyword': keyword}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    titles = {item['title'] for item in response.get_json()['documents']}
+    assert titles == {DOCUMENTS[name][0] for name in expected}
@@ -0,0 +1,49 @@
+"""上传配额迁移检查：升级已有数据库时按文档表初始化当前周期的计数，升级当天不会多出一轮配额"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+from app import db
+from app.services.upload_quota_service import UploadQuotaService
+from app.utils.limiter import check_upload_limit
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+@pytest.fixture(scope='module')
+def upgraded(app):
+    """按基线表结构写入用户和文档（用户1今天上传2个、40天前上传1个，用户2只有40天前的文档）后升级"""
+    upgrade(directory=MIGRATIONS_DIR, revision='0001_baseline')
+    now = datetime.now()
+    db.session.execute(text("INSERT INTO roles (id, name) VALUES (1, 'user')"))
+    db.session.execute(text("INSERT INTO document_categories (id, name) VALUES (1, 'category')"))
+    for user_id in (1, 2):
+        db.session.execute(text('INSERT INTO users (id, username, password_hash, email, role_id, status) '
+                                "VALUES (:id, :name, '-', :email, 1, 1)"),
+                           {'id': user_id, 'name': f'user{user_id}', 'email': f'user{user_id}@example.com'})
+    for creator_id, created_at in [(1, now), (1, now), (1, now - timedelta(days=40)), (2, now - timedelta(days=40))]:
+        db.session.execute(text('INSERT INTO documents (title, file_name, file_type, document_type, category_id, '
+                                "creator_id, is_private, created_at) VALUES ('d', 'a.pdf', 'layout', 'layout', 1, "
+                                ':creator_id, 0, :created_at)'),
+                           {'creator_id': creator_id, 'created_at': created_at})
+    db.session.commit()
+    upgrade(directory=MIGRATIONS_DIR)
+    return app
+
+
+def test_counters_seeded_on_upgrade(upgraded):
+    assert UploadQuotaService.get_counts(1) == {'day': 2, 'week': 2, 'month': 2}
+    assert UploadQuotaService.get_counts(2) == {'day': 0, 'week': 0, 'month': 0}
+
+
+def test_limit_applies_on_upgrade_day(upgraded):
+    limit = upgraded.config['MAX_UPLOAD_PER_DAY']
+    upgraded.config['MAX_UPLOAD_PER_DAY'] = 2
+    try:
+        assert check_upload_limit(1) is False
+        assert check_upload_limit(2) is True
+    finally:
+        upgraded.config['MAX_UPLOAD_PER_DAY'] = limit